@@ -0,0 +1,18 @@
+"""
+程序文件路径
+设置文件和数据文件（缓存、历史等）的位置；只使用标准库，启动早期（向已运行的实例转发命令前）也可以导入
+"""
+
+import os
+import sys
+
+
+def get_settings_path():
+    """获取设置文件的路径"""
+    return os.path.join(os.path.dirname(sys.executable
+        if getattr(sys, 'frozen', False) else os.path.dirname(__file__)), "settings.json")
+
+
+def get_data_path(filename):
+    """获取数据文件（缓存、历史等）的路径，与设置文件位于同一目录"""
+    return os.path.join(os.path.dirname(get_settings_path()), filename)
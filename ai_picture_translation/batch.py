@@ -0,0 +1,194 @@
+"""
+批量翻译命令行工具
+无需GUI，使用 settings.json 中的配置，多线程并发翻译目录或通配符匹配的图片，结果写入 JSONL 文件（支持断点续传）
+
+用法示例:
+    python batch.py ./manga/*.png -o result.jsonl -j 4 --rate 30
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image
+
+from core import load_settings, analyze_and_translate_image, flush_metrics, TRANSLATION_ERROR_PREFIX
+
+# 目录输入时收集的图片扩展名
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
+
+
+class RateLimiter:
+    """简单的速率限制器：两次请求之间至少间隔 60/rate 秒（rate 为每分钟请求数，0 表示不限制）"""
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def collect_images(inputs, recursive=False):
+    """展开目录和通配符，返回去重且排序后的图片路径列表"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*") if recursive else os.path.join(item, "*")
+            candidates = glob.glob(pattern, recursive=recursive)
+        else:
+            candidates = glob.glob(item, recursive=recursive) or [item]
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.abspath(path))
+    return sorted(set(paths))
+
+
+def load_done(output_path):
+    """读取已有输出文件，返回已成功翻译的图片路径集合（用于断点续传）"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError: # 上次中断时可能留下不完整的最后一行
+                continue
+            if record.get("ok"):
+                done.add(record.get("file"))
+    return done
+
+
+def translate_file(path, settings, limiter):
+    """翻译单个图片文件，返回输出记录"""
+    start = time.perf_counter()
+    try:
+        with Image.open(path) as img:
+            image = img.convert("RGB")
+    except Exception as e:
+        return {"file": path, "ok": False, "error": f"无法打开图片: {e}", "seconds": 0}
+
+    limiter.acquire()
+    request_start = time.perf_counter()
+    text = analyze_and_translate_image(
+        image, settings["translation_mode"], settings["api_key"], settings["base_url"],
+        settings["model"], settings["image_detail"], False, options=settings
+    )
+    record = {
+        "file": path,
+        "mode": settings["translation_mode"],
+        "model": settings["model"],
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "seconds": round(time.perf_counter() - request_start, 3),
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
+    if text is None or text.startswith(TRANSLATION_ERROR_PREFIX):
+        record.update({"ok": False, "error": text or "已取消"})
+    else:
+        record.update({"ok": True, "text": text})
+    return record
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI截图翻译工具 - 批量翻译图片")
+    parser.add_argument("inputs", nargs="+", help="图片文件、目录或通配符（如 ./pages/*.png）")
+    parser.add_argument("-o", "--output", default="translations.jsonl", help="输出 JSONL 文件（默认 translations.jsonl）")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="并发数（默认 4）")
+    parser.add_argument("--rate", type=float, default=0, help="每分钟最多请求数，0 表示不限制（默认 0）")
+    parser.add_argument("-r", "--recursive", action="store_true", help="递归处理子目录")
+    parser.add_argument("--mode", choices=["zh-en", "en-zh"], help="翻译模式（默认使用设置中的模式）")
+    parser.add_argument("--model", help="模型名称（默认使用设置中的模型）")
+    parser.add_argument("--detail", choices=["auto", "high", "low"], help="图像细节级别（默认使用设置中的级别）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用翻译缓存")
+    parser.add_argument("--no-resume", action="store_true", help="不跳过输出文件中已完成的图片")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    settings = load_settings()
+    if args.mode:
+        settings["translation_mode"] = args.mode
+    if args.model:
+        settings["model"] = args.model
+    if args.detail:
+        settings["image_detail"] = args.detail
+    if args.no_cache:
+        settings["use_cache"] = False
+    # 批量模式不需要流式输出
+    settings["use_streaming"] = False
+
+    if not settings.get("api_key") or not settings.get("base_url"):
+        print("错误: settings.json 中未配置 API Key 或 Base URL")
+        return 2
+
+    paths = collect_images(args.inputs, args.recursive)
+    done = set() if args.no_resume else load_done(args.output)
+    pending = [path for path in paths if path not in done]
+    print(f"共 {len(paths)} 张图片，已完成 {len(paths) - len(pending)} 张，待翻译 {len(pending)} 张，"
+          f"并发 {args.workers}，模型 {settings['model']}")
+    if not pending:
+        return 0
+
+    limiter = RateLimiter(args.rate)
+    write_lock = threading.Lock()
+    succeeded = failed = 0
+    latencies = []
+    start = time.perf_counter()
+
+    with open(args.output, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(translate_file, path, settings, limiter): path for path in pending}
+        try:
+            for index, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                with write_lock:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                if record["ok"]:
+                    succeeded += 1
+                    latencies.append(record["seconds"])
+                else:
+                    failed += 1
+
+                elapsed = time.perf_counter() - start
+                rate = index / elapsed if elapsed > 0 else 0
+                eta = (len(pending) - index) / rate if rate > 0 else 0
+                status = "完成" if record["ok"] else f"失败: {record['error']}"
+                print(f"[{index}/{len(pending)}] {os.path.basename(record['file'])} {status} "
+                      f"({record['seconds']:.1f}s) | {rate:.2f} 张/秒，剩余约 {eta:.0f}s")
+        except KeyboardInterrupt:
+            print("\n已中断，正在取消未开始的任务（已完成的结果已保存，可再次运行继续）...")
+            for future in futures:
+                future.cancel()
+    # 指标由后台定时导出，退出前写入最后一批
+    flush_metrics()
+
+    elapsed = time.perf_counter() - start
+    print("=" * 60)
+    print(f"成功 {succeeded} 张，失败 {failed} 张，总用时 {elapsed:.1f}s，"
+          f"吞吐量 {(succeeded + failed) / elapsed if elapsed > 0 else 0:.2f} 张/秒")
+    if latencies:
+        latencies.sort()
+        print(f"单张耗时: 平均 {sum(latencies) / len(latencies):.2f}s，"
+              f"中位数 {latencies[len(latencies) // 2]:.2f}s，最长 {latencies[-1]:.2f}s")
+    print(f"结果已写入: {os.path.abspath(args.output)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
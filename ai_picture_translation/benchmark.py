@@ -0,0 +1,279 @@
+"""
+延迟基准测试
+启动本地模拟的 OpenAI 兼容服务（chat/completions 流式协议，可配置首Token延迟、Token速率和错误率），
+用不同分辨率的合成截图调用 analyze_and_translate_image，统计编码耗时、上传字节、首Token时间、总耗时和吞吐量。
+结果保存为 JSON（包含 git 提交号），可用 --compare 与之前的结果对比。
+
+用法示例:
+    python benchmark.py -n 5 -o bench_new.json --compare bench_old.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image, ImageDraw
+
+from core import DEFAULT_SETTINGS, analyze_and_translate_image, TRANSLATION_ERROR_PREFIX
+from request_metrics import percentile
+
+# 默认测试的截图分辨率
+DEFAULT_RESOLUTIONS = ["1280x720", "1920x1080", "2560x1440", "3840x2160"]
+
+# 统计并对比的指标（越小越好的在前，吞吐量越大越好）
+REPORT_METRICS = ["encode_ms", "upload_bytes", "ttft_ms", "total_ms", "chars_per_sec"]
+
+
+class MockChatServer:
+    """模拟的 OpenAI 兼容服务，在后台线程中运行"""
+    def __init__(self, ttft_ms=300, tokens_per_sec=50, tokens=60, error_rate=0.0, port=0):
+        self.ttft_ms = ttft_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.uploaded_bytes = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="mock-chat-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args): # 不输出访问日志
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_GET(self): # 连接预热用的模型列表
+                self._send_json(200, {"object": "list", "data": []})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server.lock:
+                    server.uploaded_bytes.append(length)
+
+                time.sleep(server.ttft_ms / 1000.0)
+                if random.random() < server.error_rate:
+                    self._send_json(500, {"error": {"message": "mock server error", "type": "server_error"}})
+                    return
+
+                tokens = [f"词{i} " for i in range(server.tokens)]
+                if not body.get("stream"):
+                    time.sleep(len(tokens) / float(server.tokens_per_sec))
+                    self._send_json(200, {
+                        "id": "mock", "object": "chat.completion", "created": int(time.time()),
+                        "model": body.get("model", ""),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                                     "finish_reason": "stop"}],
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        chunk = {
+                            "id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                            "model": body.get("model", ""),
+                            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                        }
+                        self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+                        time.sleep(1.0 / server.tokens_per_sec)
+                    self._write_chunk("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError): # 客户端取消了请求
+                    pass
+
+        return Handler
+
+
+def make_screenshot(width, height, seed=0):
+    """生成合成截图：浅色界面背景 + 若干窗口和多行文字（固定随机种子，保证各次结果可比）"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (236, 238, 242))
+    draw = ImageDraw.Draw(image)
+    for _ in range(max(1, width * height // 700000)):
+        left = rng.randint(0, width // 2)
+        top = rng.randint(0, height // 2)
+        right = min(width, left + rng.randint(width // 5, width // 2))
+        bottom = min(height, top + rng.randint(height // 6, height // 2))
+        draw.rectangle((left, top, right, bottom), fill=(255, 255, 255), outline=(180, 180, 190))
+        for y in range(top + 12, bottom - 14, 18):
+            words = " ".join(rng.choice(["Hello", "dialog", "OK", "Cancel", "Settings", "world"])
+                             for _ in range(rng.randint(3, 10)))
+            draw.text((left + 10, y), words, fill=(20, 20, 20))
+    return image
+
+
+def summarize(samples):
+    """汇总多次运行的结果：中位数和 p95"""
+    summary = {}
+    for name in REPORT_METRICS:
+        values = sorted(sample[name] for sample in samples if sample.get(name) is not None)
+        if values:
+            summary[name] = {"p50": round(percentile(values, 50), 2), "p95": round(percentile(values, 95), 2)}
+    return summary
+
+
+def run_resolution(server, resolution, iterations, options, use_streaming):
+    """对单个分辨率运行多次，返回每次的测量结果"""
+    width, height = (int(part) for part in resolution.lower().split("x"))
+    image = make_screenshot(width, height)
+    samples = []
+    for iteration in range(iterations):
+        metrics = {}
+        first_token = []
+        start = time.perf_counter()
+        callback = (lambda chunk: first_token.append(time.perf_counter()) if not first_token else None)
+        text = analyze_and_translate_image(
+            image, "en-zh", "mock-key", server.base_url, "mock-model", "high", use_streaming,
+            callback=callback if use_streaming else None, options=options, metrics=metrics
+        )
+        total = time.perf_counter() - start
+        ok = text is not None and not text.startswith(TRANSLATION_ERROR_PREFIX)
+        with server.lock:
+            upload_bytes = server.uploaded_bytes[-1] if server.uploaded_bytes else None
+        ttft_ms = (first_token[0] - start) * 1000 if first_token else metrics.get("ttft_ms")
+        samples.append({
+            "iteration": iteration,
+            "ok": ok,
+            "encode_ms": metrics.get("encode_ms"),
+            "image_format": metrics.get("image_format"),
+            "image_bytes": metrics.get("image_bytes"),
+            "upload_bytes": upload_bytes,
+            "ttft_ms": ttft_ms,
+            "total_ms": total * 1000,
+            "chars_per_sec": len(text) / total if ok and total > 0 else None,
+        })
+    return samples
+
+
+def git_revision():
+    """获取当前 git 提交号，用于区分不同版本的结果"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline):
+    """打印与基准结果的对比（正数表示变慢/变大，吞吐量相反）"""
+    print(f"\n与 {baseline.get('revision', '?')} 对比:")
+    for resolution, result in current["results"].items():
+        old = baseline.get("results", {}).get(resolution)
+        if not old:
+            continue
+        changes = []
+        for name in REPORT_METRICS:
+            new_value = result["summary"].get(name, {}).get("p50")
+            old_value = old["summary"].get(name, {}).get("p50")
+            if new_value is None or not old_value:
+                continue
+            changes.append(f"{name} {(new_value - old_value) * 100.0 / old_value:+.1f}%")
+        print(f"  {resolution}: " + ", ".join(changes))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI截图翻译工具 - 截图/编码/流式输出延迟基准测试")
+    parser.add_argument("-n", "--iterations", type=int, default=5, help="每个分辨率运行次数（默认 5）")
+    parser.add_argument("--resolutions", nargs="+", default=DEFAULT_RESOLUTIONS, help="测试分辨率，如 1920x1080")
+    parser.add_argument("--ttft-ms", type=float, default=300, help="模拟服务的首Token延迟（毫秒）")
+    parser.add_argument("--tokens-per-sec", type=float, default=50, help="模拟服务的输出速率")
+    parser.add_argument("--tokens", type=int, default=60, help="每次回复的Token数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务返回错误的概率（0~1）")
+    parser.add_argument("--no-streaming", action="store_true", help="使用非流式请求")
+    parser.add_argument("--image-format", choices=["auto", "png"], default=DEFAULT_SETTINGS["image_format"],
+                        help="上传图片编码方式")
+    parser.add_argument("--no-trim", action="store_true", help="不裁剪空白区域")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(0)
+
+    options = DEFAULT_SETTINGS.copy()
+    # 缓存会让重复运行直接命中，基准测试中关闭；模拟服务的数据不写入程序的请求指标；连接预热等其余设置保持默认
+    options.update({
+        "use_cache": False,
+        "metrics_enabled": False,
+        "image_format": args.image_format,
+        "auto_trim": not args.no_trim,
+    })
+
+    server = MockChatServer(args.ttft_ms, args.tokens_per_sec, args.tokens, args.error_rate).start()
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": {},
+    }
+    try:
+        for resolution in args.resolutions:
+            samples = run_resolution(server, resolution, args.iterations, options, not args.no_streaming)
+            summary = summarize([sample for sample in samples if sample["ok"]])
+            report["results"][resolution] = {
+                "errors": len([sample for sample in samples if not sample["ok"]]),
+                "summary": summary,
+                "samples": samples,
+            }
+            parts = [f"{name}={values['p50']:.1f}/{values['p95']:.1f}" for name, values in summary.items()]
+            print(f"{resolution:>10}: " + ", ".join(parts) + "  (p50/p95)")
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
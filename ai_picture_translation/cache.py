@@ -0,0 +1,172 @@
+"""
+翻译结果缓存
+两级缓存：内存LRU + 磁盘SQLite，按截图内容（降采样像素）、翻译模式、模型和细节级别寻址
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# 计算指纹时降采样后的最长边（像素）
+FINGERPRINT_MAX_SIDE = 512
+
+
+def image_fingerprint(image):
+    """计算截图内容指纹（降采样灰度像素的哈希），用于判断是否为相同画面"""
+    thumb = image.convert("L")
+    if max(thumb.size) > FINGERPRINT_MAX_SIDE:
+        scale = FINGERPRINT_MAX_SIDE / float(max(thumb.size))
+        new_size = (max(1, int(thumb.width * scale)), max(1, int(thumb.height * scale)))
+        thumb = thumb.resize(new_size, Image.BOX)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.width}x{image.height}|".encode("utf-8"))
+    digest.update(thumb.tobytes())
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """两级翻译缓存（内存LRU + 磁盘SQLite），线程安全"""
+    def __init__(self, db_path, memory_entries=64, max_disk_mb=50, max_age_days=7):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.puts_since_evict = 0
+        self.conn = None
+
+        try:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)")
+            self.conn.commit()
+            self.evict()
+        except sqlite3.Error as e:
+            # 磁盘缓存不可用时退化为纯内存缓存
+            print(f"打开翻译缓存失败（仅使用内存缓存）: {e}")
+            self.conn = None
+
+    @staticmethod
+    def make_key(image, mode, model, image_detail):
+        """生成缓存键：内容指纹 + 模式 + 模型 + 细节级别"""
+        return f"{image_fingerprint(image)}|{mode}|{model}|{image_detail}"
+
+    def get(self, key):
+        """查询缓存，未命中返回 None"""
+        with self.lock:
+            text = self.memory.get(key)
+            if text is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return text
+
+            if self.conn is not None:
+                try:
+                    row = self.conn.execute(
+                        "SELECT text, created FROM translations WHERE key = ?", (key,)
+                    ).fetchone()
+                    now = time.time()
+                    if row and now - row[1] <= self.max_age_seconds:
+                        self.conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+                        self.conn.commit()
+                        self._remember(key, row[0])
+                        self.hits += 1
+                        return row[0]
+                except sqlite3.Error as e:
+                    print(f"读取翻译缓存失败: {e}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        """写入缓存（内存和磁盘）"""
+        if not text:
+            return
+        with self.lock:
+            self._remember(key, text)
+            if self.conn is None:
+                return
+            now = time.time()
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO translations (key, text, created, last_used, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, text, now, now, len(text.encode("utf-8")))
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"写入翻译缓存失败: {e}")
+                return
+            self.puts_since_evict += 1
+
+        # 每写入若干条执行一次淘汰，避免每次都扫描
+        if self.puts_since_evict >= 20:
+            self.evict()
+
+    def _remember(self, key, text):
+        """放入内存LRU（调用方持有锁）"""
+        self.memory[key] = text
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        """按时间和总大小淘汰磁盘缓存"""
+        with self.lock:
+            self.puts_since_evict = 0
+            if self.conn is None:
+                return
+            try:
+                self.conn.execute("DELETE FROM translations WHERE created < ?",
+                                  (time.time() - self.max_age_seconds,))
+                total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+                if total > self.max_disk_bytes:
+                    # 从最久未使用的条目开始删除，直到总大小低于上限
+                    rows = self.conn.execute("SELECT key, size FROM translations ORDER BY last_used").fetchall()
+                    stale_keys = []
+                    for key, size in rows:
+                        if total <= self.max_disk_bytes:
+                            break
+                        stale_keys.append((key,))
+                        total -= size
+                    self.conn.executemany("DELETE FROM translations WHERE key = ?", stale_keys)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"清理翻译缓存失败: {e}")
+
+    def clear(self):
+        """清空所有缓存"""
+        with self.lock:
+            self.memory.clear()
+            if self.conn is not None:
+                try:
+                    self.conn.execute("DELETE FROM translations")
+                    self.conn.commit()
+                except sqlite3.Error as e:
+                    print(f"清空翻译缓存失败: {e}")
+
+    def stats(self):
+        """返回缓存命中统计"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self.memory),
+            }
+
+    def close(self):
+        """关闭磁盘连接"""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
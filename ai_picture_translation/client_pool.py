@@ -0,0 +1,176 @@
+"""
+OpenAI 客户端池
+按 (api_key, base_url) 复用客户端，保持 HTTP 长连接（连接池、TLS会话、DNS结果），避免每次翻译都重新握手。
+异步客户端的连接绑定在创建它的事件循环上，因此还要按事件循环区分。
+"""
+
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+
+
+def _load_openai():
+    """延迟导入 openai（导入较慢，首次创建客户端时才加载，不影响程序启动）"""
+    from openai import AsyncOpenAI
+    try:
+        import httpx
+        from openai import DefaultAsyncHttpxClient
+    except ImportError: # 旧版 openai 没有 DefaultAsyncHttpxClient，使用客户端默认的连接池
+        httpx = None
+        DefaultAsyncHttpxClient = None
+    return AsyncOpenAI, httpx, DefaultAsyncHttpxClient
+
+
+# 当前请求的指标字典，由发送请求的协程设置；连接追踪把新建连接的耗时写入其中
+request_metrics = contextvars.ContextVar("request_metrics", default=None)
+
+# httpcore 的连接事件：开始建立 TCP 连接，TCP 连接或 TLS 握手完成
+_CONNECT_STARTED = "connection.connect_tcp.started"
+_CONNECT_COMPLETE = ("connection.connect_tcp.complete", "connection.start_tls.complete")
+
+
+async def _trace_connect(request):
+    """httpx 请求钩子：通过 httpcore 的 trace 扩展记录建立连接（TCP+TLS）的耗时 connect_ms，复用长连接时为0"""
+    metrics = request_metrics.get()
+    if metrics is None:
+        return
+    metrics["connect_ms"] = 0.0
+    started = []
+
+    async def trace(event, info):
+        if event == _CONNECT_STARTED:
+            started.append(time.perf_counter())
+        elif event in _CONNECT_COMPLETE and started:
+            metrics["connect_ms"] = (time.perf_counter() - started[0]) * 1000
+
+    request.extensions["trace"] = trace
+
+
+def _mask_key(api_key):
+    """统计信息中隐藏 API Key"""
+    if not api_key:
+        return ""
+    return f"{api_key[:6]}...{api_key[-4:]}" if len(api_key) > 12 else "***"
+
+
+class ClientPool:
+    """线程安全的异步 OpenAI 客户端注册表，超出上限时关闭最久未使用的客户端
+
+    通过 lease() 使用的客户端在请求结束前不会被关闭：被淘汰或设置变更时先移出注册表，最后一个请求结束后再关闭
+    """
+    def __init__(self, max_clients=8, keepalive_seconds=90, max_connections=10):
+        self.max_clients = max_clients
+        self.keepalive_seconds = keepalive_seconds
+        self.max_connections = max_connections
+        self.lock = threading.Lock()
+        self.clients = OrderedDict() # (api_key, base_url, 事件循环) -> 客户端信息
+        self.retiring = [] # 已移出注册表、仍有请求在使用的客户端信息，请求结束后关闭
+        self.hits = 0
+        self.misses = 0
+        self.closed = 0
+
+    def _create_client(self, api_key, base_url, loop):
+        """创建客户端，尽量延长空闲连接的保持时间（httpx 默认只保持5秒）"""
+        AsyncOpenAI, httpx, DefaultAsyncHttpxClient = _load_openai()
+        if DefaultAsyncHttpxClient is not None:
+            http_client = DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_seconds
+            ), event_hooks={"request": [_trace_connect]})
+            return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        return AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    @contextmanager
+    def lease(self, api_key, base_url, loop=None):
+        """在 with 块中使用对应配置的异步客户端（不存在时创建），需在事件循环中调用；块结束前客户端不会被关闭"""
+        entry = self._acquire(api_key, base_url, loop or asyncio.get_running_loop())
+        try:
+            yield entry["client"]
+        finally:
+            with self.lock:
+                entry["in_use"] -= 1
+                if entry.get("retired") and entry["in_use"] == 0:
+                    self.retiring.remove(entry)
+                    self._close_entry(entry)
+
+    def _acquire(self, api_key, base_url, loop):
+        key = (api_key, base_url, loop)
+        with self.lock:
+            entry = self.clients.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.clients.move_to_end(key)
+            else:
+                self.misses += 1
+                entry = {"client": self._create_client(api_key, base_url, loop), "loop": loop,
+                         "created": time.time(), "requests": 0, "in_use": 0}
+                self.clients[key] = entry
+                while len(self.clients) > self.max_clients:
+                    _, stale = self.clients.popitem(last=False)
+                    self._retire_entry(stale)
+            entry["requests"] += 1
+            entry["in_use"] += 1
+            entry["last_used"] = time.time()
+            return entry
+
+    def retain(self, configs):
+        """设置变更后调用：只保留 configs 中各 (api_key, base_url) 的客户端（主服务和备用服务），其余关闭"""
+        configs = set(configs)
+        with self.lock:
+            for key in list(self.clients):
+                if key[:2] not in configs:
+                    self._retire_entry(self.clients.pop(key))
+
+    def _retire_entry(self, entry):
+        """移出注册表的客户端：空闲时立即关闭，仍有请求在使用时等请求结束后关闭（调用方持有锁）"""
+        if entry["in_use"]:
+            entry["retired"] = True
+            self.retiring.append(entry)
+        else:
+            self._close_entry(entry)
+
+    def close_all(self):
+        """关闭所有客户端，包括仍在使用的（程序退出时调用）"""
+        with self.lock:
+            while self.clients:
+                _, entry = self.clients.popitem(last=False)
+                self._close_entry(entry)
+            while self.retiring:
+                self._close_entry(self.retiring.pop())
+
+    def _close_entry(self, entry):
+        """关闭客户端连接（调用方持有锁）；客户端在其所属事件循环中关闭"""
+        try:
+            loop = entry["loop"]
+            if not loop.is_closed():
+                asyncio.run_coroutine_threadsafe(entry["client"].close(), loop)
+        except Exception as e:
+            print(f"关闭客户端失败: {e}")
+        self.closed += 1
+
+    def stats(self):
+        """返回连接池统计信息"""
+        with self.lock:
+            now = time.time()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "closed": self.closed,
+                "active": len(self.clients),
+                "retiring": len(self.retiring),
+                "clients": [
+                    {
+                        "base_url": base_url,
+                        "api_key": _mask_key(api_key),
+                        "requests": entry["requests"],
+                        "in_use": entry["in_use"],
+                        "age_seconds": round(now - entry["created"], 1),
+                        "idle_seconds": round(now - entry["last_used"], 1),
+                    }
+                    for (api_key, base_url, _), entry in self.clients.items()
+                ],
+            }
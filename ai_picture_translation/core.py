@@ -1,9 +1,15 @@
 import os
-import sys
 import base64
-from io import BytesIO
 import json
-from openai import OpenAI
+import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
+from app_paths import get_settings_path, get_data_path
+from client_pool import ClientPool, request_metrics
+from hedging import hedged_stream
+# 依赖 PIL / NumPy 的模块（cache、image_encoder、preprocess、tiles）和翻译记忆在首次使用时才导入，加快界面启动
 from tkinter import messagebox # 保持messagebox导入，因为save_settings中使用了
 
 # 默认API配置
@@ -22,15 +28,77 @@ DEFAULT_SETTINGS = {
     "area_screenshot_hotkey": "f1",
     "translation_mode": "zh-en",
     "model": "Qwen/Qwen2.5-VL-32B-Instruct",
+    # 图像细节级别："high"、"low" 或 "auto"（按文字大小和密度自动选择）
     "image_detail": "high",
     "result_opacity": 0.90,
     "auto_minimize": True,
     "api_key": DEFAULT_API_KEY,
     "base_url": DEFAULT_BASE_URL,
     "custom_models": [],
-    "use_streaming": True
+    "use_streaming": True,
+    # 翻译缓存：相同画面重复截图时直接返回已有结果
+    "use_cache": True,
+    "cache_memory_entries": 64,
+    "cache_max_disk_mb": 50,
+    "cache_max_age_days": 7,
+    # 上传图片编码："auto" 按内容和字节预算自动选择格式，"png" 为无损PNG
+    "image_format": "auto",
+    "upload_max_bytes": 1500000,
+    # 上传前自动裁掉无文字的空白区域
+    "auto_trim": True,
+    "trim_margin": 16,
+    # 分块并行翻译：超大截图切分为多个分块并发请求
+    "tile_mode": False,
+    "tile_min_pixels": 4000000,
+    "tile_size": 1280,
+    "tile_max_workers": 4,
+    "tile_min_std": 6.0,
+    # HTTP长连接：空闲连接保持时间（秒）
+    "http_keepalive_seconds": 90,
+    # 单次翻译请求的超时时间（秒）
+    "request_timeout": 120,
+    # 对冲请求：主服务在指定时间内没有输出第一个Token时，同时请求备用服务，采用先输出的一方
+    "hedge_enabled": False,
+    "hedge_delay_ms": 1500,
+    "hedge_base_url": "https://openrouter.ai/api/v1",
+    "hedge_api_key": "",
+    "hedge_model": "",
+    # 流式输出时界面刷新的最高帧率
+    "ui_fps": 30,
+    # 主窗口翻译历史：内存中保留的记录数和文本框中同时显示的记录数
+    "history_memory_entries": 200,
+    "history_display_entries": 50,
+    # 预先创建并复用的隐藏结果窗口数量
+    "result_window_pool_size": 2,
+    # 同时进行的翻译任务数上限，以及快捷键防抖间隔（毫秒）
+    "max_concurrent_jobs": 2,
+    "hotkey_debounce_ms": 400,
+    # 单实例模式：再次启动时把命令转发给已运行的程序
+    "single_instance": True,
+    # 区域监视：保存的区域（截图像素坐标）、截取间隔和判定为变化的像素比例
+    "watch_region": None,
+    "watch_window_position": None,
+    "watch_interval_ms": 1000,
+    "watch_change_ratio": 0.002,
+    # 结构化模式：模型按片段返回原文和译文，译文保存到翻译记忆；
+    # 只有原文事先已知（本地OCR识别出文字）时才能查询翻译记忆，只翻译记忆中没有的片段，视觉请求每次都完整翻译
+    "segment_mode": False,
+    # 翻译记忆默认只复用同一模型的译文；为 True 时也复用其它模型（例如视觉模型）的译文
+    "translation_memory_any_model": False,
+    # 本地OCR："none" 不使用，"tesseract" 需安装 pytesseract；识别置信度达到阈值时只把文字发送给文本模型
+    "ocr_engine": "none",
+    "ocr_min_confidence": 0.80,
+    "ocr_text_model": "", # 为空时使用翻译模型
+
+    # 请求指标：按模型和服务汇总最近的样本，导出 Prometheus 文本文件和 JSON（目录为空时与设置文件同目录）
+    "metrics_enabled": True,
+    "metrics_window": 1000,
+    "metrics_export_dir": ""
 }
 
+# 翻译失败时返回文本的前缀
+TRANSLATION_ERROR_PREFIX = "翻译失败"
+
 # 可用的模型列表 (不包含 "自定义模型" 选项，这个由GUI处理)
 AVAILABLE_MODELS_CORE = [
     "Qwen/Qwen2.5-VL-32B-Instruct",
@@ -44,11 +112,6 @@ AVAILABLE_MODELS_CORE = [
     "qwen/qwen-2.5-vl-7b-instruct:free",
 ]
 
-def get_settings_path():
-    """获取设置文件的路径"""
-    return os.path.join(os.path.dirname(sys.executable
-        if getattr(sys, 'frozen', False) else os.path.dirname(__file__)), "settings.json")
-
 def load_settings():
     """加载设置"""
     settings_file = get_settings_path()
@@ -95,77 +158,671 @@ def get_all_models_for_gui(custom_models_list):
     all_models.append("自定义模型") # 最后添加选项
     return all_models
 
-def convert_image_to_base64(image):
-    """将PIL图像转换为Base64编码"""
-    buffered = BytesIO()
-    image.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return img_str
+def merge_options(options):
+    """合并高级选项与默认设置，确保所有键都存在"""
+    merged = DEFAULT_SETTINGS.copy()
+    if options:
+        merged.update(options)
+    return merged
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
+def get_translation_cache(options=None):
+    """获取全局翻译缓存（首次调用时创建）"""
+    global _translation_cache
+    with _translation_cache_lock:
+        if _translation_cache is None:
+            from cache import TranslationCache
+            opts = merge_options(options)
+            _translation_cache = TranslationCache(
+                get_data_path("translation_cache.db"),
+                memory_entries=opts["cache_memory_entries"],
+                max_disk_mb=opts["cache_max_disk_mb"],
+                max_age_days=opts["cache_max_age_days"]
+            )
+        return _translation_cache
+
+_translation_memory = None
+_translation_memory_lock = threading.Lock()
+
+def get_translation_memory():
+    """获取全局翻译记忆（首次调用时创建）"""
+    global _translation_memory
+    with _translation_memory_lock:
+        if _translation_memory is None:
+            from translation_memory import TranslationMemory
+            _translation_memory = TranslationMemory(get_data_path("translation_memory.db"))
+        return _translation_memory
+
+_metrics_collector = None
+_metrics_collector_lock = threading.Lock()
+
+def get_metrics_collector(options=None):
+    """获取全局请求指标收集器（首次调用时创建）"""
+    global _metrics_collector
+    with _metrics_collector_lock:
+        if _metrics_collector is None:
+            from request_metrics import MetricsCollector
+            opts = merge_options(options)
+            _metrics_collector = MetricsCollector(opts["metrics_export_dir"] or os.path.dirname(get_settings_path()),
+                                                  window=opts["metrics_window"])
+        return _metrics_collector
 
-def analyze_and_translate_image(image, mode, api_key, base_url, model, image_detail, use_streaming, callback=None):
-    """使用视觉AI模型分析图片内容并翻译，支持流式输出"""
+def flush_metrics():
+    """导出尚未写入的请求指标（程序退出时调用）"""
+    with _metrics_collector_lock:
+        collector = _metrics_collector
+    if collector is not None:
+        collector.flush()
+
+def record_request_metrics(metrics, outcome, model, base_url, options=None):
+    """记录一次翻译请求的指标（模型和服务缺省取请求参数，对冲请求时为实际采用的一方）"""
+    from request_metrics import provider_name
+    opts = merge_options(options)
+    if not opts["metrics_enabled"]:
+        return
+    metrics.setdefault("model", model)
+    metrics.setdefault("provider", provider_name(base_url))
+    metrics["outcome"] = outcome
+    get_metrics_collector(opts).record(metrics)
+
+def encode_image_for_upload(image, options=None):
+    """按设置编码截图，返回 (Base64字符串, 编码信息)"""
+    from image_encoder import encode_image
+    opts = merge_options(options)
+    encoded = encode_image(image, opts["image_format"], opts["upload_max_bytes"])
+    print(f"图片编码: {encoded.format}"
+          f"{' q=' + str(encoded.quality) if encoded.quality else ''}, "
+          f"{encoded.size / 1024:.1f}KB, 用时 {encoded.encode_ms:.1f}ms")
+    img_str = base64.b64encode(encoded.data).decode("utf-8")
+    return img_str, encoded
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+def get_client_pool(options=None):
+    """获取全局客户端池（首次调用时创建）"""
+    global _client_pool
+    with _client_pool_lock:
+        if _client_pool is None:
+            opts = merge_options(options)
+            _client_pool = ClientPool(keepalive_seconds=opts["http_keepalive_seconds"])
+        return _client_pool
+
+def reset_clients(api_key, base_url, options=None):
+    """API 设置变更后调用，关闭旧配置的客户端（保留主服务和已配置的备用服务，进行中的请求结束后才关闭）"""
+    opts = merge_options(options)
+    configs = [(api_key, base_url)]
+    if opts["hedge_enabled"] and opts["hedge_api_key"] and opts["hedge_base_url"]:
+        configs.append((opts["hedge_api_key"], opts["hedge_base_url"]))
+    get_client_pool().retain(configs)
+
+def close_clients():
+    """关闭所有客户端连接"""
+    get_client_pool().close_all()
+
+def warm_up_connection(api_key, base_url, options=None):
+    """预先建立到 API 服务的连接（TLS握手），使第一次翻译无需等待握手"""
     if not api_key or not base_url:
-        return "翻译失败: API Key 或 Base URL 未配置。"
+        return
+
+    async def list_models():
+        with get_client_pool(options).lease(api_key, base_url) as client:
+            await client.with_options(timeout=10).models.list()
 
-    base64_image = convert_image_to_base64(image)
+    try:
+        run_in_background_loop(list_models()).result()
+        print("API 连接预热完成")
+    except Exception as e:
+        # 部分服务不支持列出模型，连接本身通常已经建立，忽略错误
+        print(f"API 连接预热: {e}")
 
-    # 根据翻译模式设置提示词
+def convert_image_to_base64(image, options=None):
+    """将PIL图像转换为Base64编码（格式按设置自动选择）"""
+    img_str, _ = encode_image_for_upload(image, options)
+    return img_str
+
+def build_prompt(mode):
+    """根据翻译模式生成提示词"""
     if mode == "zh-en":
-        prompt = "这张截图中有文本内容。请提取出所有文本，然后将其翻译成英文。只返回翻译结果，不要有其他解释。"
+        return "这张截图中有文本内容。请提取出所有文本，然后将其翻译成英文。只返回翻译结果，不要有其他解释。"
     elif mode == "en-zh":
-        prompt = "This screenshot contains text. Please extract all the text and translate it to Chinese. Only return the translation result without any explanation.The content should make sense.Colloquial: Use natural Chinese expressions, consistent with the character's personality."
+        return "This screenshot contains text. Please extract all the text and translate it to Chinese. Only return the translation result without any explanation.The content should make sense.Colloquial: Use natural Chinese expressions, consistent with the character's personality."
     else: # 默认或未知模式
-        prompt = "Please extract all the text from this image and translate it."
+        return "Please extract all the text from this image and translate it."
 
-    try:
-        # 在函数内部创建客户端，确保使用最新的配置
-        client = OpenAI(api_key=api_key, base_url=base_url)
-
-        # 构建请求
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{base64_image}",
-                            "detail": image_detail
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": prompt
+def build_segment_prompt(mode):
+    """结构化模式的提示词：逐行输出原文片段和译文的 JSON 对象"""
+    if mode == "zh-en":
+        return ("这张截图中有文本内容。请按阅读顺序提取所有文本，按行或界面元素分成片段，逐个翻译成英文。"
+                "每个片段单独输出一行 JSON 对象：{\"source\": \"原文\", \"target\": \"译文\"}。"
+                "不要输出代码块、数组或其他解释。")
+    elif mode == "en-zh":
+        return ("This screenshot contains text. Extract all the text in reading order, split it into segments "
+                "(one per line or UI element) and translate each segment to natural, colloquial Chinese. "
+                "Output one JSON object per line: {\"source\": \"original text\", \"target\": \"translation\"}. "
+                "Do not output code fences, arrays or any explanation.")
+    else:
+        return ("Extract all the text from this image in reading order, split it into segments and translate each one. "
+                "Output one JSON object per line: {\"source\": \"original text\", \"target\": \"translation\"}.")
+
+def build_segment_text_messages(sources, mode):
+    """构建纯文本翻译请求：已知原文片段按编号发送，要求逐行返回 {"id", "target"}"""
+    target_language = {"zh-en": "English", "en-zh": "natural, colloquial Chinese"}.get(mode, "the target language")
+    items = "\n".join(json.dumps({"id": index, "source": source}, ensure_ascii=False)
+                      for index, source in enumerate(sources))
+    prompt = (f"Translate the \"source\" of each JSON line below to {target_language}. "
+              "Output one JSON object per line in the same order: {\"id\": id, \"target\": \"translation\"}. "
+              "Do not output code fences or any explanation.\n\n" + items)
+    return [{"role": "user", "content": prompt}]
+
+def build_messages(base64_image, mime, image_detail, prompt):
+    """构建视觉模型请求消息"""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime};base64,{base64_image}",
+                        "detail": image_detail
                     }
-                ]
-            }
-        ]
+                },
+                {
+                    "type": "text",
+                    "text": prompt
+                }
+            ]
+        }
+    ]
+
+def recognize_text(image, mode, options=None, metrics=None):
+    """用设置的本地OCR引擎识别截图文字，识别可信时返回文字行列表，否则返回 None（应改用视觉模型）"""
+    from ocr import get_engine
+    opts = merge_options(options)
+    if metrics is None:
+        metrics = {}
+    engine = get_engine(opts["ocr_engine"])
+    if engine is None:
+        metrics["ocr"] = "unavailable"
+        return None
+    try:
+        result = engine.recognize(image, mode)
+    except Exception as e:
+        print(f"OCR识别失败，改用视觉模型: {e}")
+        metrics["ocr"] = "error"
+        return None
+    metrics.update({"ocr_ms": result.ocr_ms, "ocr_confidence": result.confidence})
+    if not result.lines or result.confidence < opts["ocr_min_confidence"]:
+        print(f"OCR置信度 {result.confidence:.2f}（{len(result.lines)} 行），改用视觉模型")
+        metrics["ocr"] = "low_confidence"
+        return None
+    print(f"OCR识别 {len(result.lines)} 行，置信度 {result.confidence:.2f}，用时 {result.ocr_ms:.0f}ms，发送文字翻译")
+    metrics["ocr"] = "used"
+    metrics["path"] = "ocr"
+    return result.lines
+
+async def _with_deadline(awaitable, deadline):
+    """在截止时间前等待，超时抛出 asyncio.TimeoutError"""
+    if deadline is None:
+        return await awaitable
+    remaining = deadline - asyncio.get_running_loop().time()
+    if remaining <= 0:
+        raise asyncio.TimeoutError()
+    return await asyncio.wait_for(awaitable, remaining)
+
+async def _stream_tiles(image, mode, api_key, base_url, model, image_detail, use_streaming, opts, result):
+    """分块并行翻译超大截图，按阅读顺序产出增量文本；result["complete"] 记录是否全部分块成功"""
+    # 分块本身不再继续分块；分块结果同样写入缓存，重复的分块可以直接命中
+    tile_opts = dict(opts)
+    tile_opts["tile_mode"] = False
+    tile_opts["ocr_engine"] = "none" # 整图OCR不可信时分块也不再识别
+    queue = asyncio.Queue()
+    failed = []
+
+    async def translate_tile(tile, tile_callback):
+        parts = []
+        try:
+            async for delta in stream_translate_image(tile, mode, api_key, base_url, model, image_detail,
+                                                      use_streaming, tile_opts):
+                parts.append(delta)
+                if tile_callback:
+                    tile_callback(delta)
+            return "".join(parts)
+        except Exception as e:
+            error_text = f"{TRANSLATION_ERROR_PREFIX}: {str(e)}"
+            failed.append(e)
+            # 出错的分块把错误信息补到结果中
+            if tile_callback and not parts:
+                tile_callback(error_text)
+            return "".join(parts) or error_text
+
+    from tiles import translate_in_tiles
+    tiles_task = asyncio.ensure_future(translate_in_tiles(
+        image, translate_tile, queue.put_nowait if use_streaming else None,
+        tile_size=opts["tile_size"], max_workers=opts["tile_max_workers"], min_std=opts["tile_min_std"]
+    ))
+    tiles_task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            delta = await queue.get()
+            if delta is None:
+                break
+            yield delta
+        full_text, results = tiles_task.result()
+    finally:
+        if not tiles_task.done():
+            tiles_task.cancel()
+
+    # 所有分块都失败时只报告第一个错误
+    if failed and len(failed) == len(results):
+        raise failed[0]
+    if not use_streaming:
+        yield full_text
+    result["complete"] = not failed
+
+async def stream_translate_image(image, mode, api_key, base_url, model, image_detail, use_streaming=True,
+                                 options=None, timeout=None, metrics=None):
+    """异步翻译截图，以异步迭代器逐块产出增量文本
+
+    use_streaming 为 False 时一次性产出完整结果；timeout 为整个请求的超时时间（秒），
+    超时抛出 asyncio.TimeoutError。取消所在任务会立即中断 HTTP 流。
+    出错时抛出异常（同步接口 analyze_and_translate_image 会将其转换为错误文本）。
+    metrics 为字典时写入各阶段耗时和数据量（encode_ms、image_bytes、ttft_ms、total_ms 等）。
+    """
+    if not api_key or not base_url:
+        raise ValueError("API Key 或 Base URL 未配置。")
+
+    opts = merge_options(options)
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    if metrics is None:
+        metrics = {}
+    metrics["cache_hit"] = False
+    if timeout is None:
+        timeout = opts["request_timeout"]
+    deadline = loop.time() + timeout if timeout else None
 
-        if use_streaming and callback:
+    # 查询翻译缓存，命中时一次性产出结果（图片处理在线程池中进行，不阻塞事件循环）
+    cache = get_translation_cache(opts) if opts["use_cache"] else None
+    cache_key = None
+    if cache is not None:
+        cache_key = await loop.run_in_executor(None, cache.make_key, image, mode, model, image_detail)
+        cached_text = await loop.run_in_executor(None, cache.get, cache_key)
+        if cached_text is not None:
+            print("翻译缓存命中")
+            metrics["cache_hit"] = True
+            metrics["ttft_ms"] = metrics["total_ms"] = (time.perf_counter() - started) * 1000
+            metrics["chars"] = len(cached_text)
+            yield cached_text
+            return
+
+    # 裁掉空白区域以减少上传字节和视觉Token
+    if opts["auto_trim"]:
+        from preprocess import trim_to_text_region
+        trim_start = time.perf_counter()
+        image, _ = await loop.run_in_executor(None, trim_to_text_region, image, opts["trim_margin"])
+        metrics["trim_ms"] = (time.perf_counter() - trim_start) * 1000
+    metrics["pixels"] = image.width * image.height
+    metrics["path"] = "vision"
+    metrics["image_detail"] = image_detail
+
+    # 本地OCR识别可信时只把文字发送给文本模型，不再上传图片
+    lines = None
+    if opts["ocr_engine"] != "none":
+        lines = await loop.run_in_executor(None, recognize_text, image, mode, opts, metrics)
+    if lines:
+        parts = []
+        remaining = max(0.001, deadline - loop.time()) if deadline else 0
+        try:
+            async for delta in stream_translate_segments(lines, mode, api_key, base_url, opts["ocr_text_model"] or model,
+                                                         use_streaming, opts, remaining, metrics):
+                if not parts:
+                    metrics["ttft_ms"] = (time.perf_counter() - started) * 1000
+                parts.append(delta)
+                yield delta
+        except asyncio.TimeoutError:
+            raise
+        except Exception as e:
+            # 文字请求在输出任何内容前失败（例如文本模型不存在）时改用视觉模型；已输出部分结果时不再重试
+            if parts:
+                raise
+            print(f"文字翻译失败，改用视觉模型: {e}")
+            metrics.update({"ocr": "text_failed", "path": "vision"})
+        else:
+            metrics["total_ms"] = (time.perf_counter() - started) * 1000
+            metrics["chars"] = len("".join(parts))
+            if cache is not None:
+                cache.put(cache_key, "".join(parts))
+            return
+
+    # 超大截图按分块并行翻译
+    if opts["tile_mode"] and image.width * image.height >= opts["tile_min_pixels"]:
+        parts = []
+        tile_result = {"complete": False}
+        metrics["tiled"] = True
+        async for delta in _stream_tiles(image, mode, api_key, base_url, model, image_detail,
+                                         use_streaming, opts, tile_result):
+            if not parts:
+                metrics["ttft_ms"] = (time.perf_counter() - started) * 1000
+            parts.append(delta)
+            yield delta
+        metrics["total_ms"] = (time.perf_counter() - started) * 1000
+        metrics["chars"] = len("".join(parts))
+        if cache is not None and tile_result["complete"]:
+            cache.put(cache_key, "".join(parts))
+        return
+
+    # 自动细节级别：根据文字行高和密度选择 low 或 high
+    if image_detail == "auto":
+        from preprocess import choose_image_detail
+        image_detail, text_stats = await loop.run_in_executor(None, choose_image_detail, image)
+        metrics.update({
+            "image_detail": image_detail,
+            "detail_auto": True,
+            "text_line_height": text_stats.line_height,
+            "text_lines": text_stats.lines,
+            "edge_density": round(text_stats.edge_density, 4),
+            "detail_ms": text_stats.analysis_ms,
+        })
+        print(f"自动细节级别: {image_detail}（行高 {text_stats.line_height}px，{text_stats.lines} 行，"
+              f"边缘密度 {text_stats.edge_density:.3f}，用时 {text_stats.analysis_ms:.1f}ms）")
+
+    base64_image, encoded = await loop.run_in_executor(None, encode_image_for_upload, image, opts)
+    metrics.update({
+        "encode_ms": encoded.encode_ms,
+        "image_format": encoded.format,
+        "image_bytes": encoded.size,
+        "base64_bytes": len(base64_image),
+    })
+    prompt = build_segment_prompt(mode) if opts["segment_mode"] else build_prompt(mode)
+    messages = build_messages(base64_image, encoded.mime, image_detail, prompt)
+    stream = _request_stream(api_key, base_url, model, messages, use_streaming, deadline, opts, metrics)
+    if opts["segment_mode"]:
+        stream = _stream_segments(stream, mode, model, metrics)
+
+    full_text = ""
+    request_start = time.perf_counter()
+    async for content in stream:
+        if not full_text:
+            metrics["ttft_ms"] = (time.perf_counter() - started) * 1000
+            metrics["request_ttft_ms"] = (time.perf_counter() - request_start) * 1000
+        full_text += content
+        # 只产出增量内容
+        yield content
+    metrics["total_ms"] = (time.perf_counter() - started) * 1000
+    metrics["chars"] = len(full_text)
+    if cache is not None:
+        cache.put(cache_key, full_text)
+
+def _request_stream(api_key, base_url, model, messages, use_streaming, deadline, opts, metrics=None):
+    """发送请求，返回增量文本的异步迭代器；配置了备用服务时使用对冲请求，否则直接请求主服务
+
+    metrics 为字典时写入实际采用的模型（model）、服务（provider）、响应头耗时（headers_ms）和Token数（tokens）
+    """
+    from request_metrics import provider_name
+    if metrics is None:
+        metrics = {}
+    metrics.update({"model": model, "provider": provider_name(base_url)})
+    if not (opts["hedge_enabled"] and opts["hedge_api_key"] and opts["hedge_base_url"]):
+        return _stream_completion(api_key, base_url, model, messages, use_streaming, deadline, opts, metrics)
+
+    # 对冲请求的两方分别记录，结束时把胜出方的数据写入 metrics
+    hedge_model = opts["hedge_model"] or model
+    attempts = [{"model": model}, {"model": hedge_model}]
+    primary = (base_url, lambda: _stream_completion(
+        api_key, base_url, model, messages, use_streaming, deadline, opts, attempts[0]))
+    secondary = (opts["hedge_base_url"], lambda: _stream_completion(
+        opts["hedge_api_key"], opts["hedge_base_url"], hedge_model, messages, use_streaming, deadline, opts, attempts[1]))
+
+    async def hedged():
+        winner = []
+
+        def on_winner(name):
+            print(f"对冲请求: 采用 {name} 的结果")
+            winner.append(name)
+
+        try:
+            async for delta in hedged_stream(primary, secondary, opts["hedge_delay_ms"] / 1000.0, on_winner=on_winner):
+                yield delta
+        finally:
+            if winner:
+                hedged_won = winner[0] != base_url
+                metrics.update(attempts[1 if hedged_won else 0])
+                metrics.update({"provider": provider_name(winner[0]), "hedged": hedged_won})
+
+    return hedged()
+
+async def _stream_segments(stream, mode, model, metrics):
+    """把结构化模式的 JSON Lines 响应转换为逐行译文，并把 (原文, 译文) 保存到翻译记忆"""
+    from translation_memory import SegmentStreamParser
+    parser = SegmentStreamParser()
+    pairs = []
+    lines = 0
+
+    def accept(segments):
+        """返回要输出的文字；无法解析为片段的行（source 为 None）原样输出，但不写入翻译记忆"""
+        nonlocal lines
+        output = []
+        for source, target in segments:
+            output.append(("\n" if lines else "") + target)
+            lines += 1
+            if source is not None:
+                pairs.append((source, target))
+        return "".join(output)
+
+    async for delta in stream:
+        text = accept(parser.feed(delta))
+        if text:
+            yield text
+    text = accept(parser.close())
+    if text:
+        yield text
+    if not pairs:
+        # 模型没有按格式返回，直接显示原始结果
+        print("结构化模式: 无法解析模型返回的片段，显示原始结果")
+        yield parser.text
+        return
+    metrics["segments"] = len(pairs)
+    saved = get_translation_memory().put_many(pairs, mode, model)
+    print(f"结构化模式: {len(pairs)} 个片段，{saved} 个写入翻译记忆")
+
+async def stream_translate_segments(sources, mode, api_key, base_url, model, use_streaming=True,
+                                    options=None, timeout=None, metrics=None):
+    """翻译已知的原文片段（纯文本请求），按原文顺序逐行产出译文
+
+    开启结构化模式（segment_mode）时先查询翻译记忆，只把未命中的片段发送给模型，全部命中时不发送请求；
+    新的译文写入翻译记忆。模型漏掉的片段保留原文。metrics 为字典时写入 segments、tm_hits、ttft_ms、total_ms 等
+    """
+    from translation_memory import SegmentStreamParser, normalize_segment
+    opts = merge_options(options)
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    if metrics is None:
+        metrics = {}
+    if timeout is None:
+        timeout = opts["request_timeout"]
+    deadline = loop.time() + timeout if timeout else None
+
+    sources = [normalize_segment(source) for source in sources]
+    sources = [source for source in sources if source]
+    memory = get_translation_memory() if opts["segment_mode"] else None
+    known = {}
+    if memory:
+        known = await loop.run_in_executor(None, memory.lookup, sources, mode, model,
+                                           opts["translation_memory_any_model"])
+    # 重复的片段只翻译一次
+    missing = [source for source in dict.fromkeys(sources) if source not in known]
+    metrics.update({"segments": len(sources), "tm_hits": sum(source in known for source in sources)})
+    if memory:
+        print(f"翻译记忆: {len(sources)} 个片段，命中 {metrics['tm_hits']} 个，需翻译 {len(missing)} 个")
+
+    emitted = 0
+
+    def flush():
+        """按原文顺序产出已有译文的片段，遇到尚未翻译的片段为止"""
+        nonlocal emitted
+        lines = []
+        while emitted < len(sources) and sources[emitted] in known:
+            lines.append(known[sources[emitted]])
+            emitted += 1
+        return lines
+
+    output = []
+    for line in flush():
+        output.append(line)
+        yield ("\n" if len(output) > 1 else "") + line
+    if missing:
+        messages = build_segment_text_messages(missing, mode)
+        parser = SegmentStreamParser()
+        translated = []
+
+        def accept(segments):
+            for index, target in segments:
+                if isinstance(index, int) and 0 <= index < len(missing) and missing[index] not in known:
+                    known[missing[index]] = target.strip()
+                    translated.append((missing[index], target))
+            return flush()
+
+        stream = _request_stream(api_key, base_url, model, messages, use_streaming, deadline, opts, metrics)
+        async for delta in stream:
+            for line in accept(parser.feed(delta)):
+                if not output:
+                    metrics["ttft_ms"] = (time.perf_counter() - started) * 1000
+                output.append(line)
+                yield ("\n" if len(output) > 1 else "") + line
+        lines = accept(parser.close())
+        # 模型漏掉的片段保留原文，不写入翻译记忆
+        for source in missing:
+            known.setdefault(source, source)
+        for line in lines + flush():
+            output.append(line)
+            yield ("\n" if len(output) > 1 else "") + line
+        if memory:
+            await loop.run_in_executor(None, memory.put_many, translated, mode, model)
+    metrics.setdefault("ttft_ms", (time.perf_counter() - started) * 1000)
+    metrics["total_ms"] = (time.perf_counter() - started) * 1000
+    metrics["chars"] = len("\n".join(output))
+
+async def _stream_completion(api_key, base_url, model, messages, use_streaming, deadline, opts, metrics=None):
+    """向单个服务发送请求，逐块产出增量文本（非流式时一次性产出完整结果）
+
+    metrics 为字典时写入 connect_ms（新建连接耗时，复用长连接时为0）、headers_ms（发出请求到收到响应头，含建立连接和服务端排队）
+    和 tokens（流式时按内容块计数，非流式取 usage）
+    """
+    if metrics is None:
+        metrics = {}
+    # 从客户端池借用客户端，复用已建立的长连接；请求结束前客户端不会因设置变更或淘汰而被关闭
+    with get_client_pool(opts).lease(api_key, base_url) as client:
+        request_start = time.perf_counter()
+        # 客户端的请求钩子通过上下文变量找到本次请求的 metrics，写入建立连接的耗时
+        metrics_token = request_metrics.set(metrics)
+
+        if use_streaming:
             # 使用流式输出
-            full_text = ""
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                stream=True
-            )
-            for chunk in response:
-                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    if content: # 确保 content 不为空
-                        full_text += content
-                        if callback:
-                            # 回调只传递增量内容
-                            callback(content)
-            return full_text # 流式结束后返回完整文本
+            try:
+                response = await _with_deadline(client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True
+                ), deadline)
+            finally:
+                request_metrics.reset(metrics_token)
+            metrics["headers_ms"] = (time.perf_counter() - request_start) * 1000
+            metrics["tokens"] = 0
+            try:
+                while True:
+                    try:
+                        chunk = await _with_deadline(response.__anext__(), deadline)
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                        metrics["tokens"] += 1
+                        yield chunk.choices[0].delta.content
+            finally:
+                # 正常结束、取消或超时都关闭 HTTP 流，释放连接
+                await response.close()
         else:
             # 非流式输出
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages
-            )
-            translated_text = response.choices[0].message.content
-            return translated_text
+            try:
+                response = await _with_deadline(client.chat.completions.create(
+                    model=model,
+                    messages=messages
+                ), deadline)
+            finally:
+                request_metrics.reset(metrics_token)
+            metrics["headers_ms"] = (time.perf_counter() - request_start) * 1000
+            if getattr(response, "usage", None) and response.usage.completion_tokens:
+                metrics["tokens"] = response.usage.completion_tokens
+            yield response.choices[0].message.content
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
 
+def get_background_loop():
+    """获取后台事件循环（在守护线程中运行），同步接口的请求都在这里执行"""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="translation-loop", daemon=True).start()
+        return _background_loop
+
+def run_in_background_loop(coro):
+    """在后台事件循环中运行协程，返回 concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+
+def analyze_and_translate_image(image, mode, api_key, base_url, model, image_detail, use_streaming, callback=None,
+                                options=None, job=None, metrics=None):
+    """使用视觉AI模型分析图片内容并翻译，支持流式输出
+
+    同步接口：在后台事件循环中运行 stream_translate_image，增量内容在调用线程中交给 callback。
+    options 为高级选项（缓存等），缺省项取自 DEFAULT_SETTINGS；
+    job 为 jobs.TranslationJob，取消任务会立即中断请求，此时返回 None；
+    metrics 为字典时写入各阶段耗时和数据量（可预先填入 capture_ms 等调用方测得的数据），
+    结束后连同模型、服务和结果（ok/error/timeout/cancelled）记录到请求指标
+    """
+    if not api_key or not base_url:
+        return f"{TRANSLATION_ERROR_PREFIX}: API Key 或 Base URL 未配置。"
+
+    streaming = bool(use_streaming and callback)
+    deltas = queue.Queue()
+    if metrics is None:
+        metrics = {}
+
+    async def pump():
+        async for delta in stream_translate_image(image, mode, api_key, base_url, model, image_detail,
+                                                  streaming, options, metrics=metrics):
+            deltas.put(delta)
+
+    future = run_in_background_loop(pump())
+    future.add_done_callback(lambda _: deltas.put(None))
+    if job is not None:
+        job.attach(future)
+
+    parts = []
+    while True:
+        delta = deltas.get()
+        if delta is None:
+            break
+        if job is not None:
+            if job.cancelled:
+                continue
+            job.record_chunk(delta)
+        parts.append(delta)
+        if streaming:
+            # 回调只传递增量内容
+            callback(delta)
+
+    try:
+        future.result()
+        result, outcome = "".join(parts), "ok" # 返回完整文本
+    except concurrent.futures.CancelledError:
+        result, outcome = None, "cancelled"
     except Exception as e:
-        return f"翻译失败: {str(e)}"
\ No newline at end of file
+        result = f"{TRANSLATION_ERROR_PREFIX}: {str(e) or type(e).__name__}"
+        outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+    record_request_metrics(metrics, outcome, model, base_url, options)
+    return result
@@ -1,59 +1,114 @@
+# 启动耗时分析需要最先导入，之后的导入都会被计时
+from startup_profile import profiler
+profiler.install_import_hook()
+
+if __name__ == "__main__":
+    # 已有实例在运行时把命令转发给它并立即退出，不再导入其它模块
+    from single_instance import main_or_forward
+    startup_command = main_or_forward()
+
 import os
 import sys
 import time
 import threading
-import keyboard
-import pyautogui
-import pyperclip
-from PIL import Image, ImageGrab
+import concurrent.futures
+# keyboard、pyautogui、pyperclip、PIL 等较慢的模块在使用时才导入，并在启动后由后台线程预先加载
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import ttk, messagebox, Text, Button, Label, Frame, Entry, Toplevel, StringVar, Scale, IntVar, DoubleVar, HORIZONTAL, Checkbutton
 
 # 从 core.py 导入核心功能和设置
 from core import (
     load_settings, save_settings, analyze_and_translate_image,
     DEFAULT_SETTINGS, DEFAULT_API_KEY, DEFAULT_BASE_URL, BASE_URL_OPTIONS,
-    is_custom_model, get_all_models_for_gui, AVAILABLE_MODELS_CORE
+    is_custom_model, get_all_models_for_gui, AVAILABLE_MODELS_CORE,
+    reset_clients, close_clients, get_client_pool, warm_up_connection, get_data_path, TRANSLATION_ERROR_PREFIX,
+    get_metrics_collector, flush_metrics
+)
+from jobs import JobRegistry, JobScheduler, CANCEL_WINDOW_CLOSED, CANCEL_SUPERSEDED, CANCEL_SHUTDOWN
+from ui_dispatcher import UIDispatcher
+from text_layout import TextLayoutTracker
+from history import TranslationHistory, HistoryView
+from history_store import HistoryStore
+from ocr import engine_names
+from single_instance import (
+    InstanceServer, COMMAND_SHOW, COMMAND_TRANSLATE_FILE, COMMAND_CAPTURE_FULL, COMMAND_CAPTURE_AREA
 )
 
 # --- 全局设置变量 ---
-# 加载设置并解包到全局变量
-settings = load_settings()
-screenshot_hotkey = settings.get("screenshot_hotkey", DEFAULT_SETTINGS["screenshot_hotkey"])
-area_screenshot_hotkey = settings.get("area_screenshot_hotkey", DEFAULT_SETTINGS["area_screenshot_hotkey"])
-translation_mode = settings.get("translation_mode", DEFAULT_SETTINGS["translation_mode"])
-model = settings.get("model", DEFAULT_SETTINGS["model"])
-image_detail = settings.get("image_detail", DEFAULT_SETTINGS["image_detail"])
-result_opacity = settings.get("result_opacity", DEFAULT_SETTINGS["result_opacity"])
-auto_minimize = settings.get("auto_minimize", DEFAULT_SETTINGS["auto_minimize"])
-api_key = settings.get("api_key", DEFAULT_SETTINGS["api_key"])
-base_url = settings.get("base_url", DEFAULT_SETTINGS["base_url"])
-custom_models = settings.get("custom_models", DEFAULT_SETTINGS["custom_models"]) # 加载历史自定义模型
-use_streaming = settings.get("use_streaming", DEFAULT_SETTINGS["use_streaming"])
-print("GUI: 设置加载完成")
+# 导入本模块时不读取设置文件，由 load_global_settings() 在程序入口加载
+settings = {}
+screenshot_hotkey = area_screenshot_hotkey = translation_mode = model = image_detail = None
+result_opacity = auto_minimize = api_key = base_url = custom_models = use_streaming = None
+
+def load_global_settings():
+    """加载设置并解包到全局变量"""
+    global screenshot_hotkey, area_screenshot_hotkey, model, image_detail, result_opacity, auto_minimize
+    global api_key, base_url, custom_models, use_streaming, translation_mode, settings
+    settings = load_settings()
+    screenshot_hotkey = settings.get("screenshot_hotkey", DEFAULT_SETTINGS["screenshot_hotkey"])
+    area_screenshot_hotkey = settings.get("area_screenshot_hotkey", DEFAULT_SETTINGS["area_screenshot_hotkey"])
+    translation_mode = settings.get("translation_mode", DEFAULT_SETTINGS["translation_mode"])
+    model = settings.get("model", DEFAULT_SETTINGS["model"])
+    image_detail = settings.get("image_detail", DEFAULT_SETTINGS["image_detail"])
+    result_opacity = settings.get("result_opacity", DEFAULT_SETTINGS["result_opacity"])
+    auto_minimize = settings.get("auto_minimize", DEFAULT_SETTINGS["auto_minimize"])
+    api_key = settings.get("api_key", DEFAULT_SETTINGS["api_key"])
+    base_url = settings.get("base_url", DEFAULT_SETTINGS["base_url"])
+    custom_models = settings.get("custom_models", DEFAULT_SETTINGS["custom_models"]) # 加载历史自定义模型
+    use_streaming = settings.get("use_streaming", DEFAULT_SETTINGS["use_streaming"])
+    print("GUI: 设置加载完成")
+
+def preload_modules():
+    """预先导入使用时才加载的模块（在后台线程中调用），让第一次截图和翻译不再等待导入"""
+    import pyautogui
+    import pyperclip
+    from PIL import Image, ImageGrab, ImageTk
+    import numpy
+    import openai
+    import cache, image_encoder, preprocess, tiles
 
 # --- 区域截图类 ---
 class AreaScreenshot:
-    """区域截图类"""
-    def __init__(self, callback):
+    """区域截图选择层：常驻的全屏 Toplevel，平时隐藏
+
+    按下快捷键时先截取整个屏幕（冻结画面），由主线程显示为选择层背景，
+    松开鼠标时直接从内存中的冻结画面裁剪选区，结果与用户看到并选择的画面完全一致
+    """
+    # 冻结画面作为背景时的亮度，用于提示正在选择
+    BACKGROUND_BRIGHTNESS = 0.7
+
+    def __init__(self, parent, callback):
         self.start_x = 0
         self.start_y = 0
         self.current_x = 0
         self.current_y = 0
         self.callback = callback
-
-        # 创建全屏透明窗口
-        self.root = tk.Tk()
-        self.root.attributes('-fullscreen', True)
-        self.root.attributes('-alpha', 0.3)
-        self.root.attributes('-topmost', True)
+        self.visible = False
+        self.requested_at = None # 快捷键按下的时间，用于统计显示延迟
+        self.last_latency_ms = None
+        self.frame = None # 冻结的屏幕画面（物理像素）
+        self.selection_box = None # 最近一次选区在截图中的坐标（物理像素）
+        self.selection_rect = None # 最近一次选区的屏幕逻辑坐标
+        self.active_callback = callback # 本次选择完成后的回调（可由 show 临时指定）
+        self.photo = None # 背景图片（需要保持引用，否则会被回收）
+
+        # 创建全屏窗口（先隐藏，之后重复使用）
+        self.window = Toplevel(parent)
+        self.window.withdraw()
+        self.window.attributes('-fullscreen', True)
+        self.window.attributes('-topmost', True)
+        # 屏幕逻辑尺寸（在主线程中读取，供快捷键线程准备背景图使用）
+        self.screen_width = self.window.winfo_screenwidth()
+        self.screen_height = self.window.winfo_screenheight()
 
         # 设置窗口背景为黑色
-        self.root.configure(bg="black")
+        self.window.configure(bg="black")
 
         # 创建画布
-        self.canvas = tk.Canvas(self.root, bg="black", highlightthickness=0)
+        self.canvas = tk.Canvas(self.window, bg="black", highlightthickness=0, cursor="crosshair")
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.background_id = self.canvas.create_image(0, 0, anchor=tk.NW)
 
         # 绑定鼠标事件
         self.canvas.bind("<ButtonPress-1>", self.on_press)
@@ -61,23 +116,71 @@ class AreaScreenshot:
         self.canvas.bind("<ButtonRelease-1>", self.on_release)
 
         # 绑定键盘事件（Esc键取消）
-        self.root.bind("<Escape>", self.on_cancel)
+        self.window.bind("<Escape>", self.on_cancel)
+        self.window.bind("<Map>", self.on_map)
+        self.window.protocol("WM_DELETE_WINDOW", self.on_cancel)
 
         # 设置状态
         self.rect_id = None
 
-        # 开始主循环
-        self.root.mainloop()
+    def prepare_background(self, frame):
+        """把冻结画面处理为选择层背景：按屏幕逻辑尺寸缩放（高DPI缩放时截图为物理像素）并调暗
+
+        只使用 PIL，可在快捷键线程中调用
+        """
+        from PIL import Image
+        background = frame
+        if frame.size != (self.screen_width, self.screen_height):
+            background = frame.resize((self.screen_width, self.screen_height), Image.BILINEAR)
+        return background.point(lambda value: int(value * self.BACKGROUND_BRIGHTNESS))
+
+    def show(self, requested_at=None, frame=None, background=None, callback=None):
+        """以冻结画面为背景显示选择层（必须在主线程中调用），callback 为空时使用创建时指定的回调"""
+        from PIL import ImageTk
+        if self.visible:
+            return
+        self.visible = True
+        self.active_callback = callback or self.callback
+        self.requested_at = requested_at
+        self.frame = frame
+        self.photo = ImageTk.PhotoImage(background) if background is not None else None
+        self.canvas.itemconfig(self.background_id, image=self.photo or "")
+        if self.rect_id:
+            self.canvas.delete(self.rect_id)
+            self.rect_id = None
+        self.window.deiconify()
+        self.window.attributes('-fullscreen', True)
+        self.window.lift()
+        self.window.focus_force()
+
+    def hide(self):
+        self.visible = False
+        self.window.withdraw()
+        # 释放冻结画面
+        self.frame = None
+        self.photo = None
+        self.canvas.itemconfig(self.background_id, image="")
+
+    def on_map(self, event):
+        """选择层实际显示出来时记录快捷键到显示的延迟"""
+        if event.widget is self.window and self.requested_at is not None:
+            self.last_latency_ms = (time.perf_counter() - self.requested_at) * 1000
+            self.requested_at = None
+            print(f"区域选择层显示耗时: {self.last_latency_ms:.1f}ms")
 
     def on_press(self, event):
         # 记录起始点
         self.start_x = event.x
         self.start_y = event.y
+        self.current_x = event.x
+        self.current_y = event.y
 
         # 创建矩形
+        if self.rect_id:
+            self.canvas.delete(self.rect_id)
         self.rect_id = self.canvas.create_rectangle(
             self.start_x, self.start_y, self.start_x, self.start_y,
-            outline="red", width=2, fill="blue", stipple="gray50"
+            outline="red", width=2
         )
 
     def on_motion(self, event):
@@ -86,7 +189,8 @@ class AreaScreenshot:
         self.current_y = event.y
 
         # 更新矩形
-        self.canvas.coords(self.rect_id, self.start_x, self.start_y, self.current_x, self.current_y)
+        if self.rect_id:
+            self.canvas.coords(self.rect_id, self.start_x, self.start_y, self.current_x, self.current_y)
 
     def on_release(self, event):
         # 确保矩形有效（宽度和高度大于10像素）
@@ -100,25 +204,33 @@ class AreaScreenshot:
             right = max(self.start_x, self.current_x)
             bottom = max(self.start_y, self.current_y)
 
-            # 销毁窗口
-            self.root.destroy()
-
-            # 截取选定区域的图像
-            time.sleep(0.2)  # 等待窗口消失
-            screenshot = ImageGrab.grab(bbox=(left, top, right, bottom))
+            # 从冻结画面中裁剪选区，不再重新截屏
+            screenshot = self.crop_frame(left, top, right, bottom)
+            self.selection_rect = (left, top, right, bottom)
+            self.hide()
 
             # 调用回调函数，传递截图和坐标
-            if self.callback:
-                self.callback(screenshot, left, top)
+            if self.active_callback:
+                self.active_callback(screenshot, left, top)
         else:
             # 如果矩形太小，取消操作
             self.on_cancel(None)
 
+    def crop_frame(self, left, top, right, bottom):
+        """按屏幕逻辑坐标从冻结画面中裁剪（高DPI缩放时换算为截图的物理像素坐标）"""
+        if self.frame is None:
+            return None
+        scale_x = self.frame.width / float(self.screen_width)
+        scale_y = self.frame.height / float(self.screen_height)
+        box = (int(left * scale_x), int(top * scale_y), int(round(right * scale_x)), int(round(bottom * scale_y)))
+        self.selection_box = box
+        return self.frame.crop(box)
+
     def on_cancel(self, event=None): # 添加 event=None 允许无事件调用
-        # 取消操作，销毁窗口
-        self.root.destroy()
-        if self.callback:
-            self.callback(None, 0, 0)
+        # 取消操作，隐藏窗口
+        self.hide()
+        if self.active_callback:
+            self.active_callback(None, 0, 0)
 
 # --- 设置对话框类 ---
 class SettingsDialog:
@@ -164,9 +276,21 @@ class SettingsDialog:
         self.result_opacity_var = DoubleVar(value=result_opacity)
         self.auto_minimize_var = IntVar(value=1 if auto_minimize else 0)
         self.use_streaming_var = IntVar(value=1 if use_streaming else 0)
+        self.tile_mode_var = IntVar(value=1 if settings.get("tile_mode", DEFAULT_SETTINGS["tile_mode"]) else 0)
+        self.use_cache_var = IntVar(value=1 if settings.get("use_cache", DEFAULT_SETTINGS["use_cache"]) else 0)
+        self.segment_mode_var = IntVar(value=1 if settings.get("segment_mode", DEFAULT_SETTINGS["segment_mode"]) else 0)
+        self.ocr_engine_var = StringVar(value=settings.get("ocr_engine", DEFAULT_SETTINGS["ocr_engine"]))
+        self.ocr_text_model_var = StringVar(value=settings.get("ocr_text_model", DEFAULT_SETTINGS["ocr_text_model"]))
         self.api_key_var = StringVar(value=api_key)
         self.base_url_var = StringVar(value=base_url)
 
+        # 对冲请求（备用服务）设置
+        self.hedge_enabled_var = IntVar(value=1 if settings.get("hedge_enabled", DEFAULT_SETTINGS["hedge_enabled"]) else 0)
+        self.hedge_base_url_var = StringVar(value=settings.get("hedge_base_url", DEFAULT_SETTINGS["hedge_base_url"]))
+        self.hedge_api_key_var = StringVar(value=settings.get("hedge_api_key", DEFAULT_SETTINGS["hedge_api_key"]))
+        self.hedge_model_var = StringVar(value=settings.get("hedge_model", DEFAULT_SETTINGS["hedge_model"]))
+        self.hedge_delay_var = IntVar(value=settings.get("hedge_delay_ms", DEFAULT_SETTINGS["hedge_delay_ms"]))
+
         # 设置透明度
         self.dialog.attributes('-alpha', 0.95)
 
@@ -244,6 +368,27 @@ class SettingsDialog:
         api_help_text = "说明: 更改API设置后将立即生效。保存后会自动使用新的API配置。"
         Label(api_frame, text=api_help_text, justify=tk.LEFT, fg="gray").grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=5)
 
+        # 对冲请求（备用服务）
+        Checkbutton(api_frame, text="启用对冲请求（主服务迟迟无输出时同时请求备用服务）",
+                    variable=self.hedge_enabled_var).grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=5)
+
+        Label(api_frame, text="备用 Base URL:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        tk.ttk.Combobox(api_frame, textvariable=self.hedge_base_url_var,
+                        values=BASE_URL_OPTIONS, width=50).grid(row=5, column=1, sticky=tk.W, pady=5)
+
+        Label(api_frame, text="备用 API Key:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        Entry(api_frame, textvariable=self.hedge_api_key_var, width=60).grid(row=6, column=1, sticky=tk.W, pady=5)
+
+        Label(api_frame, text="备用模型:").grid(row=7, column=0, sticky=tk.W, pady=5)
+        Entry(api_frame, textvariable=self.hedge_model_var, width=60).grid(row=7, column=1, sticky=tk.W, pady=5)
+
+        Label(api_frame, text="对冲延迟(毫秒):").grid(row=8, column=0, sticky=tk.W, pady=5)
+        Scale(api_frame, from_=200, to=10000, resolution=100, orient=HORIZONTAL,
+              variable=self.hedge_delay_var, length=200).grid(row=8, column=1, sticky=tk.W, pady=5)
+
+        hedge_help_text = "说明: 主服务在延迟时间内没有输出时，向备用服务发送相同请求，采用先输出的一方。\n备用模型留空表示使用与主服务相同的模型。"
+        Label(api_frame, text=hedge_help_text, justify=tk.LEFT, fg="gray").grid(row=9, column=0, columnspan=2, sticky=tk.W, pady=5)
+
         # 快捷键设置组
         hotkey_frame = Frame(frame, relief=tk.GROOVE, borderwidth=1, padx=10, pady=10)
         hotkey_frame.grid(row=2, column=0, columnspan=2, sticky=tk.EW, pady=(0, 15))
@@ -297,15 +442,32 @@ class SettingsDialog:
 
         # 图像细节级别
         Label(model_frame, text="图像细节级别:").grid(row=3, column=0, sticky=tk.W, pady=5)
-        detail_options = ["high", "low"]
+        detail_options = ["auto", "high", "low"]
         detail_dropdown = tk.OptionMenu(model_frame, self.image_detail_var, *detail_options)
         detail_dropdown.grid(row=3, column=1, sticky=tk.W, pady=5)
 
         # 模型说明文本
-        model_help_text = "说明:\n- 高细节(high): 提供更精确的图像理解，但会消耗更多Token\n- 低细节(low): 速度更快，Token消耗更少\n- 自定义模型: 输入您想使用的任何模型名称"
+        model_help_text = "说明:\n- 高细节(high): 提供更精确的图像理解，但会消耗更多Token\n- 低细节(low): 速度更快，Token消耗更少\n- 自动(auto): 大而稀疏的文字（如对话框）用低细节，小字或密集文字用高细节\n- 自定义模型: 输入您想使用的任何模型名称"
         model_help_label = Label(model_frame, text=model_help_text, justify=tk.LEFT, fg="gray")
         model_help_label.grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=10)
 
+        # 分块并行翻译
+        Checkbutton(model_frame, text="超大截图分块并行翻译（多显示器全屏截图更快出结果）", variable=self.tile_mode_var).grid(
+            row=5, column=0, columnspan=2, sticky=tk.W, pady=5)
+
+        # 结构化模式（翻译记忆）
+        Checkbutton(model_frame, text="结构化模式（逐句保存到翻译记忆；开启本地OCR后重复出现的文字不再重复翻译）",
+                    variable=self.segment_mode_var).grid(row=6, column=0, columnspan=2, sticky=tk.W, pady=5)
+
+        # 本地OCR：识别可信时只发送文字给文本模型
+        Label(model_frame, text="本地OCR:").grid(row=7, column=0, sticky=tk.W, pady=5)
+        tk.OptionMenu(model_frame, self.ocr_engine_var, "none", *engine_names()).grid(row=7, column=1, sticky=tk.W, pady=5)
+        Label(model_frame, text="文字翻译模型:").grid(row=8, column=0, sticky=tk.W, pady=5)
+        Entry(model_frame, textvariable=self.ocr_text_model_var, width=60).grid(row=8, column=1, sticky=tk.W, pady=5)
+        Label(model_frame, text="说明: OCR识别可信时只把文字发送给文字翻译模型（留空时使用上面的模型），更快更省；\n"
+                                "识别不可信或文字请求失败时仍使用视觉模型。使用 tesseract 需安装 Tesseract 程序和 pytesseract",
+              justify=tk.LEFT, fg="gray").grid(row=9, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+
         # 界面设置组
         ui_frame = Frame(frame, relief=tk.GROOVE, borderwidth=1, padx=10, pady=10)
         ui_frame.grid(row=4, column=0, columnspan=2, sticky=tk.EW, pady=(0, 15))
@@ -326,18 +488,22 @@ class SettingsDialog:
         Checkbutton(ui_frame, text="启用流式输出（翻译结果实时显示）", variable=self.use_streaming_var).grid(
             row=3, column=0, columnspan=2, sticky=tk.W, pady=5)
 
+        # 翻译缓存选项
+        Checkbutton(ui_frame, text="启用翻译缓存（相同画面直接返回上次结果）", variable=self.use_cache_var).grid(
+            row=4, column=0, columnspan=2, sticky=tk.W, pady=5)
+
         # 界面说明文本
-        ui_help_text = "说明:\n- 透明度: 值越小越透明（0.3为非常透明，1.0为完全不透明）\n- 自动最小化: 勾选后程序启动完成将自动最小化到任务栏\n- 流式输出: 开启后翻译结果将实时显示，响应更快"
+        ui_help_text = "说明:\n- 透明度: 值越小越透明（0.3为非常透明，1.0为完全不透明）\n- 自动最小化: 勾选后程序启动完成将自动最小化到任务栏\n- 流式输出: 开启后翻译结果将实时显示，响应更快\n- 翻译缓存: 重复截取相同内容时不再调用API，节省时间和费用"
         ui_help_label = Label(ui_frame, text=ui_help_text, justify=tk.LEFT, fg="gray")
-        ui_help_label.grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=10)
+        ui_help_label.grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=10)
 
         # 设置对话框透明度
-        Label(ui_frame, text="设置界面透明度:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        Label(ui_frame, text="设置界面透明度:").grid(row=6, column=0, sticky=tk.W, pady=5)
         settings_opacity_var = DoubleVar(value=0.95)
         settings_opacity_scale = Scale(ui_frame, from_=0.5, to=1.0, resolution=0.05, orient=HORIZONTAL,
                                      variable=settings_opacity_var, length=200,
                                      command=lambda v: self.dialog.attributes('-alpha', float(v)))
-        settings_opacity_scale.grid(row=5, column=1, sticky=tk.W, pady=5)
+        settings_opacity_scale.grid(row=6, column=1, sticky=tk.W, pady=5)
 
         # 按钮
         button_frame = Frame(frame)
@@ -413,10 +579,14 @@ class SettingsDialog:
         if not new_base_url:
             messagebox.showerror("错误", "Base URL不能为空")
             return
+        if self.hedge_enabled_var.get() and (not self.hedge_api_key_var.get().strip() or not self.hedge_base_url_var.get().strip()):
+            messagebox.showerror("错误", "启用对冲请求时，备用 Base URL 和 API Key 不能为空")
+            return
 
         # 记录旧快捷键，以便判断是否需要重启提示
         old_screenshot_hotkey = screenshot_hotkey
         old_area_screenshot_hotkey = area_screenshot_hotkey
+        api_changed = (new_api_key != api_key or new_base_url != base_url)
 
         # 更新全局变量
         screenshot_hotkey = new_screenshot_hotkey
@@ -431,7 +601,9 @@ class SettingsDialog:
         # custom_models 列表已在上面处理
 
         # 保存到设置文件 (使用 core 的 save_settings)
-        current_settings = {
+        # 保留界面上没有的高级选项（缓存等），只覆盖对话框中的设置项
+        current_settings = dict(settings)
+        current_settings.update({
             "screenshot_hotkey": screenshot_hotkey,
             "area_screenshot_hotkey": area_screenshot_hotkey,
             "translation_mode": translation_mode, # translation_mode 在主 App 中修改并保存
@@ -442,10 +614,25 @@ class SettingsDialog:
             "api_key": api_key,
             "base_url": base_url,
             "custom_models": custom_models,
-            "use_streaming": use_streaming
-        }
+            "use_streaming": use_streaming,
+            "use_cache": bool(self.use_cache_var.get()),
+            "tile_mode": bool(self.tile_mode_var.get()),
+            "segment_mode": bool(self.segment_mode_var.get()),
+            "ocr_engine": self.ocr_engine_var.get(),
+            "ocr_text_model": self.ocr_text_model_var.get().strip(),
+            "hedge_enabled": bool(self.hedge_enabled_var.get()),
+            "hedge_base_url": self.hedge_base_url_var.get().strip(),
+            "hedge_api_key": self.hedge_api_key_var.get().strip(),
+            "hedge_model": self.hedge_model_var.get().strip(),
+            "hedge_delay_ms": int(self.hedge_delay_var.get())
+        })
         settings = current_settings # 更新全局 settings 字典
 
+        # API 配置变化时关闭旧连接，并在后台预热新连接
+        if api_changed:
+            reset_clients(api_key, base_url, settings)
+            threading.Thread(target=warm_up_connection, args=(api_key, base_url, settings), daemon=True).start()
+
         if save_settings(current_settings):
             # 检查快捷键是否更改
             hotkey_changed = (screenshot_hotkey != old_screenshot_hotkey or
@@ -501,47 +688,102 @@ class SettingsDialog:
 
 # --- 结果窗口类 ---
 class ResultWindow:
-    """翻译结果窗口类"""
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.result = ""
+    """翻译结果窗口类（创建后隐藏，由 show 显示；关闭后可交还窗口池重复使用）"""
+    def __init__(self, pool=None):
+        self.pool = pool
+        self.x = 0
+        self.y = 0
+        self.owner = None # 当前使用该窗口的翻译任务编号
+        self.auto_close = True # 失去焦点时自动关闭（区域监视的常驻窗口不自动关闭）
+        self.on_close = None # 窗口关闭时的回调（用于取消进行中的翻译）
+        self.chunks = [] # 已显示的文本块，需要完整结果时再拼接（流式时逐块追加，避免反复拼接长字符串）
         self.min_width = 350
         self.min_height = 150
         self.padding = 20
-        self.current_text = ""
         self.initial_size_set = False
         self.resize_timer_id = None
 
-        # 创建窗口
+        # 创建窗口（先隐藏）
         self.window = tk.Toplevel()
+        self.window.withdraw()
         self.window.title("翻译结果")
         self.window.attributes("-topmost", True)
-        self.window.attributes('-alpha', result_opacity) # 使用全局设置
-
-        # 初始窗口大小
-        self.window.geometry(f"{self.min_width}x{self.min_height}+{x+10}+{y}")
 
         # 设置窗口失去焦点时自动关闭
         self.window.bind("<FocusOut>", self.on_focus_out)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
 
         # 设置UI
         self.setup_ui()
 
+    def show(self, x, y, owner=None, on_close=None):
+        """清空内容并在截图位置旁边显示窗口"""
+        self.x = x
+        self.y = y
+        self.owner = owner
+        self.on_close = on_close
+        self.auto_close = True
+        self.chunks = []
+        self.initial_size_set = False
+        if self.resize_timer_id:
+            self.window.after_cancel(self.resize_timer_id)
+            self.resize_timer_id = None
+        self.layout.reset()
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.config(state=tk.DISABLED)
+
+        self.window.attributes('-alpha', result_opacity) # 使用全局设置（每次显示时读取，设置修改后立即生效）
+        # 初始窗口大小
+        self.window.geometry(f"{self.min_width}x{self.min_height}+{x+10}+{y}")
+        self.window.deiconify()
+        self.window.lift()
+
+    def is_owned_by(self, owner):
+        """窗口是否仍在显示指定任务的结果（关闭后可能已被其它任务复用）"""
+        try:
+            return self.owner == owner and bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+
     def on_focus_out(self, event):
         """当窗口失去焦点时关闭"""
+        if not self.auto_close:
+            return
         # 检查鼠标是否在窗口内，防止误关
         widget = self.window.winfo_containing(event.x_root, event.y_root)
         if widget is None: # 鼠标不在窗口内
-             self.window.after(100, self.close_if_not_focused)
+             owner = self.owner
+             self.window.after(100, lambda: self.close_if_not_focused(owner))
 
-    def close_if_not_focused(self):
+    def close_if_not_focused(self, owner=None):
         """检查是否真的失去焦点并关闭窗口"""
+        if owner != self.owner: # 窗口已关闭并被其它任务复用
+            return
         try:
             if not self.window.focus_displayof():
+                self.close()
+        except tk.TclError: # 窗口可能已被销毁
+            pass
+
+    def close(self):
+        """关闭窗口（交还窗口池或销毁）并通知调用方"""
+        if self.owner is None and self.on_close is None: # 已经关闭
+            return
+        self.owner = None
+        if self.resize_timer_id:
+            self.window.after_cancel(self.resize_timer_id)
+            self.resize_timer_id = None
+        try:
+            if self.pool:
+                self.pool.release(self)
+            else:
                 self.window.destroy()
         except tk.TclError: # 窗口可能已被销毁
             pass
+        if self.on_close:
+            on_close, self.on_close = self.on_close, None
+            on_close()
 
     def setup_ui(self):
         # 框架
@@ -555,6 +797,12 @@ class ResultWindow:
         self.result_text = Text(self.text_frame, wrap=tk.WORD, height=6, width=40)
         self.result_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
+        # 增量布局跟踪：用真实字体度量计算文本尺寸，超过最大窗口宽度的行按换行计算高度
+        self.max_width = int(self.window.winfo_screenwidth() * 0.8)
+        self.max_height = int(self.window.winfo_screenheight() * 0.7)
+        text_font = tkfont.Font(root=self.window, font=self.result_text.cget("font"))
+        self.layout = TextLayoutTracker(text_font, self.max_width - self.chrome_width())
+
         scrollbar = tk.Scrollbar(self.text_frame, command=self.result_text.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.result_text.config(yscrollcommand=scrollbar.set)
@@ -577,15 +825,15 @@ class ResultWindow:
             if is_first_chunk:
                 # 如果是第一个块，清空现有内容
                 self.result_text.delete(1.0, tk.END)
-                self.current_text = "" # 重置累积文本
-                self.result = ""
+                self.chunks = [] # 重置累积文本
                 self.initial_size_set = False # 重置大小标记
+                self.layout.reset()
 
             # 追加增量内容
             if content_chunk:
                 self.result_text.insert(tk.END, content_chunk)
-                self.current_text += content_chunk # 更新累积文本
-                self.result = self.current_text # 更新完整结果
+                self.chunks.append(content_chunk) # 更新累积文本
+                self.layout.feed(content_chunk) # 只计算新增部分的布局
                 self.result_text.see(tk.END) # 滚动到底部
 
             self.result_text.config(state=tk.DISABLED) # 设为只读
@@ -594,18 +842,21 @@ class ResultWindow:
             if content_chunk: # 只有当实际有内容添加时才触发调整
                 if self.resize_timer_id:
                     self.window.after_cancel(self.resize_timer_id)
-                # 使用累积的 current_text 来判断大小
-                self.resize_timer_id = self.window.after(200, lambda: self.adjust_window_size(self.current_text))
+                self.resize_timer_id = self.window.after(200, self.adjust_window_size)
 
-                if not self.initial_size_set and self.current_text:
+                if not self.initial_size_set and self.chunks:
                     self.initial_size_set = True
         except tk.TclError: # 窗口可能已关闭
             pass
 
+    @property
+    def result(self):
+        """完整结果"""
+        return "".join(self.chunks)
+
     def update_result(self, result):
         """非流式更新结果"""
-        self.result = result
-        self.current_text = result
+        self.chunks = [result]
         try:
             self.result_text.config(state=tk.NORMAL)
             self.result_text.delete(1.0, tk.END)
@@ -613,34 +864,30 @@ class ResultWindow:
             self.result_text.see("1.0") # 滚动到顶部
             self.result_text.config(state=tk.DISABLED) # 设为只读
 
-            self.adjust_window_size(result) # 立即调整
+            self.layout.reset()
+            self.layout.feed(result)
+            self.adjust_window_size() # 立即调整
             self.initial_size_set = True
         except tk.TclError: # 窗口可能已关闭
             pass
 
-    def adjust_window_size(self, text):
-        """根据文本内容调整窗口大小"""
-        try:
-            # 计算文本所需大致尺寸
-            lines = text.split('\n')
-            max_line_length = max(len(line) for line in lines) if lines else 0
-            num_lines = len(lines)
+    def chrome_width(self):
+        """文本区域以外的横向占用：窗口边距、文本框内边距和滚动条"""
+        return self.padding * 3 + 20
 
-            # 估算像素尺寸 (这些值可能需要微调)
-            char_width = 10
-            line_height = 22
-            text_width = max(max_line_length * char_width, 300)
-            text_height = max(num_lines * line_height, 120)
+    def adjust_window_size(self):
+        """根据增量跟踪的文本尺寸调整窗口大小"""
+        try:
+            text_width = max(self.layout.text_width, 300)
+            text_height = max(self.layout.text_height, 120)
 
             # 计算窗口总尺寸
-            required_width = max(text_width + self.padding * 3 + 20, self.min_width) # +20 for scrollbar approx
+            required_width = max(text_width + self.chrome_width(), self.min_width)
             required_height = max(text_height + 80, self.min_height) # +80 for padding and button
 
             # 限制最大尺寸
-            max_width = self.window.winfo_screenwidth() * 0.8
-            max_height = self.window.winfo_screenheight() * 0.7
-            required_width = int(min(required_width, max_width))
-            required_height = int(min(required_height, max_height))
+            required_width = int(min(required_width, self.max_width))
+            required_height = int(min(required_height, self.max_height))
 
             # 获取当前窗口几何信息
             current_geometry = self.window.geometry() # "widthxheight+x+y"
@@ -676,6 +923,7 @@ class ResultWindow:
         """复制结果到剪贴板"""
         if self.result:
             try:
+                import pyperclip
                 pyperclip.copy(self.result)
                 messagebox.showinfo("成功", "结果已复制到剪贴板", parent=self.window) # 指定父窗口
             except Exception as e:
@@ -683,6 +931,264 @@ class ResultWindow:
         else:
             messagebox.showinfo("提示", "暂无可复制的内容", parent=self.window)
 
+class ResultWindowPool:
+    """预先创建的隐藏结果窗口池，截图时直接取出并移动到截图位置，避免每次新建 Toplevel（只在主线程中使用）"""
+    def __init__(self, root, size=2):
+        self.root = root
+        self.size = size
+        self.idle = []
+        self.created = 0
+        self.reused = 0
+
+    def prewarm(self):
+        """补足空闲窗口"""
+        try:
+            while len(self.idle) < self.size:
+                self.idle.append(ResultWindow(pool=self))
+                self.created += 1
+        except tk.TclError: # 主窗口已销毁
+            pass
+
+    def acquire(self, x, y, owner=None, on_close=None):
+        """取出一个窗口并显示在截图位置旁边"""
+        if self.idle:
+            window = self.idle.pop()
+            self.reused += 1
+        else:
+            window = ResultWindow(pool=self)
+            self.created += 1
+        window.show(x, y, owner, on_close)
+        # 空闲时补充预建窗口，不占用本次显示的时间
+        self.root.after_idle(self.prewarm)
+        return window
+
+    def release(self, window):
+        """窗口关闭：隐藏后放回池中，池已满时销毁"""
+        if len(self.idle) < self.size:
+            window.window.withdraw()
+            self.idle.append(window)
+        else:
+            window.window.destroy()
+
+    def stats(self):
+        return {"idle": len(self.idle), "created": self.created, "reused": self.reused}
+
+
+class HistorySearchDialog:
+    """翻译历史搜索窗口：输入时增量搜索（全文索引），显示最近的匹配结果"""
+    MAX_RESULTS = 100
+
+    def __init__(self, parent, store):
+        self.store = store
+        self.search_timer_id = None
+
+        self.dialog = Toplevel(parent)
+        self.dialog.title("搜索翻译历史")
+        self.dialog.geometry("700x500")
+
+        search_frame = Frame(self.dialog)
+        search_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        Label(search_frame, text="搜索:").pack(side=tk.LEFT, padx=(0, 5))
+        self.query_var = StringVar()
+        self.query_entry = Entry(search_frame, textvariable=self.query_var)
+        self.query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.query_var.trace_add("write", self.on_query_changed)
+
+        text_frame = Frame(self.dialog)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.result_text = Text(text_frame, wrap=tk.WORD)
+        self.result_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar = tk.Scrollbar(text_frame, command=self.result_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.result_text.config(yscrollcommand=scrollbar.set)
+        self.result_text.tag_config("header", foreground="gray")
+        self.result_text.tag_config("match", background="yellow")
+
+        self.status_label = Label(self.dialog, text="", anchor=tk.W)
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 5))
+
+        self.dialog.bind("<Escape>", lambda event: self.dialog.destroy())
+        self.query_entry.focus_set()
+        self.run_search()
+
+    def exists(self):
+        try:
+            return bool(self.dialog.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def focus(self):
+        self.dialog.deiconify()
+        self.dialog.lift()
+        self.query_entry.focus_set()
+
+    def on_query_changed(self, *args):
+        """输入变化后稍等片刻再搜索，连续输入时只搜索最后一次"""
+        if self.search_timer_id:
+            self.dialog.after_cancel(self.search_timer_id)
+        self.search_timer_id = self.dialog.after(120, self.run_search)
+
+    def run_search(self):
+        self.search_timer_id = None
+        query = self.query_var.get().strip()
+        start = time.perf_counter()
+        results = self.store.search(query, self.MAX_RESULTS)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete(1.0, tk.END)
+        for record in results:
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["created"]))
+            latency = f", {record['latency_ms'] / 1000:.1f}s" if record["latency_ms"] else ""
+            self.result_text.insert(tk.END, f"--- {created} ({record['mode']}, {record['model']}{latency}) ---\n", "header")
+            self.result_text.insert(tk.END, record["text"] + "\n\n")
+        if query:
+            self.highlight(query)
+        self.result_text.config(state=tk.DISABLED)
+
+        if query:
+            self.status_label.config(text=f"找到 {len(results)} 条{'（仅显示最近的结果）' if len(results) >= self.MAX_RESULTS else ''}，"
+                                          f"用时 {elapsed_ms:.1f}ms")
+        else:
+            self.status_label.config(text=f"共 {self.store.count()} 条历史记录，显示最近 {len(results)} 条")
+
+    def highlight(self, query):
+        """高亮所有匹配的文字"""
+        count_var = IntVar()
+        index = "1.0"
+        while True:
+            index = self.result_text.search(query, index, stopindex=tk.END, nocase=True, count=count_var)
+            if not index or not count_var.get():
+                break
+            end = f"{index} + {count_var.get()} chars"
+            self.result_text.tag_add("match", index, end)
+            index = end
+
+
+class StatsDialog:
+    """请求统计窗口：按模型和服务显示各阶段耗时的 p50/p95/p99 以及翻译任务和连接池状态，定时刷新"""
+    REFRESH_MS = 2000
+    # 显示的指标：(字段, 名称, 格式化函数)
+    FIELDS = [
+        ("capture_ms", "截图", lambda v: f"{v:.0f}ms"),
+        ("encode_ms", "编码", lambda v: f"{v:.0f}ms"),
+        ("image_bytes", "图片大小", lambda v: f"{v / 1024:.0f}KB"),
+        ("base64_bytes", "Base64", lambda v: f"{v / 1024:.0f}KB"),
+        ("connect_ms", "建立连接", lambda v: f"{v:.0f}ms"),
+        ("headers_ms", "响应头", lambda v: f"{v:.0f}ms"),
+        ("ttft_ms", "首Token", lambda v: f"{v:.0f}ms"),
+        ("tokens_per_sec", "Token/秒", lambda v: f"{v:.1f}"),
+        ("total_ms", "总耗时", lambda v: f"{v:.0f}ms"),
+    ]
+    OUTCOME_NAMES = {"ok": "成功", "error": "失败", "timeout": "超时", "cancelled": "取消"}
+    CANCEL_NAMES = {CANCEL_WINDOW_CLOSED: "关闭窗口", CANCEL_SUPERSEDED: "被新任务替代", CANCEL_SHUTDOWN: "退出程序"}
+
+    def __init__(self, parent, collector, client_pool, jobs=None):
+        self.collector = collector
+        self.client_pool = client_pool
+        self.jobs = jobs
+        self.refresh_timer_id = None
+
+        self.dialog = Toplevel(parent)
+        self.dialog.title("请求统计")
+        self.dialog.geometry("760x480")
+
+        text_frame = Frame(self.dialog)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        self.stats_text = Text(text_frame, wrap=tk.NONE, font="TkFixedFont")
+        self.stats_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar = tk.Scrollbar(text_frame, command=self.stats_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.stats_text.config(yscrollcommand=scrollbar.set)
+        self.stats_text.tag_config("header", font=("Arial", 10, "bold"))
+
+        button_frame = Frame(self.dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        self.status_label = Label(button_frame, text="", anchor=tk.W, fg="gray")
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        Button(button_frame, text="导出", command=self.export).pack(side=tk.RIGHT, padx=5)
+        Button(button_frame, text="刷新", command=self.refresh).pack(side=tk.RIGHT, padx=5)
+
+        self.dialog.bind("<Escape>", lambda event: self.dialog.destroy())
+        self.refresh()
+
+    def exists(self):
+        try:
+            return bool(self.dialog.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def focus(self):
+        self.dialog.deiconify()
+        self.dialog.lift()
+        self.refresh()
+
+    def refresh(self):
+        if not self.exists(): # 窗口已关闭，停止定时刷新
+            return
+        if self.refresh_timer_id:
+            self.dialog.after_cancel(self.refresh_timer_id)
+        groups = self.collector.summary()
+        self.stats_text.config(state=tk.NORMAL)
+        self.stats_text.delete(1.0, tk.END)
+        if not groups:
+            self.stats_text.insert(tk.END, "还没有翻译请求。" if settings.get("metrics_enabled", True)
+                                   else "请求指标已关闭（settings.json 中的 metrics_enabled）。")
+        for group in groups:
+            outcomes = "，".join(f"{self.OUTCOME_NAMES.get(name, name)} {count}"
+                                for name, count in sorted(group["outcomes"].items()))
+            self.stats_text.insert(tk.END, f"{group['model']} @ {group['provider']}\n", "header")
+            self.stats_text.insert(tk.END, f"共 {group['count']} 次（{outcomes}，缓存命中 {group['cache_hits']}）\n")
+            if group["image_detail"]:
+                details = "，".join(f"{name.replace('auto:', '自动 ')} {count}"
+                                   for name, count in sorted(group["image_detail"].items()))
+                self.stats_text.insert(tk.END, f"细节级别: {details}\n")
+            self.stats_text.insert(tk.END, f"{'':<12}{'p50':>10}{'p95':>10}{'p99':>10}{'平均':>10}\n")
+            for field, name, fmt in self.FIELDS:
+                stats = group["fields"].get(field)
+                if stats:
+                    values = "".join(f"{fmt(stats[key]):>10}" for key in ("p50", "p95", "p99", "mean"))
+                    self.stats_text.insert(tk.END, f"{name:<12}{values}\n")
+            self.stats_text.insert(tk.END, "\n")
+        self.show_jobs()
+        self.show_client_pool()
+        self.stats_text.config(state=tk.DISABLED)
+        self.status_label.config(text=f"最近 {self.collector.window} 次请求的分位数，每 {self.REFRESH_MS // 1000} 秒刷新")
+        self.refresh_timer_id = self.dialog.after(self.REFRESH_MS, self.refresh)
+
+    def show_jobs(self):
+        """显示翻译任务：已开始/完成/进行中的任务数和按原因统计的取消次数"""
+        if self.jobs is None:
+            return
+        jobs = self.jobs.stats()
+        cancelled = "，".join(f"{self.CANCEL_NAMES.get(reason, reason)} {count}"
+                              for reason, count in sorted(jobs["cancelled"].items())) or "无"
+        self.stats_text.insert(tk.END, "翻译任务\n", "header")
+        self.stats_text.insert(tk.END, f"开始 {jobs['started']} 个，完成 {jobs['completed']} 个，进行中 {jobs['active']} 个，"
+                                       f"取消（{cancelled}），丢弃已接收的 {jobs['dropped_chars']} 字\n\n")
+
+    def show_client_pool(self):
+        """显示连接池：复用/新建/关闭的客户端数和各客户端的请求数、空闲时间"""
+        pool = self.client_pool.stats()
+        self.stats_text.insert(tk.END, "连接池\n", "header")
+        self.stats_text.insert(tk.END, f"复用 {pool['hits']} 次，新建 {pool['misses']} 个，已关闭 {pool['closed']} 个，"
+                                       f"当前 {pool['active']} 个，等待请求结束后关闭 {pool['retiring']} 个\n")
+        for client in pool["clients"]:
+            self.stats_text.insert(tk.END, f"  {client['base_url']} ({client['api_key']}): 请求 {client['requests']} 次"
+                                           f"（进行中 {client['in_use']}），已创建 {client['age_seconds']:.0f}s，"
+                                           f"空闲 {client['idle_seconds']:.0f}s\n")
+
+    def export(self):
+        """立即导出 Prometheus 文本文件和 JSON"""
+        directory = self.collector.export_dir
+        try:
+            self.collector.export(directory)
+        except OSError as e:
+            messagebox.showerror("导出失败", str(e), parent=self.dialog)
+            return
+        self.status_label.config(text=f"已导出到 {os.path.join(directory, 'translation_metrics.prom')} 和 .json")
+
+
 # --- 主应用类 ---
 class ScreenshotApp:
     def __init__(self, root):
@@ -699,16 +1205,104 @@ class ScreenshotApp:
             except Exception as e:
                 print(f"加载图标失败: {e}")
 
-        self.setup_ui()
+        with profiler.phase("创建界面"):
+            self.setup_ui()
+        with profiler.phase("打开翻译历史"):
+            # 持久化的翻译历史（全文索引，可搜索）
+            self.history_store = HistoryStore(get_data_path("translation_history.db"))
+            # 主窗口的翻译历史：内存中只保留最近的记录，更早的从数据库读取，文本框中只显示一段记录窗口
+            self.history = TranslationHistory(
+                self.history_store,
+                settings.get("history_memory_entries", DEFAULT_SETTINGS["history_memory_entries"]))
+            self.history_view = HistoryView(
+                self.result_text, self.history,
+                settings.get("history_display_entries", DEFAULT_SETTINGS["history_display_entries"]))
+        self.search_dialog = None
+        self.stats_dialog = None
+        self.area_capture_ms = None # 最近一次区域截图冻结画面的耗时
+        self.watcher = None # 区域监视
+        self.watch_window = None
         self.running = True
         self.hotkey_listener_active = False # 标记监听器是否激活
+        self.jobs = JobRegistry() # 进行中的翻译任务（可取消）
+        # 翻译任务调度：限制并发数，区域截图优先，快捷键防抖
+        self.scheduler = JobScheduler(
+            settings.get("max_concurrent_jobs", DEFAULT_SETTINGS["max_concurrent_jobs"]),
+            settings.get("hotkey_debounce_ms", DEFAULT_SETTINGS["hotkey_debounce_ms"]))
+        # 工作线程的界面更新统一经调度器按帧率批量刷新
+        self.dispatcher = UIDispatcher(self.root, settings.get("ui_fps", DEFAULT_SETTINGS["ui_fps"]))
+        # 预先创建隐藏的结果窗口，截图时直接复用
+        self.window_pool = ResultWindowPool(self.root, settings.get("result_window_pool_size",
+                                                                    DEFAULT_SETTINGS["result_window_pool_size"]))
+        self.root.after_idle(self.window_pool.prewarm)
+        # 常驻的区域选择层，按下快捷键时直接显示
+        self.area_overlay = AreaScreenshot(self.root, self.on_area_selected)
 
         # 启动快捷键监听
         self.start_hotkey_listener()
 
+        # 单实例模式：接收再次启动的进程转发来的命令
+        self.instance_server = None
+        if settings.get("single_instance", DEFAULT_SETTINGS["single_instance"]):
+            self.instance_server = InstanceServer(self.handle_instance_command)
+            if not self.instance_server.start():
+                self.instance_server = None
+
+        # 窗口显示后再在后台预加载模块、预热 API 连接
+        self.root.after_idle(self.start_background_warm_up)
+
         # 启动完成后自动最小化
         self.root.after(1000, self.auto_minimize_window)
 
+    def start_background_warm_up(self):
+        profiler.mark("主窗口显示")
+        threading.Thread(target=self.background_warm_up, name="warm-up", daemon=True).start()
+
+    def background_warm_up(self):
+        """后台预加载较慢的模块并预热 API 连接，减少第一次截图和翻译的等待"""
+        try:
+            with profiler.phase("后台预加载模块"):
+                preload_modules()
+        except ImportError as e:
+            print(f"预加载模块失败: {e}")
+        profiler.uninstall_import_hook()
+        profiler.report()
+        warm_up_connection(api_key, base_url, settings)
+
+    def handle_instance_command(self, command, args):
+        """执行命令行或其它启动进程转发来的命令；在后台线程中执行，转发方不需要等待截图完成"""
+        if command == COMMAND_SHOW:
+            action = lambda: self.dispatcher.call_soon(self.show_window)
+        elif command == COMMAND_CAPTURE_FULL:
+            action = self.take_screenshot_and_translate
+        elif command == COMMAND_CAPTURE_AREA:
+            action = self.take_area_screenshot
+        elif command == COMMAND_TRANSLATE_FILE and args:
+            action = lambda: self.translate_file(args[0])
+        else:
+            raise ValueError(f"未知命令: {command}")
+        threading.Thread(target=action, name=f"command-{command}", daemon=True).start()
+
+    def show_window(self):
+        """恢复并显示主窗口"""
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+
+    def translate_file(self, path):
+        """翻译图片文件，结果窗口显示在鼠标位置"""
+        import pyautogui
+        from PIL import Image
+        try:
+            with Image.open(path) as img:
+                image = img.convert("RGB")
+        except Exception as e:
+            self.update_status(f"无法打开图片: {e}")
+            return
+        mouse_x, mouse_y = pyautogui.position()
+        self.update_status(f"正在翻译文件: {os.path.basename(path)}")
+        self.schedule_translation("full", image, mouse_x, mouse_y, False)
+
     def auto_minimize_window(self):
         if auto_minimize:
             self.root.iconify()
@@ -736,6 +1330,20 @@ class ScreenshotApp:
         settings_btn = Button(control_frame, text="⚙️ 设置", command=self.open_settings)
         settings_btn.pack(side=tk.RIGHT, padx=5)
 
+        # 请求统计按钮
+        Button(control_frame, text="📊 统计", command=self.open_stats).pack(side=tk.RIGHT, padx=5)
+
+        # 区域监视按钮
+        self.watch_btn = Button(control_frame, text="👁 监视区域", command=self.toggle_watch)
+        self.watch_btn.pack(side=tk.RIGHT, padx=5)
+        self.watch_last_btn = Button(control_frame, text="监视上次区域", command=self.watch_last_region,
+                                     state=tk.NORMAL if settings.get("watch_region") else tk.DISABLED)
+        self.watch_last_btn.pack(side=tk.RIGHT, padx=5)
+
+        # 历史搜索按钮
+        Button(control_frame, text="🔍 历史", command=self.open_history_search).pack(side=tk.RIGHT, padx=5)
+        self.root.bind("<Control-f>", lambda event: self.open_history_search())
+
         # 清空按钮
         clear_btn = Button(control_frame, text="清空", command=self.clear_result)
         clear_btn.pack(side=tk.RIGHT, padx=5)
@@ -762,6 +1370,83 @@ class ScreenshotApp:
         # 更新结果窗口透明度（如果设置中修改了）
         # 注意：已打开的结果窗口透明度不会变，新窗口会使用新设置
 
+    def toggle_watch(self):
+        """开始（框选新区域）或停止区域监视"""
+        if self.watcher:
+            self.stop_watch()
+            return
+        self.update_status("请框选要监视的区域（Esc 取消）")
+        # 框选与区域截图相同，选区交给 on_watch_region_selected
+        threading.Thread(target=self.take_area_screenshot, args=(self.on_watch_region_selected,), daemon=True).start()
+
+    def on_watch_region_selected(self, screenshot, x, y):
+        """监视区域框选完成（主线程中调用），保存区域并开始监视"""
+        if not screenshot:
+            self.update_status("已取消监视区域")
+            return
+        left, top, right, bottom = self.area_overlay.selection_rect
+        settings["watch_region"] = list(self.area_overlay.selection_box)
+        # 结果窗口放在监视区域下方
+        settings["watch_window_position"] = [left, bottom + 10]
+        save_settings(settings)
+        self.watch_last_btn.config(state=tk.NORMAL)
+        self.start_watch()
+
+    def watch_last_region(self):
+        if not self.watcher and settings.get("watch_region"):
+            self.start_watch()
+
+    def start_watch(self):
+        """监视保存的区域，内容变化时翻译并更新同一个结果窗口（主线程中调用）"""
+        from watch import RegionWatcher
+        x, y = settings.get("watch_window_position") or (100, 100)
+        self.watch_window = self.window_pool.acquire(x, y, on_close=self.stop_watch)
+        self.watch_window.auto_close = False
+        self.watch_window.window.title("翻译结果（区域监视）")
+
+        def on_change(image):
+            self.update_status("监视区域内容变化，正在翻译...")
+            self.schedule_translation("watch", image, x, y, True, self.watch_window,
+                                      capture_ms=self.watcher.last_capture_ms if self.watcher else None)
+
+        self.watcher = RegionWatcher(
+            settings["watch_region"], on_change,
+            interval=settings.get("watch_interval_ms", DEFAULT_SETTINGS["watch_interval_ms"]) / 1000.0,
+            change_ratio=settings.get("watch_change_ratio", DEFAULT_SETTINGS["watch_change_ratio"])
+        ).start()
+        self.watch_btn.config(text="⏹ 停止监视")
+        self.watch_last_btn.config(state=tk.DISABLED)
+        self.update_status(f"正在监视区域 {tuple(settings['watch_region'])}，内容变化时自动翻译")
+
+    def stop_watch(self):
+        """停止区域监视并关闭常驻结果窗口"""
+        if not self.watcher:
+            return
+        watcher, self.watcher = self.watcher, None
+        watcher.stop()
+        window, self.watch_window = self.watch_window, None
+        if window is not None:
+            # 由结果窗口关闭触发时 close() 不会重复执行
+            window.window.title("翻译结果")
+            window.close()
+        self.watch_btn.config(text="👁 监视区域")
+        self.watch_last_btn.config(state=tk.NORMAL if settings.get("watch_region") else tk.DISABLED)
+        self.update_status("区域监视已停止")
+
+    def open_history_search(self):
+        """打开历史搜索窗口（已打开时切换到前台）"""
+        if self.search_dialog and self.search_dialog.exists():
+            self.search_dialog.focus()
+        else:
+            self.search_dialog = HistorySearchDialog(self.root, self.history_store)
+
+    def open_stats(self):
+        """打开请求统计窗口（已打开时切换到前台）"""
+        if self.stats_dialog and self.stats_dialog.exists():
+            self.stats_dialog.focus()
+        else:
+            self.stats_dialog = StatsDialog(self.root, get_metrics_collector(settings), get_client_pool(), self.jobs)
+
     def toggle_translation_mode(self):
         global translation_mode, settings
         if translation_mode == "zh-en":
@@ -777,58 +1462,86 @@ class ScreenshotApp:
 
 
     def clear_result(self):
-        self.result_text.config(state=tk.NORMAL)
-        self.result_text.delete(1.0, tk.END)
-        self.result_text.config(state=tk.DISABLED)
+        self.history_view.clear()
         self.update_status("结果已清空")
 
     def update_status(self, message):
+        # 工作线程中调用时转交主线程执行
+        if not self.dispatcher.is_main_thread():
+            self.dispatcher.call(self.update_status, message)
+            return
         self.status_label.config(text=message)
-        # self.root.update_idletasks() # 使用 update_idletasks 避免潜在问题
 
-    def _perform_translation(self, screenshot, x, y, is_area=False):
-        """执行翻译任务（用于线程）"""
+    def _perform_translation(self, screenshot, x, y, is_area=False, kind=None, window=None, capture_ms=None):
+        """执行翻译任务（用于线程）；window 为常驻结果窗口（区域监视）时不再另取窗口"""
         if not screenshot:
             self.update_status("截图无效或已取消")
             return
 
-        # 在截图位置旁边创建结果窗口
-        # 需要在主线程中创建 Tkinter 窗口
-        result_window = None
-        def create_res_window():
-            nonlocal result_window
-            result_window = ResultWindow(x, y)
-        self.root.after(0, create_res_window)
-
-        # 等待窗口创建完毕
-        while result_window is None:
-            time.sleep(0.05)
+        # 创建可取消的任务，同类型的旧任务会被取消
+        job = self.jobs.start(kind or ("area" if is_area else "full"))
+
+        # 在截图位置旁边显示结果窗口（需要在主线程中操作 Tkinter），关闭窗口即取消翻译。
+        # 请求不等待窗口，与窗口显示同时开始；窗口通过 Future 交给主线程中的界面更新使用
+        window_ready = concurrent.futures.Future()
+
+        def acquire_window():
+            """在主线程中取得结果窗口；先到达的界面更新也可直接调用（只会取一次）"""
+            if not window_ready.done():
+                if job.cancelled:
+                    window_ready.set_result(None)
+                elif window is not None:
+                    window.owner = job.id # 常驻窗口改为显示本任务的结果
+                    window_ready.set_result(window)
+                else:
+                    window_ready.set_result(self.window_pool.acquire(
+                        x, y, job.id, on_close=lambda: job.cancel(CANCEL_WINDOW_CLOSED)))
+            return window_ready.result()
+        self.dispatcher.call_soon(acquire_window)
 
         self.update_status("正在分析图片并翻译...")
 
+        is_first = True # 标记是否是第一个块（只在主线程中读写）
+        entry = None # 本次翻译的历史记录编号（只在主线程中读写）
+        record_id = None # 结果在历史数据库中的编号（工作线程写入后才提交 finish_entry）
+
+        def finish_entry():
+            if entry is not None:
+                self.history_view.finish(entry, record_id)
+
         try:
-            accumulated_text = "" # 在线程中累积文本，用于最终确认
-            is_first = True # 标记是否是第一个块
+            def flush_stream(text):
+                """主线程中每帧调用一次，text 为本帧合并后的增量"""
+                nonlocal is_first, entry
+                entry = self._update_ui_streaming(text, acquire_window(), job.id, is_area, is_first, entry)
+                is_first = False # 后续不再是第一个块
 
-            # 定义流式回调，接收增量块
+            # 定义流式回调，接收增量块，交给调度器按帧合并后在主线程更新
             def streaming_callback(content_chunk):
-                nonlocal accumulated_text, is_first
-                if content_chunk:
-                    accumulated_text += content_chunk
-                    # 更新主界面和结果窗口都需要在主线程中进行
-                    # 传递增量块和是否为第一个块的标记
-                    self.root.after(0, lambda chunk=content_chunk, first=is_first: self._update_ui_streaming(chunk, result_window, is_area, first))
-                    is_first = False # 后续不再是第一个块
+                self.dispatcher.post_text(job.id, flush_stream, content_chunk)
 
             # 调用核心翻译函数 (传入当前 API 设置)
+            request_start = time.perf_counter()
             final_result = analyze_and_translate_image(
                 screenshot, translation_mode, api_key, base_url, model, image_detail, use_streaming,
-                callback=streaming_callback if use_streaming else None
+                callback=streaming_callback if use_streaming else None,
+                options=settings, job=job, metrics={} if capture_ms is None else {"capture_ms": capture_ms}
             )
 
+            if job.cancelled:
+                self.update_status("翻译已取消")
+                return
+
+            # 成功的结果保存到可搜索的历史数据库
+            if final_result and not final_result.startswith(TRANSLATION_ERROR_PREFIX):
+                from cache import image_fingerprint
+                record_id = self.history_store.add(final_result, translation_mode, model, image_fingerprint(screenshot),
+                                                   (time.perf_counter() - request_start) * 1000)
+
             # 如果是非流式调用，或者需要最终确认（虽然通常不需要了）
             if not use_streaming and final_result is not None:
-                 self.root.after(0, lambda res=final_result: self._update_ui_final(res, result_window, is_area))
+                 self.dispatcher.call(lambda: self._update_ui_final(final_result, acquire_window(), job.id, is_area,
+                                                                   record_id))
             # 流式调用结束时，状态已在 _update_ui_streaming 中更新
 
             self.update_status("翻译完成")
@@ -838,72 +1551,51 @@ class ScreenshotApp:
             print(error_msg) # 打印详细错误到控制台
             self.update_status(error_msg)
             # 在主线程更新结果窗口显示错误
-            self.root.after(0, lambda: result_window.update_result(error_msg))
-
-
-    def _update_ui_streaming(self, content_chunk, result_window, is_area, is_first_chunk):
-        """在主线程中更新UI（流式），只追加增量内容"""
+            def show_error():
+                result_window = acquire_window()
+                if result_window and result_window.is_owned_by(job.id):
+                    result_window.update_result(error_msg)
+            self.dispatcher.call(show_error)
+        finally:
+            # 流式记录（包括被取消的部分结果）结束，关联数据库中的记录
+            self.dispatcher.call(finish_entry)
+            job.finish()
+
+
+    def _update_ui_streaming(self, content_chunk, result_window, owner, is_area, is_first_chunk, entry=None):
+        """在主线程中更新UI（流式），只追加增量内容，返回历史记录编号"""
         try:
-            self.result_text.config(state=tk.NORMAL) # 允许编辑以插入
-
             if is_first_chunk:
-                # 如果是第一个块，添加时间戳 Header
-                last_idx = self.result_text.index(tk.END) # 获取当前末尾位置
-                timestamp_prefix = f"--- {time.strftime('%Y-%m-%d %H:%M:%S')}"
-                area_suffix = " (区域截图)" if is_area else ""
-                header = f"{timestamp_prefix}{area_suffix} ---\n"
-
-                # 确保在插入 header 前有一个换行符，除非文本框为空或已是换行符
-                if last_idx != "1.0":
-                     last_char = self.result_text.get(f"{last_idx} - 1 char", last_idx)
-                     if last_char != '\n':
-                         self.result_text.insert(tk.END, "\n") # 添加换行符
-
-                # 插入 Header
-                self.result_text.insert(tk.END, header)
+                # 如果是第一个块，新建一条带时间戳 Header 的历史记录
+                entry = self.history_view.begin(is_area)
 
             # 追加增量内容
-            if content_chunk: # 确保块不为空
-                self.result_text.insert(tk.END, content_chunk)
-                self.result_text.see(tk.END) # 滚动到底部
-
-            self.result_text.config(state=tk.DISABLED) # 恢复只读
+            if content_chunk and entry is not None: # 确保块不为空
+                self.history_view.append(entry, content_chunk)
 
             # 更新结果窗口，传递增量块和 first 标记
-            if result_window and result_window.window.winfo_exists():
+            if result_window and result_window.is_owned_by(owner):
                  result_window.stream_update(content_chunk, is_first_chunk)
         except tk.TclError:
             pass # 窗口可能已关闭
         except Exception as e:
             print(f"Error updating UI (streaming): {e}")
+        return entry
 
 
-    def _update_ui_final(self, final_result, result_window, is_area):
+    def _update_ui_final(self, final_result, result_window, owner, is_area, record_id=None):
         """在主线程中更新UI（最终确认/非流式）"""
         # 主要用于非流式情况，或确保流式结束后显示完整结果
         try:
             if final_result is None: # 避免 final_result 为 None 时出错
                 return
 
-            self.result_text.config(state=tk.NORMAL) # 允许编辑
-            last_idx = self.result_text.index(tk.END) # 获取当前末尾位置
-            timestamp_prefix = f"--- {time.strftime('%Y-%m-%d %H:%M:%S')}"
-            area_suffix = " (区域截图)" if is_area else ""
-            header = f"{timestamp_prefix}{area_suffix} ---\n"
-
-            # 确保在插入 header 前有一个换行符
-            if last_idx != "1.0":
-                 last_char = self.result_text.get(f"{last_idx} - 1 char", last_idx)
-                 if last_char != '\n':
-                     self.result_text.insert(tk.END, "\n")
-
-            # 插入 Header 和最终结果
-            self.result_text.insert(tk.END, f"{header}{final_result}\n\n")
-            self.result_text.see(tk.END) # 滚动到底部
-            self.result_text.config(state=tk.DISABLED)
+            # 添加 Header 和最终结果到历史
+            entry = self.history_view.begin(is_area, final_result)
+            self.history_view.finish(entry, record_id)
 
             # 更新结果窗口
-            if result_window and result_window.window.winfo_exists():
+            if result_window and result_window.is_owned_by(owner):
                 result_window.update_result(final_result)
         except tk.TclError:
             pass # 窗口可能已关闭
@@ -913,47 +1605,85 @@ class ScreenshotApp:
 
     def take_screenshot_and_translate(self):
         """全屏截图并翻译"""
+        if self.scheduler.should_debounce("full"): # 连续按键只处理第一次
+            return
         self.update_status("准备全屏截图...")
         try:
+            import pyautogui
+            from PIL import ImageGrab
+            capture_start = time.perf_counter()
             screenshot = ImageGrab.grab()
+            capture_ms = (time.perf_counter() - capture_start) * 1000
             mouse_x, mouse_y = pyautogui.position()
-            # 使用线程处理截图和翻译
-            threading.Thread(target=self._perform_translation, args=(screenshot, mouse_x, mouse_y, False), daemon=True).start()
+            # 交给任务调度器处理翻译
+            self.schedule_translation("full", screenshot, mouse_x, mouse_y, False, capture_ms=capture_ms)
         except Exception as e:
             self.update_status(f"全屏截图出错: {str(e)}")
 
-    def take_area_screenshot(self):
-        """区域截图并翻译"""
+    def take_area_screenshot(self, callback=None):
+        """区域截图并翻译（在快捷键线程中调用）；callback 指定时选区交给它处理"""
+        requested_at = time.perf_counter()
+        if self.area_overlay.visible or self.scheduler.should_debounce("area"):
+            return
+        # 先冻结当前画面，选区直接从这张截图中裁剪
+        try:
+            from PIL import ImageGrab
+            frame = ImageGrab.grab()
+            self.area_capture_ms = (time.perf_counter() - requested_at) * 1000
+            background = self.area_overlay.prepare_background(frame)
+        except Exception as e:
+            self.update_status(f"区域截图出错: {str(e)}")
+            return
+        print(f"冻结画面: {frame.width}x{frame.height}, 用时 {(time.perf_counter() - requested_at) * 1000:.1f}ms")
+        # 区域选择层属于主线程，立即转交主线程显示
+        self.dispatcher.call_soon(self.area_overlay.show, requested_at, frame, background, callback)
         self.update_status("准备区域截图...")
-        # 区域截图需要在主线程中启动UI
-        AreaScreenshot(self.on_area_selected)
 
     def on_area_selected(self, screenshot, x, y):
         """区域截图完成后的回调函数"""
         if screenshot:
             self.update_status("区域截图完成，准备翻译...")
-            # 使用线程处理翻译
-            threading.Thread(target=self._perform_translation, args=(screenshot, x, y, True), daemon=True).start()
+            # 交给任务调度器处理翻译
+            self.schedule_translation("area", screenshot, x, y, True, capture_ms=self.area_capture_ms)
         else:
             self.update_status("区域截图已取消")
 
+    def schedule_translation(self, kind, screenshot, x, y, is_area, window=None, capture_ms=None):
+        """提交翻译任务；并发数已满时排队等待。capture_ms 为截图耗时，记录到请求指标"""
+        # 提交时立即取消同类型的进行中任务：否则工作线程都忙时旧任务会一直跑完，结果再被丢弃，还占着并发名额。
+        # 区域监视在画面变化时频繁提交（排队的监视任务由调度器合并），提交时不取消正在翻译的监视任务，
+        # 否则画面持续变化时每次翻译都在完成前被取消
+        if kind != "watch":
+            self.jobs.cancel_kind(kind, CANCEL_SUPERSEDED)
+        if not self.scheduler.submit(kind, self._perform_translation, screenshot, x, y, is_area, kind, window,
+                                     capture_ms):
+            return
+        stats = self.scheduler.stats()
+        if stats["queued"]:
+            self.update_status(f"翻译任务排队中（正在翻译 {stats['running']} 个，排队 {stats['queued']} 个）")
+
     def monitor_hotkeys(self):
         """监听快捷键的循环 (在单独线程中运行)"""
         print("Hotkey listener thread started.")
         # 注册快捷键
         try:
-            keyboard.add_hotkey(screenshot_hotkey, self.take_screenshot_and_translate)
-            keyboard.add_hotkey(area_screenshot_hotkey, self.take_area_screenshot)
+            with profiler.phase("注册快捷键"):
+                import keyboard
+                # 清理旧的钩子（如果存在）
+                keyboard.unhook_all()
+                keyboard.add_hotkey(screenshot_hotkey, self.take_screenshot_and_translate)
+                keyboard.add_hotkey(area_screenshot_hotkey, self.take_area_screenshot)
             self.hotkey_listener_active = True
+            profiler.mark("快捷键可用")
             print(f"Hotkeys registered: Fullscreen='{screenshot_hotkey}', Area='{area_screenshot_hotkey}'")
-            self.root.after(0, lambda: self.update_status("快捷键监听已启动")) # 更新状态栏
+            self.update_status("快捷键监听已启动") # 更新状态栏（会转交主线程执行）
         except Exception as e:
             self.hotkey_listener_active = False
             error_msg = f"注册快捷键失败: {str(e)}"
             print(error_msg)
             # 在主线程显示错误消息
-            self.root.after(0, lambda: messagebox.showerror("快捷键错误", error_msg))
-            self.root.after(0, lambda: self.update_status("快捷键注册失败，请检查设置或权限"))
+            self.dispatcher.call(messagebox.showerror, "快捷键错误", error_msg)
+            self.update_status("快捷键注册失败，请检查设置或权限")
             return # 注册失败则退出线程
 
         # 保持线程活动以监听快捷键
@@ -968,8 +1698,6 @@ class ScreenshotApp:
             print("Hotkey listener already running.")
             return
 
-        # 清理旧的钩子（如果存在）
-        keyboard.unhook_all()
         self.hotkey_listener_active = False
 
         self.hotkey_thread = threading.Thread(target=self.monitor_hotkeys, daemon=True)
@@ -979,6 +1707,7 @@ class ScreenshotApp:
         """停止快捷键监听"""
         if self.hotkey_listener_active:
             print("Stopping hotkey listener...")
+            import keyboard
             keyboard.unhook_all() # 这会解除阻塞并结束 wait()
             self.hotkey_listener_active = False
             # 等待线程结束 (可选，但有助于确保清理)
@@ -1001,15 +1730,49 @@ class ScreenshotApp:
 
 
     def on_closing(self):
-        """关闭应用"""
+        """关闭应用：先隐藏窗口，在后台等待翻译任务结束，期间主线程继续处理事件"""
+        if not self.running: # 正在关闭
+            return
         print("Closing application...")
         self.running = False
+        if self.instance_server:
+            self.instance_server.stop()
+        self.stop_watch()
+        self.jobs.cancel_all(CANCEL_SHUTDOWN)
+        self.root.withdraw()
+        # 丢弃排队任务，在后台线程中等待已取消的任务结束（任务结束前可能还要在主线程中更新界面，不能阻塞主线程）
+        shutdown = threading.Thread(target=self.scheduler.shutdown, kwargs={"timeout": 2.0}, daemon=True)
+        shutdown.start()
+        self._finish_closing(shutdown)
+
+    def _finish_closing(self, shutdown):
+        """轮询等待调度器关闭，完成后释放资源并销毁窗口"""
+        if shutdown.is_alive():
+            self.root.after(50, self._finish_closing, shutdown)
+            return
+        print(f"翻译任务统计: {self.scheduler.stats()}")
+        print(f"翻译任务取消统计: {self.jobs.stats()}")
+        self.dispatcher.stop()
         self.stop_hotkey_listener()
+        print(f"连接池统计: {get_client_pool().stats()}")
+        close_clients()
+        flush_metrics()
+        self.history_store.close()
         self.root.destroy()
 
 # --- 程序入口 ---
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = ScreenshotApp(root)
+def main(command=COMMAND_SHOW, args=()):
+    profiler.mark("模块导入完成")
+    with profiler.phase("加载设置"):
+        load_global_settings()
+    with profiler.phase("创建主窗口"):
+        root = tk.Tk()
+        app = ScreenshotApp(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
-    root.mainloop()
\ No newline at end of file
+    # 执行命令行指定的操作（截图、翻译文件）
+    if command != COMMAND_SHOW:
+        root.after_idle(app.handle_instance_command, command, args)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main(*startup_command)
\ No newline at end of file
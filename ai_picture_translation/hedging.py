@@ -0,0 +1,83 @@
+"""
+对冲请求
+主服务在指定时间内还没有输出第一个Token时，向备用服务发出相同请求，采用先开始输出的一方，取消另一方
+"""
+
+import asyncio
+
+
+async def hedged_stream(primary, secondary, delay, on_winner=None):
+    """对冲执行两个异步流
+
+    primary / secondary 为 (名称, 无参函数) 元组，函数返回产出增量文本的异步迭代器；
+    delay 秒内主服务没有产出内容（或主服务出错）时启动备用服务。
+    先产出内容的一方胜出，之后只转发它的输出，另一方立即取消。
+    on_winner(名称) 在确定胜出方时调用。两方都失败时抛出主服务的异常。
+    """
+    events = asyncio.Queue()
+    attempts = [primary, secondary]
+    tasks = []
+    errors = {}
+
+    async def run(index):
+        _, factory = attempts[index]
+        try:
+            async for delta in factory():
+                await events.put((index, "delta", delta))
+            await events.put((index, "done", None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await events.put((index, "error", e))
+
+    def start(index):
+        tasks.append(asyncio.ensure_future(run(index)))
+
+    def cancel_others(winner):
+        for index, task in enumerate(tasks):
+            if index != winner and not task.done():
+                task.cancel()
+
+    loop = asyncio.get_running_loop()
+    hedge_at = loop.time() + delay
+    winner = None
+    start(0)
+    try:
+        while True:
+            timeout = None
+            if len(tasks) < len(attempts):
+                timeout = max(0.0, hedge_at - loop.time())
+            try:
+                index, kind, value = await asyncio.wait_for(events.get(), timeout)
+            except asyncio.TimeoutError:
+                # 主服务迟迟没有输出，发出对冲请求
+                print(f"对冲请求: {attempts[0][0]} 在 {delay * 1000:.0f}ms 内无输出，同时请求 {attempts[1][0]}")
+                start(1)
+                continue
+
+            if winner is None:
+                if kind == "error":
+                    errors[index] = value
+                    if len(tasks) < len(attempts):
+                        # 主服务失败，立即改用备用服务
+                        start(1)
+                    elif len(errors) == len(tasks):
+                        raise errors.get(0, value)
+                    continue
+                winner = index
+                cancel_others(winner)
+                if on_winner:
+                    on_winner(attempts[winner][0])
+            elif index != winner:
+                continue
+
+            if kind == "delta":
+                yield value
+            elif kind == "done":
+                return
+            else:
+                raise value
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
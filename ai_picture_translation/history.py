@@ -0,0 +1,220 @@
+"""
+翻译历史
+内存中只保留最近的若干条记录（环形缓冲区），更早的记录从翻译历史数据库（HistoryStore）按需读取；
+主窗口文本框只显示一段连续的记录窗口，滚动到顶部/底部时再按需加载更早/更新的记录，
+使内存占用和插入耗时不随使用时长增长
+"""
+
+import time
+from array import array
+from collections import deque
+
+import tkinter as tk
+
+# 被挤出内存、又没有保存到数据库的记录（翻译失败或已取消）显示的内容
+UNSAVED_TEXT = "(记录未保存：翻译失败或已取消)"
+
+
+class TranslationHistory:
+    """有界的翻译历史：本次运行的最近记录在内存中，更早的记录从 HistoryStore 按需读取
+
+    每条记录是字典 {"time", "area", "text"}，按添加顺序编号（从0开始）。
+    只在主线程中使用。
+    """
+    def __init__(self, store, memory_entries=200):
+        self.store = store
+        self.recent = deque(maxlen=max(1, int(memory_entries)))
+        self.record_ids = array("q") # 记录编号 -> 数据库中的记录编号（-1 表示未保存）
+        self.areas = bytearray() # 记录编号 -> 是否为区域截图（数据库中不保存）
+
+    def __len__(self):
+        return len(self.record_ids)
+
+    @property
+    def first_in_memory(self):
+        """内存中最早一条记录的编号"""
+        return len(self.record_ids) - len(self.recent)
+
+    def add(self, is_area, text=""):
+        """新增一条记录（流式输出时先创建空记录），返回记录编号"""
+        self.recent.append({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "area": is_area, "text": text})
+        self.record_ids.append(-1)
+        self.areas.append(1 if is_area else 0)
+        return len(self.record_ids) - 1
+
+    def append_text(self, index, chunk):
+        """向仍在内存中的记录追加流式增量"""
+        if index >= self.first_in_memory:
+            self.recent[index - self.first_in_memory]["text"] += chunk
+
+    def finish(self, index, record_id=None):
+        """记录完成（或被取消）；record_id 为该结果在 HistoryStore 中的编号，之后被挤出内存时据此读取"""
+        if record_id is not None and 0 <= index < len(self.record_ids):
+            self.record_ids[index] = record_id
+
+    def get_range(self, start, end):
+        """返回编号 [start, end) 的记录列表，内存中没有的从数据库读取"""
+        start = max(0, start)
+        end = min(len(self.record_ids), end)
+        entries = []
+        stored_end = min(end, self.first_in_memory)
+        if start < stored_end:
+            entries.extend(self._read_from_store(start, stored_end))
+        for index in range(max(start, self.first_in_memory), end):
+            entries.append(self.recent[index - self.first_in_memory])
+        return entries
+
+    def _read_from_store(self, start, end):
+        rows = self.store.get_many([record_id for record_id in self.record_ids[start:end] if record_id >= 0])
+        entries = []
+        for index in range(start, end):
+            row = rows.get(self.record_ids[index])
+            if row is None:
+                entries.append({"time": "", "area": bool(self.areas[index]), "text": UNSAVED_TEXT})
+            else:
+                entries.append({"time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["created"])),
+                                "area": bool(self.areas[index]), "text": row["text"]})
+        return entries
+
+    def clear(self):
+        """清空显示的历史（数据库中的记录仍可搜索）"""
+        self.recent.clear()
+        self.record_ids = array("q")
+        self.areas = bytearray()
+
+
+class HistoryView:
+    """在 Text 控件中虚拟化显示翻译历史：只渲染编号 [first, last) 的连续记录窗口"""
+    def __init__(self, text_widget, history, display_entries=50, page_entries=20):
+        self.text = text_widget
+        self.history = history
+        self.display_entries = max(2, int(display_entries))
+        self.page_entries = max(1, min(int(page_entries), self.display_entries // 2))
+        self.first = 0 # 显示窗口中第一条记录的编号
+        self.last = 0 # 显示窗口之后的第一条记录编号
+        self.loading = False
+        self.text.config(yscrollcommand=self._on_scroll)
+
+    @staticmethod
+    def format_header(entry):
+        area_suffix = " (区域截图)" if entry["area"] else ""
+        return f"--- {entry['time']}{area_suffix} ---\n"
+
+    def _render(self, index, entry, position):
+        """在 position 处插入一条记录，整条记录带有 entry<编号> 标签，便于整体删除"""
+        self.text.insert(position, self.format_header(entry) + entry["text"] + "\n\n", (f"entry{index}",))
+
+    def _remove(self, index):
+        tag = f"entry{index}"
+        ranges = self.text.tag_ranges(tag)
+        if ranges:
+            self.text.delete(ranges[0], ranges[-1])
+        self.text.tag_delete(tag)
+
+    def _following_latest(self):
+        return self.last == len(self.history)
+
+    def show_latest(self):
+        """重新渲染最近的记录窗口"""
+        self.text.config(state=tk.NORMAL)
+        for index in range(self.first, self.last):
+            self.text.tag_delete(f"entry{index}")
+        self.text.delete("1.0", tk.END)
+        self.last = len(self.history)
+        self.first = max(0, self.last - self.display_entries)
+        for offset, entry in enumerate(self.history.get_range(self.first, self.last)):
+            self._render(self.first + offset, entry, tk.END)
+        self.text.config(state=tk.DISABLED)
+        self.text.see(tk.END)
+
+    def begin(self, is_area, text=""):
+        """开始一条新记录并显示，返回记录编号"""
+        if not self._following_latest():
+            self.show_latest()
+        index = self.history.add(is_area, text)
+        self.text.config(state=tk.NORMAL)
+        self._render(index, self.history.get_range(index, index + 1)[0], tk.END)
+        self.last = index + 1
+        # 超出显示窗口时删除最早显示的记录
+        while self.last - self.first > self.display_entries:
+            self._remove(self.first)
+            self.first += 1
+        self.text.config(state=tk.DISABLED)
+        self.text.see(tk.END)
+        return index
+
+    def append(self, index, chunk):
+        """向记录追加流式增量，只插入增量部分"""
+        if not chunk:
+            return
+        self.history.append_text(index, chunk)
+        if not (self.first <= index < self.last):
+            return
+        ranges = self.text.tag_ranges(f"entry{index}")
+        if not ranges:
+            return
+        self.text.config(state=tk.NORMAL)
+        # 插入到记录末尾的空行之前
+        self.text.insert(f"{ranges[-1]} - 2 chars", chunk, (f"entry{index}",))
+        self.text.config(state=tk.DISABLED)
+        if self._following_latest():
+            self.text.see(tk.END)
+
+    def finish(self, index, record_id=None):
+        self.history.finish(index, record_id)
+
+    def clear(self):
+        self.history.clear()
+        self.first = self.last = 0
+        self.show_latest()
+
+    def _on_scroll(self, first, last):
+        """滚动到顶部/底部时按需加载更早/更新的记录"""
+        first, last = float(first), float(last)
+        if self.loading or (first <= 0.0 and last >= 1.0): # 内容未超出一屏
+            return
+        if first <= 0.0 and self.first > 0:
+            self.loading = True
+            self.text.after_idle(self._load_older)
+        elif last >= 1.0 and not self._following_latest():
+            self.loading = True
+            self.text.after_idle(self._load_newer)
+
+    def _keep_view(self):
+        """在当前可见的第一行设置锚点，插入/删除其它记录后视图保持不动"""
+        self.text.mark_set("history_view", "@0,0")
+        self.text.mark_gravity("history_view", tk.RIGHT) # 在锚点处插入的更早记录位于锚点之前
+
+    def _load_older(self):
+        try:
+            start = max(0, self.first - self.page_entries)
+            entries = self.history.get_range(start, self.first)
+            self._keep_view()
+            self.text.config(state=tk.NORMAL)
+            for offset, entry in reversed(list(enumerate(entries))):
+                self._render(start + offset, entry, "1.0")
+            self.first = start
+            while self.last - self.first > self.display_entries:
+                self.last -= 1
+                self._remove(self.last)
+            self.text.config(state=tk.DISABLED)
+            self.text.yview("history_view")
+        finally:
+            self.loading = False
+
+    def _load_newer(self):
+        try:
+            end = min(len(self.history), self.last + self.page_entries)
+            entries = self.history.get_range(self.last, end)
+            self._keep_view()
+            self.text.config(state=tk.NORMAL)
+            for offset, entry in enumerate(entries):
+                self._render(self.last + offset, entry, tk.END)
+            self.last = end
+            while self.last - self.first > self.display_entries:
+                self._remove(self.first)
+                self.first += 1
+            self.text.config(state=tk.DISABLED)
+            self.text.yview("history_view")
+        finally:
+            self.loading = False
@@ -0,0 +1,133 @@
+"""
+翻译历史持久化
+每条翻译结果写入 SQLite（时间、模式、模型、截图指纹、耗时、译文），并建立 FTS5 全文索引用于快速搜索。
+使用 trigram 分词器以支持中文等不以空格分词的文字的子串搜索；
+SQLite 不支持 FTS5/trigram 或搜索词少于3个字符时退化为 LIKE 查询
+"""
+
+import time
+import sqlite3
+import threading
+
+# trigram 分词器能匹配的最短搜索词长度
+FTS_MIN_QUERY_LENGTH = 3
+
+# 单条 SQL 中按编号查询的记录数上限（SQLite 参数个数有限制）
+QUERY_BATCH_SIZE = 500
+
+HISTORY_COLUMNS = ("id", "created", "mode", "model", "image_hash", "latency_ms", "text")
+
+
+class HistoryStore:
+    """翻译历史数据库，线程安全"""
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.fts_enabled = False
+
+        try:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "id INTEGER PRIMARY KEY, created REAL NOT NULL, mode TEXT, model TEXT, "
+                "image_hash TEXT, latency_ms REAL, text TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_created ON history(created)")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"打开翻译历史数据库失败（历史不会保存）: {e}")
+            self.conn = None
+            return
+
+        try:
+            existed = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'").fetchone()
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                "text, content='history', content_rowid='id', tokenize='trigram')"
+            )
+            if not existed:
+                # 之前没有全文索引时保存的记录需要补建索引
+                self.conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+            self.conn.commit()
+            self.fts_enabled = True
+        except sqlite3.Error as e:
+            print(f"SQLite 不支持 FTS5 trigram 全文索引，历史搜索使用 LIKE 查询: {e}")
+
+    def add(self, text, mode="", model="", image_hash="", latency_ms=None, created=None):
+        """保存一条翻译结果，返回记录编号"""
+        if self.conn is None or not text:
+            return None
+        with self.lock:
+            try:
+                cursor = self.conn.execute(
+                    "INSERT INTO history (created, mode, model, image_hash, latency_ms, text) VALUES (?, ?, ?, ?, ?, ?)",
+                    (created or time.time(), mode, model, image_hash, latency_ms, text)
+                )
+                if self.fts_enabled:
+                    self.conn.execute("INSERT INTO history_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+                self.conn.commit()
+                return cursor.lastrowid
+            except sqlite3.Error as e:
+                print(f"保存翻译历史失败: {e}")
+                return None
+
+    def search(self, query, limit=100):
+        """搜索译文，按时间倒序返回记录字典列表；query 为空时返回最近的记录"""
+        if self.conn is None:
+            return []
+        query = query.strip()
+        select = "SELECT " + ", ".join("h." + column for column in HISTORY_COLUMNS) + " FROM history h"
+        if not query:
+            sql, params = select + " ORDER BY h.id DESC LIMIT ?", (limit,)
+        elif self.fts_enabled and len(query) >= FTS_MIN_QUERY_LENGTH:
+            # 整个搜索词作为短语匹配（trigram 分词下等价于子串匹配）
+            phrase = '"' + query.replace('"', '""') + '"'
+            # 在全文索引内按 rowid 倒序取前 limit 条，常见词也不需要收集全部匹配
+            sql = (select + " WHERE h.id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?"
+                   " ORDER BY rowid DESC LIMIT ?) ORDER BY h.id DESC")
+            params = (phrase, limit)
+        else:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            sql = select + " WHERE h.text LIKE ? ESCAPE '\\' ORDER BY h.id DESC LIMIT ?"
+            params = (pattern, limit)
+        with self.lock:
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                print(f"搜索翻译历史失败: {e}")
+                return []
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+    def get_many(self, record_ids):
+        """按记录编号读取，返回 {编号: 记录字典}（不存在的编号不包含在内）"""
+        record_ids = list(record_ids)
+        if self.conn is None or not record_ids:
+            return {}
+        select = "SELECT " + ", ".join(HISTORY_COLUMNS) + " FROM history WHERE id IN "
+        rows = []
+        with self.lock:
+            try:
+                for start in range(0, len(record_ids), QUERY_BATCH_SIZE):
+                    batch = record_ids[start:start + QUERY_BATCH_SIZE]
+                    rows.extend(self.conn.execute(select + "(" + ", ".join("?" * len(batch)) + ")", batch).fetchall())
+            except sqlite3.Error as e:
+                print(f"读取翻译历史失败: {e}")
+                return {}
+        return {row[0]: dict(zip(HISTORY_COLUMNS, row)) for row in rows}
+
+    def count(self):
+        if self.conn is None:
+            return 0
+        with self.lock:
+            try:
+                return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,137 @@
+"""
+自适应图片编码
+根据截图内容（界面/文字为主 或 照片/游戏画面为主）和上传字节预算，在 PNG、调色板PNG、JPEG、WebP 之间选择编码方式
+"""
+
+import time
+from io import BytesIO
+from collections import namedtuple
+
+from PIL import Image, features
+
+# 编码结果：data 为编码后的原始字节，format 为 PNG/PNG-palette/JPEG/WEBP，size 为字节数，encode_ms 为编码总耗时
+EncodedImage = namedtuple("EncodedImage", "data format mime size encode_ms quality")
+
+MIME_TYPES = {
+    "PNG": "image/png",
+    "PNG-palette": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+# 有损编码依次尝试的质量
+QUALITY_STEPS = [90, 80, 70, 60, 50, 40]
+
+# 最低质量仍超出预算时，每次缩小的比例和最多缩小次数
+DOWNSCALE_FACTOR = 0.75
+MAX_DOWNSCALE_STEPS = 2
+# 最多缩小到原尺寸的比例
+MIN_SCALE = DOWNSCALE_FACTOR ** MAX_DOWNSCALE_STEPS
+# 按字节数估算缩放比例时留的余量（编码字节数约与像素数成正比）
+SCALE_MARGIN = 0.9
+
+# 内容分析时的缩略图最长边
+ANALYSIS_MAX_SIDE = 256
+
+# 前32种颜色覆盖的像素比例超过该值时认为是界面/文字类（平面色块）内容
+FLAT_COLOR_COVERAGE = 0.85
+
+
+def is_flat_content(image):
+    """判断截图是否以平面色块为主（界面、文字），而不是照片类内容"""
+    thumb = image.convert("RGB")
+    thumb.thumbnail((ANALYSIS_MAX_SIDE, ANALYSIS_MAX_SIDE))
+    total = thumb.width * thumb.height
+    colors = thumb.getcolors(maxcolors=total)
+    if not colors:
+        return False
+    colors.sort(reverse=True)
+    top_count = sum(count for count, _ in colors[:32])
+    return top_count / float(total) >= FLAT_COLOR_COVERAGE
+
+
+def _save(image, fmt, **params):
+    """按指定格式编码为字节"""
+    buffered = BytesIO()
+    image.save(buffered, format=fmt, **params)
+    return buffered.getvalue()
+
+
+def _encode_lossless(image, max_bytes):
+    """界面类内容：先尝试无损PNG，超出预算再尝试调色板PNG"""
+    smallest = None
+    for fmt, encode in (("PNG", lambda: _save(image, "PNG")),
+                        ("PNG-palette", lambda: _save(image.convert("RGB").quantize(colors=256), "PNG"))):
+        data = encode()
+        if smallest is None or len(data) < len(smallest[1]):
+            smallest = (fmt, data)
+        if len(data) <= max_bytes:
+            break
+    return smallest[0], None, smallest[1]
+
+
+def _encode_lossy(image, max_bytes, steps=QUALITY_STEPS):
+    """有损编码：优先 WebP（若可用），否则 JPEG；在 steps 中对质量二分查找，取满足预算的最高质量"""
+    rgb = image.convert("RGB")
+    fmt = "WEBP" if features.check("webp") else "JPEG"
+    params = {"method": 0} if fmt == "WEBP" else {}
+
+    low, high = 0, len(steps) - 1
+    fitted = None
+    smallest = None
+    # steps 从高到低排列，寻找第一个满足预算的质量
+    while low <= high:
+        mid = (low + high) // 2
+        quality = steps[mid]
+        data = _save(rgb, fmt, quality=quality, **params)
+        if smallest is None or len(data) < len(smallest[2]):
+            smallest = (fmt, quality, data)
+        if len(data) <= max_bytes:
+            fitted = (fmt, quality, data)
+            high = mid - 1
+        else:
+            low = mid + 1
+    return fitted or smallest
+
+
+def encode_image(image, image_format="auto", max_bytes=1500000):
+    """编码截图用于上传
+
+    image_format 为 "png" 时保持原来的无损PNG；为 "auto" 时根据内容和字节预算自动选择：
+    界面类内容优先无损，超出预算再降为有损；最低质量仍超预算时按字节数估算比例缩小后重试。
+    """
+    start = time.perf_counter()
+
+    if image_format == "png":
+        data = _save(image, "PNG")
+        elapsed = (time.perf_counter() - start) * 1000
+        return EncodedImage(data, "PNG", MIME_TYPES["PNG"], len(data), elapsed, None)
+
+    result = None
+    if is_flat_content(image):
+        result = _encode_lossless(image, max_bytes)
+
+    if result is None or len(result[2]) > max_bytes:
+        # 先以最低质量编码一次：仍超出预算时按字节数估算缩放比例，直接缩小到预计满足预算的尺寸，
+        # 而不是逐级缩小、每级都完整搜索一遍质量（噪点多的大截图每次编码要几百毫秒）
+        scale = 1.0
+        current = image
+        candidate = _encode_lossy(current, max_bytes, QUALITY_STEPS[-1:])
+        for _ in range(MAX_DOWNSCALE_STEPS):
+            if len(candidate[2]) <= max_bytes or scale <= MIN_SCALE:
+                break
+            scale = max(MIN_SCALE, scale * (max_bytes / float(len(candidate[2]))) ** 0.5 * SCALE_MARGIN)
+            current = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                                   Image.LANCZOS)
+            candidate = _encode_lossy(current, max_bytes, QUALITY_STEPS[-1:])
+        # 最低质量满足预算时再在更高的质量中查找
+        if len(candidate[2]) <= max_bytes and len(QUALITY_STEPS) > 1:
+            better = _encode_lossy(current, max_bytes, QUALITY_STEPS[:-1])
+            if len(better[2]) <= max_bytes:
+                candidate = better
+        if result is None or len(candidate[2]) < len(result[2]):
+            result = candidate
+
+    fmt, quality, data = result
+    elapsed = (time.perf_counter() - start) * 1000
+    return EncodedImage(data, fmt, MIME_TYPES[fmt], len(data), elapsed, quality)
@@ -0,0 +1,240 @@
+"""
+翻译任务句柄和调度
+每次翻译对应一个可取消的任务：结果窗口关闭、同类型的新截图或程序退出时中断进行中的 HTTP 流，并记录被丢弃的工作量。
+JobScheduler 用固定数量的工作线程按优先级执行任务，并对快捷键做防抖
+"""
+
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+
+# 取消原因
+CANCEL_WINDOW_CLOSED = "window_closed"
+CANCEL_SUPERSEDED = "superseded"
+CANCEL_SHUTDOWN = "shutdown"
+
+# 任务优先级（数值越小越先执行）：区域截图是用户主动框选的，优先于全屏截图，区域监视的自动翻译最后
+JOB_PRIORITIES = {"area": 0, "full": 1, "watch": 2}
+
+
+class TranslationJob:
+    """可取消的翻译任务"""
+    _ids = itertools.count(1)
+
+    def __init__(self, kind, registry=None):
+        self.id = next(self._ids)
+        self.kind = kind
+        self.registry = registry
+        self.created = time.time()
+        self.future = None
+        self.cancelled = False
+        self.cancel_reason = None
+        self.finished = False
+        self.chars_received = 0
+        self.lock = threading.Lock()
+
+    def attach(self, future):
+        """关联后台请求的 Future；如果任务已被取消则立即取消请求"""
+        with self.lock:
+            self.future = future
+            cancelled = self.cancelled
+        if cancelled:
+            future.cancel()
+
+    def record_chunk(self, content_chunk):
+        """记录已收到的内容长度，用于统计取消时丢弃的工作量"""
+        self.chars_received += len(content_chunk)
+
+    def cancel(self, reason):
+        """取消任务，返回是否确实取消了进行中的任务"""
+        with self.lock:
+            if self.cancelled or self.finished:
+                return False
+            self.cancelled = True
+            self.cancel_reason = reason
+            future = self.future
+        if self.registry is not None:
+            self.registry._on_cancelled(self)
+        if future is not None:
+            future.cancel()
+        return True
+
+    def finish(self):
+        """标记任务结束（正常完成或出错）"""
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+        if self.registry is not None:
+            self.registry._on_finished(self)
+
+
+class JobRegistry:
+    """跟踪进行中的翻译任务并统计取消情况"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.started = 0
+        self.completed = 0
+        self.cancelled = {}
+        self.dropped_chars = 0
+
+    def start(self, kind, supersede=True):
+        """创建新任务；supersede 为 True 时取消同类型的进行中任务"""
+        job = TranslationJob(kind, self)
+        with self.lock:
+            previous = [other for other in self.active.values() if other.kind == kind] if supersede else []
+            self.active[job.id] = job
+            self.started += 1
+        for other in previous:
+            other.cancel(CANCEL_SUPERSEDED)
+        return job
+
+    def cancel_kind(self, kind, reason=CANCEL_SUPERSEDED):
+        """取消指定类型的所有进行中任务，返回取消的个数"""
+        with self.lock:
+            jobs = [job for job in self.active.values() if job.kind == kind]
+        return len([job for job in jobs if job.cancel(reason)])
+
+    def cancel_all(self, reason=CANCEL_SHUTDOWN):
+        """取消所有进行中的任务"""
+        with self.lock:
+            jobs = list(self.active.values())
+        for job in jobs:
+            job.cancel(reason)
+
+    def _on_cancelled(self, job):
+        with self.lock:
+            self.active.pop(job.id, None)
+            self.cancelled[job.cancel_reason] = self.cancelled.get(job.cancel_reason, 0) + 1
+            self.dropped_chars += job.chars_received
+        print(f"已取消翻译任务 #{job.id} ({job.kind}, {job.cancel_reason})，"
+              f"运行 {time.time() - job.created:.1f}s，丢弃已接收的 {job.chars_received} 字")
+
+    def _on_finished(self, job):
+        with self.lock:
+            if self.active.pop(job.id, None) is not None:
+                self.completed += 1
+
+    def stats(self):
+        """返回任务统计"""
+        with self.lock:
+            return {
+                "started": self.started,
+                "completed": self.completed,
+                "active": len(self.active),
+                "cancelled": dict(self.cancelled),
+                "dropped_chars": self.dropped_chars,
+            }
+
+
+class JobScheduler:
+    """翻译任务调度器：有界并发、优先级队列、快捷键防抖
+
+    submit 提交的任务在工作线程中执行；同类型的任务在队列中只保留最新的一个。
+    """
+    def __init__(self, max_concurrency=2, debounce_ms=400, name="translation"):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.debounce = max(0, debounce_ms) / 1000.0
+        self.condition = threading.Condition()
+        self.queue = [] # 堆：(优先级, 序号, 类型, 函数, 参数, 提交时间)
+        self.sequence = itertools.count()
+        self.last_trigger = {} # 类型 -> 上次触发时间
+        self.running = 0
+        self.accepting = True
+        self.submitted = 0
+        self.debounced = 0
+        self.coalesced = 0
+        self.wait_ms = deque(maxlen=100) # 最近任务的排队时间
+        self.run_ms = deque(maxlen=100) # 最近任务的执行时间
+        self.workers = []
+        for index in range(self.max_concurrency):
+            worker = threading.Thread(target=self._worker, name=f"{name}-worker-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def should_debounce(self, kind):
+        """快捷键触发时调用：距同类型上次触发不足防抖间隔时返回 True（本次应忽略）"""
+        now = time.monotonic()
+        with self.condition:
+            last = self.last_trigger.get(kind)
+            if last is not None and now - last < self.debounce:
+                self.debounced += 1
+                return True
+            self.last_trigger[kind] = now
+            return False
+
+    def submit(self, kind, func, *args):
+        """提交任务，返回是否已加入队列（调度器关闭后返回 False）"""
+        with self.condition:
+            if not self.accepting:
+                return False
+            # 同类型的排队任务会被新任务取代，不再执行
+            remaining = [item for item in self.queue if item[2] != kind]
+            if len(remaining) != len(self.queue):
+                self.coalesced += len(self.queue) - len(remaining)
+                self.queue = remaining
+                heapq.heapify(self.queue)
+            heapq.heappush(self.queue, (JOB_PRIORITIES.get(kind, len(JOB_PRIORITIES)), next(self.sequence),
+                                        kind, func, args, time.perf_counter()))
+            self.submitted += 1
+            self.condition.notify()
+        return True
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while self.accepting and not self.queue:
+                    self.condition.wait()
+                if not self.queue: # 已关闭且队列为空
+                    return
+                _, _, kind, func, args, submitted_at = heapq.heappop(self.queue)
+                self.running += 1
+            started = time.perf_counter()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"翻译任务 ({kind}) 出错: {e}")
+            finally:
+                finished = time.perf_counter()
+                with self.condition:
+                    self.running -= 1
+                    self.wait_ms.append((started - submitted_at) * 1000)
+                    self.run_ms.append((finished - started) * 1000)
+                    self.condition.notify_all()
+
+    def shutdown(self, timeout=3.0):
+        """停止接受新任务，丢弃排队中的任务，并等待正在执行的任务结束（最多 timeout 秒）"""
+        with self.condition:
+            self.accepting = False
+            dropped = len(self.queue)
+            self.queue = []
+            self.condition.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        alive = len([worker for worker in self.workers if worker.is_alive()])
+        print(f"任务调度器已关闭：丢弃排队任务 {dropped} 个，未在 {timeout:.1f}s 内结束的任务 {alive} 个")
+
+    def stats(self):
+        """返回队列深度和最近任务的排队/执行耗时"""
+        def summary(values):
+            if not values:
+                return None
+            ordered = sorted(values)
+            return {"avg": round(sum(ordered) / len(ordered), 1),
+                    "p50": round(ordered[len(ordered) // 2], 1), "max": round(ordered[-1], 1)}
+
+        with self.condition:
+            return {
+                "queued": len(self.queue),
+                "running": self.running,
+                "max_concurrency": self.max_concurrency,
+                "submitted": self.submitted,
+                "debounced": self.debounced,
+                "coalesced": self.coalesced,
+                "wait_ms": summary(self.wait_ms),
+                "run_ms": summary(self.run_ms),
+            }
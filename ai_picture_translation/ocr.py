@@ -0,0 +1,111 @@
+"""
+本地OCR
+翻译前先用本地OCR引擎识别截图中的文字，识别可信时只把文字发送给（更便宜、更快的）文本模型，
+不再上传整张图片；识别置信度低（复杂背景、艺术字等）时仍走视觉模型。
+引擎通过 register_engine 注册，内置 Tesseract（需安装 pytesseract 和 Tesseract 程序）
+"""
+
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+# 识别结果：lines 为按阅读顺序的文字行，confidence 为按字符数加权的平均置信度（0~1）
+OcrResult = namedtuple("OcrResult", "lines confidence engine ocr_ms")
+
+# 文字过小时先放大再识别（Tesseract 对约 30 像素高的文字效果最好）
+MIN_OCR_HEIGHT = 400
+UPSCALE_FACTOR = 2
+
+
+class OcrEngine(ABC):
+    """OCR引擎接口，子类实现 available() 和 recognize()"""
+    name = ""
+
+    @abstractmethod
+    def available(self):
+        """引擎是否可用（依赖已安装）"""
+
+    @abstractmethod
+    def recognize(self, image, mode):
+        """识别截图中的文字，mode 为翻译模式（决定识别语言），返回 OcrResult"""
+
+
+class TesseractEngine(OcrEngine):
+    """Tesseract OCR（可选依赖 pytesseract）"""
+    name = "tesseract"
+    # 翻译模式对应的识别语言
+    LANGUAGES = {"zh-en": "chi_sim+eng", "en-zh": "eng"}
+
+    def __init__(self):
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            try:
+                import pytesseract
+                pytesseract.get_tesseract_version()
+                self._available = True
+            except Exception as e: # 未安装 pytesseract 或找不到 Tesseract 程序
+                print(f"Tesseract OCR 不可用: {e}")
+                self._available = False
+        return self._available
+
+    def recognize(self, image, mode):
+        import pytesseract
+        start = time.perf_counter()
+        gray = image.convert("L")
+        if gray.height < MIN_OCR_HEIGHT:
+            gray = gray.resize((gray.width * UPSCALE_FACTOR, gray.height * UPSCALE_FACTOR))
+        language = self.LANGUAGES.get(mode, "eng")
+        data = pytesseract.image_to_data(gray, lang=language, output_type=pytesseract.Output.DICT)
+
+        # 按 (区块, 段落, 行) 把单词合并为行，置信度 -1 的是非文字区域
+        separator = "" if language.startswith("chi") else " "
+        lines = {}
+        weighted = 0.0
+        chars = 0
+        for index, word in enumerate(data["text"]):
+            word = word.strip()
+            confidence = float(data["conf"][index])
+            if not word or confidence < 0:
+                continue
+            key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+            lines.setdefault(key, []).append(word)
+            weighted += confidence * len(word)
+            chars += len(word)
+        text_lines = [separator.join(words) for _, words in sorted(lines.items())]
+        return OcrResult(text_lines, weighted / chars / 100.0 if chars else 0.0, self.name,
+                         (time.perf_counter() - start) * 1000)
+
+
+_engine_factories = {"tesseract": TesseractEngine}
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def register_engine(name, factory):
+    """注册OCR引擎，factory 无参数调用返回 OcrEngine 实例"""
+    with _engines_lock:
+        _engine_factories[name] = factory
+        _engines.pop(name, None)
+
+
+def engine_names():
+    """已注册的引擎名称"""
+    return list(_engine_factories)
+
+
+def get_engine(name):
+    """获取可用的OCR引擎实例，未注册或不可用时返回 None"""
+    if not name or name == "none":
+        return None
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            factory = _engine_factories.get(name)
+            if factory is None:
+                print(f"未知的OCR引擎: {name}")
+                return None
+            engine = _engines[name] = factory()
+    return engine if engine.available() else None
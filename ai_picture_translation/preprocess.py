@@ -0,0 +1,172 @@
+"""
+截图预处理
+上传前裁掉大面积空白/无文字区域：基于边缘投影（NumPy 向量化）找出文字类内容的外接框（分块时也用于找空白间隙）；
+根据文字行高和边缘密度自动选择图像细节级别（大而稀疏的文字用 low，小字或密集文字才用 high）
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# 灰度差超过该值的像素视为边缘
+EDGE_THRESHOLD = 24
+
+# 行/列中边缘像素占比超过该值才认为含有内容（过滤零散噪点）
+MIN_PROFILE_RATIO = 0.002
+
+# 裁剪后面积不足原图该比例时才执行裁剪，收益太小则保持原图
+MAX_KEEP_RATIO = 0.9
+
+# 分析时的降采样步长上限（大图隔行隔列取样以加快速度）
+MAX_ANALYSIS_SIDE = 1600
+
+# 低细节模式下模型看到的图片最长边（像素）
+LOW_DETAIL_SIDE = 512
+# 缩放到低细节尺寸后文字行高不低于该值才能可靠辨认
+MIN_LOW_DETAIL_TEXT_PX = 14
+# 文字行数超过该值视为密集文字（网页、文档、代码等），使用高细节
+MAX_LOW_DETAIL_LINES = 20
+# 边缘像素占比超过该值视为纹理繁杂的画面（文字行估计不可靠），使用高细节
+MAX_LOW_DETAIL_EDGE_DENSITY = 0.3
+# 行中边缘像素占比超过该值视为文字行
+TEXT_ROW_RATIO = 0.005
+# 高度超过该值（像素）的“文字行”多半是图片、图标等非文字内容，不参与行高估计；低于最小值的是细线等噪声
+MAX_TEXT_LINE_PX = 160
+MIN_TEXT_LINE_PX = 6
+# 连续长度超过该值（像素）的竖直/水平边缘视为对话框边框、分隔线等直线，估计文字行前去掉
+STRAIGHT_LINE_PX = 64
+# 查找长直线时沿直线方向的取样间隔（直线隔行取样仍然连续，计算量减为几分之一）
+STRAIGHT_LINE_STRIDE = 4
+
+# 文字统计：line_height 为文字行高中位数（原图像素，无文字行时为 0），lines 为文字行数，
+# edge_density 为边缘像素占比，analysis_ms 为分析耗时
+TextStats = namedtuple("TextStats", "line_height lines edge_density analysis_ms")
+
+
+def edge_map(image):
+    """返回 (边缘布尔矩阵, 降采样步长)，图片过小时返回 (None, 步长)"""
+    gray = np.asarray(image.convert("L"), dtype=np.int16)
+    step = max(1, int(np.ceil(max(gray.shape) / float(MAX_ANALYSIS_SIDE))))
+    sample = gray[::step, ::step]
+    if sample.shape[0] < 2 or sample.shape[1] < 2:
+        return None, step
+
+    # 水平和垂直方向的相邻像素差作为边缘强度
+    edges = np.zeros(sample.shape, dtype=bool)
+    edges[:, 1:] |= np.abs(np.diff(sample, axis=1)) > EDGE_THRESHOLD
+    edges[1:, :] |= np.abs(np.diff(sample, axis=0)) > EDGE_THRESHOLD
+    return edges, step
+
+
+def find_gutter(profile, target, radius):
+    """在 target 附近 ±radius 内找最适合切分的位置：profile（行/列边缘投影）最小处，
+    有多个时取最宽的空白带的中间；返回与 profile 相同坐标的位置"""
+    low = max(1, target - radius)
+    high = min(len(profile) - 1, target + radius + 1)
+    if low >= high:
+        return target
+    window = profile[low:high]
+    candidates = window == window.min()
+    changes = np.diff(np.concatenate(([0], candidates.astype(np.int8), [0])))
+    starts = np.nonzero(changes == 1)[0]
+    ends = np.nonzero(changes == -1)[0]
+    widest = int(np.argmax(ends - starts))
+    return low + int((starts[widest] + ends[widest]) // 2)
+
+
+def find_text_bbox(image):
+    """返回文字类内容的外接框 (left, top, right, bottom)，找不到时返回 None"""
+    edges, step = edge_map(image)
+    if edges is None:
+        return None
+
+    row_profile = edges.sum(axis=1)
+    col_profile = edges.sum(axis=0)
+    rows = np.nonzero(row_profile > max(1, MIN_PROFILE_RATIO * edges.shape[1]))[0]
+    cols = np.nonzero(col_profile > max(1, MIN_PROFILE_RATIO * edges.shape[0]))[0]
+    if rows.size == 0 or cols.size == 0:
+        return None
+
+    top = int(rows[0]) * step
+    bottom = min(image.height, (int(rows[-1]) + 1) * step)
+    left = int(cols[0]) * step
+    right = min(image.width, (int(cols[-1]) + 1) * step)
+    return left, top, right, bottom
+
+
+def trim_to_text_region(image, margin=16):
+    """裁剪到文字区域（保留边距），返回 (图片, 裁剪框)；无需裁剪时返回原图和 None"""
+    bbox = find_text_bbox(image)
+    if bbox is None:
+        return image, None
+
+    left, top, right, bottom = bbox
+    left = max(0, left - margin)
+    top = max(0, top - margin)
+    right = min(image.width, right + margin)
+    bottom = min(image.height, bottom + margin)
+
+    original_pixels = image.width * image.height
+    trimmed_pixels = (right - left) * (bottom - top)
+    if trimmed_pixels >= original_pixels * MAX_KEEP_RATIO:
+        return image, None
+
+    saved_pixels = original_pixels - trimmed_pixels
+    print(f"截图裁剪: {image.width}x{image.height} -> {right - left}x{bottom - top}, "
+          f"减少 {saved_pixels} 像素 ({saved_pixels * 100.0 / original_pixels:.1f}%)")
+    return image.crop((left, top, right, bottom)), (left, top, right, bottom)
+
+
+def _run_length_so_far(edges):
+    """每个边缘像素在所在列中从上往下数的连续长度（非边缘像素为 0）"""
+    counts = np.cumsum(edges, axis=0, dtype=np.int16)
+    # 遇到非边缘像素时计数归零：减去此前最近一个非边缘像素处的累计值
+    resets = np.maximum.accumulate(np.where(edges, 0, counts), axis=0)
+    return counts - resets
+
+
+def _long_vertical_runs(edges, limit):
+    """标记每列中连续长度超过 limit 的边缘像素（竖直的边框、分隔线）"""
+    sample = edges[::STRAIGHT_LINE_STRIDE]
+    down = _run_length_so_far(sample)
+    up = _run_length_so_far(sample[::-1])[::-1]
+    long = (down + up - 1) > max(1, limit // STRAIGHT_LINE_STRIDE)
+    return edges & np.repeat(long, STRAIGHT_LINE_STRIDE, axis=0)[:edges.shape[0]]
+
+
+def estimate_text_stats(image):
+    """估计截图中文字的行高、行数和边缘密度（按行的边缘投影找出文字行）"""
+    start = time.perf_counter()
+    edges, step = edge_map(image)
+    if edges is None:
+        return TextStats(0, 0, 0.0, (time.perf_counter() - start) * 1000)
+
+    # 去掉边框、分隔线等长直线，否则边框的竖边会让框内每一行都像含有文字，整个对话框被当成一行
+    limit = max(2, STRAIGHT_LINE_PX // step)
+    lines_mask = _long_vertical_runs(edges, limit) | _long_vertical_runs(edges.T, limit).T
+    text_edges = edges & ~lines_mask
+
+    # 连续的含边缘行组成一个文字行
+    text_rows = text_edges.sum(axis=1) > max(1, TEXT_ROW_RATIO * edges.shape[1])
+    changes = np.diff(np.concatenate(([0], text_rows.astype(np.int8), [0])))
+    starts = np.nonzero(changes == 1)[0]
+    ends = np.nonzero(changes == -1)[0]
+    heights = (ends - starts) * step
+    heights = heights[(heights >= max(2 * step, MIN_TEXT_LINE_PX)) & (heights <= MAX_TEXT_LINE_PX)]
+
+    line_height = int(np.median(heights)) if heights.size else 0
+    return TextStats(line_height, int(heights.size), float(edges.mean()), (time.perf_counter() - start) * 1000)
+
+
+def choose_image_detail(image):
+    """自动选择图像细节级别，返回 ("low" 或 "high", TextStats)
+
+    缩放到低细节尺寸后文字仍足够大、且行数不多时用 low；找不到文字行（照片、游戏画面等）时保守地用 high
+    """
+    stats = estimate_text_stats(image)
+    scale = min(1.0, LOW_DETAIL_SIDE / float(max(image.width, image.height)))
+    if 0 < stats.lines <= MAX_LOW_DETAIL_LINES and stats.line_height * scale >= MIN_LOW_DETAIL_TEXT_PX \
+            and stats.edge_density <= MAX_LOW_DETAIL_EDGE_DENSITY:
+        return "low", stats
+    return "high", stats
@@ -0,0 +1,195 @@
+"""
+请求指标
+记录每次翻译的各阶段耗时和数据量（截图、编码、字节数、建立连接、响应头、首Token、Token速度、总耗时）以及模型、服务和结果，
+按 (模型, 服务) 汇总最近样本的 p50/p95/p99，导出为 Prometheus 文本文件（node_exporter textfile 收集器格式）和 JSON
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque, Counter
+from urllib.parse import urlparse
+
+# 汇总的指标：(名称, 说明)
+SUMMARY_FIELDS = [
+    ("capture_ms", "截图耗时（毫秒）"),
+    ("encode_ms", "图片编码耗时（毫秒）"),
+    ("image_bytes", "编码后图片字节数"),
+    ("base64_bytes", "Base64 字节数"),
+    ("connect_ms", "新建连接耗时（TCP+TLS，复用长连接时为0，毫秒）"),
+    ("headers_ms", "发出请求到收到响应头（含建立连接和服务端排队，毫秒）"),
+    ("ttft_ms", "首Token时间（毫秒）"),
+    ("tokens_per_sec", "输出速度（Token/秒）"),
+    ("total_ms", "总耗时（毫秒）"),
+]
+
+QUANTILES = (50, 95, 99)
+
+# 导出文件中保留的最近样本数
+RECENT_SAMPLES = 20
+
+# 两次导出之间的最短间隔（秒）：导出需要重新计算全部分位数并重写两个文件，不在每次请求后立即执行
+EXPORT_INTERVAL = 5.0
+
+PROMETHEUS_PREFIX = "ai_translation"
+
+
+def provider_name(base_url):
+    """服务名称：Base URL 的主机名"""
+    return urlparse(base_url or "").hostname or base_url or "unknown"
+
+
+def percentile(values, pct):
+    """计算百分位数（线性插值），values 必须已排序"""
+    if not values:
+        return None
+    position = (len(values) - 1) * pct / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _atomic_write(path, text):
+    """先写临时文件再替换，收集器不会读到写了一半的文件"""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+class MetricsCollector:
+    """收集请求指标并导出，线程安全；每组 (模型, 服务) 保留最近 window 个样本用于计算分位数
+
+    有新样本时由后台定时器导出，两次导出至少间隔 export_interval 秒；程序退出前调用 flush() 写入剩余的样本
+    """
+    def __init__(self, export_dir=None, window=1000, export_interval=EXPORT_INTERVAL):
+        self.export_dir = export_dir
+        self.window = window
+        self.export_interval = export_interval
+        self.lock = threading.Lock()
+        self.export_timer = None # 已安排的导出定时器
+        self.dirty = False # 上次导出后是否有新样本
+        self.last_export = 0.0
+        self.samples = {} # (模型, 服务) -> deque[样本]
+        self.outcomes = Counter() # (模型, 服务, 结果) -> 次数（启动以来累计）
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self.started = time.time()
+
+    def record(self, sample):
+        """记录一次请求（字典，包含 model、provider、outcome（ok/error/timeout/cancelled）及各项指标），稍后更新导出文件"""
+        sample = dict(sample)
+        sample.setdefault("time", time.time())
+        # 输出速度按首Token之后的时间计算
+        tokens, ttft_ms, total_ms = sample.get("tokens"), sample.get("ttft_ms"), sample.get("total_ms")
+        if tokens and ttft_ms is not None and total_ms and total_ms > ttft_ms:
+            sample["tokens_per_sec"] = tokens / ((total_ms - ttft_ms) / 1000.0)
+        key = (sample.get("model") or "unknown", sample.get("provider") or "unknown")
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(sample)
+            self.outcomes[key + (sample.get("outcome") or "ok",)] += 1
+            self.recent.append(sample)
+            if not self.export_dir:
+                return
+            self.dirty = True
+            if self.export_timer is None:
+                delay = max(0.0, self.last_export + self.export_interval - time.monotonic())
+                self.export_timer = threading.Timer(delay, self._export_pending)
+                self.export_timer.daemon = True
+                self.export_timer.start()
+
+    def _export_pending(self):
+        """定时器线程中导出"""
+        with self.lock:
+            self.export_timer = None
+        self.flush()
+
+    def flush(self):
+        """立即导出尚未写入的样本（程序退出时调用）"""
+        with self.lock:
+            if self.export_timer is not None:
+                self.export_timer.cancel()
+                self.export_timer = None
+            if not (self.dirty and self.export_dir):
+                return
+            self.dirty = False
+            self.last_export = time.monotonic()
+        try:
+            self.export(self.export_dir)
+        except OSError as e:
+            print(f"导出请求指标失败: {e}")
+
+    def summary(self):
+        """按 (模型, 服务) 汇总，返回列表：count、outcomes、image_detail 以及各指标的 p50/p95/p99/mean"""
+        with self.lock:
+            groups = {key: list(samples) for key, samples in self.samples.items()}
+            outcomes = dict(self.outcomes)
+        result = []
+        for (model, provider), samples in sorted(groups.items()):
+            fields = {}
+            for name, _ in SUMMARY_FIELDS:
+                values = sorted(sample[name] for sample in samples if sample.get(name) is not None)
+                if values:
+                    stats = {f"p{q}": percentile(values, q) for q in QUANTILES}
+                    stats.update({"mean": sum(values) / len(values), "sum": sum(values), "count": len(values)})
+                    fields[name] = stats
+            result.append({
+                "model": model,
+                "provider": provider,
+                "count": sum(count for (m, p, _), count in outcomes.items() if (m, p) == (model, provider)),
+                "outcomes": {o: count for (m, p, o), count in outcomes.items() if (m, p) == (model, provider)},
+                "cache_hits": sum(1 for sample in samples if sample.get("cache_hit")),
+                # 细节级别的使用次数，自动选择的记为 "auto:low" / "auto:high"
+                "image_detail": dict(Counter(
+                    ("auto:" if sample.get("detail_auto") else "") + sample["image_detail"]
+                    for sample in samples if sample.get("image_detail") and sample.get("path") == "vision")),
+                "fields": fields,
+            })
+        return result
+
+    def to_json(self):
+        with self.lock:
+            recent = list(self.recent)
+        return {"updated": time.time(), "started": self.started, "window": self.window,
+                "groups": self.summary(), "recent": recent}
+
+    def to_prometheus(self):
+        """Prometheus 文本格式：请求计数（counter）和各指标的分位数（summary）"""
+        groups = self.summary()
+        lines = [f"# HELP {PROMETHEUS_PREFIX}_requests_total 翻译请求数（按结果）",
+                 f"# TYPE {PROMETHEUS_PREFIX}_requests_total counter"]
+        for group in groups:
+            labels = f'model="{_label(group["model"])}",provider="{_label(group["provider"])}"'
+            for outcome, count in sorted(group["outcomes"].items()):
+                lines.append(f'{PROMETHEUS_PREFIX}_requests_total{{{labels},outcome="{_label(outcome)}"}} {count}')
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_image_detail_requests 使用各细节级别的视觉请求数（最近样本，auto 表示自动选择）",
+                  f"# TYPE {PROMETHEUS_PREFIX}_image_detail_requests gauge"]
+        for group in groups:
+            labels = f'model="{_label(group["model"])}",provider="{_label(group["provider"])}"'
+            for detail, count in sorted(group["image_detail"].items()):
+                auto, _, level = detail.rpartition(":")
+                lines.append(f'{PROMETHEUS_PREFIX}_image_detail_requests{{{labels},detail="{_label(level)}",'
+                             f'auto="{"true" if auto else "false"}"}} {count}')
+        for name, help_text in SUMMARY_FIELDS:
+            metric = f"{PROMETHEUS_PREFIX}_{name}"
+            lines += [f"# HELP {metric} {help_text}（最近样本）", f"# TYPE {metric} summary"]
+            for group in groups:
+                stats = group["fields"].get(name)
+                if not stats:
+                    continue
+                labels = f'model="{_label(group["model"])}",provider="{_label(group["provider"])}"'
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{labels},quantile="{q / 100.0}"}} {stats[f"p{q}"]:.3f}')
+                lines.append(f"{metric}_sum{{{labels}}} {stats['sum']:.3f}")
+                lines.append(f"{metric}_count{{{labels}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory):
+        """写入 translation_metrics.prom 和 translation_metrics.json"""
+        _atomic_write(os.path.join(directory, "translation_metrics.prom"), self.to_prometheus())
+        _atomic_write(os.path.join(directory, "translation_metrics.json"),
+                      json.dumps(self.to_json(), ensure_ascii=False, indent=2))
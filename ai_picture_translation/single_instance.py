@@ -0,0 +1,193 @@
+"""
+单实例运行
+运行中的程序在本机回环地址上监听命令（端口和令牌写入当前用户私有目录中的实例文件，权限 0600）；
+再次启动时先尝试把命令（显示窗口、翻译图片文件、截图）转发给已运行的实例，成功则直接退出，
+不再重复导入模块和注册冲突的快捷键。本模块只使用标准库中的轻量模块，保证转发足够快
+"""
+
+import os
+import sys
+import json
+import socket
+import secrets
+import threading
+
+from app_paths import get_settings_path
+
+# 实例文件名：记录运行中实例的端口、令牌和进程号，位于 instance_file_path() 返回的用户私有目录
+INSTANCE_FILE_NAME = "ai_picture_translation_instance.json"
+
+# 支持的命令
+COMMAND_SHOW = "show"
+COMMAND_TRANSLATE_FILE = "translate_file"
+COMMAND_CAPTURE_FULL = "capture_full"
+COMMAND_CAPTURE_AREA = "capture_area"
+
+# 转发命令的超时时间（秒）：连接本机回环地址很快，实例文件过期时不应拖慢启动；连接后等待回复的时间可以长一些
+CONNECT_TIMEOUT = 0.2
+FORWARD_TIMEOUT = 2.0
+
+
+def instance_file_path():
+    """实例文件路径：Windows 为 %LOCALAPPDATA%，其它系统为 $XDG_RUNTIME_DIR 或用户主目录下的私有目录
+
+    不放在所有用户共享的临时目录中，避免其他本机用户读取令牌后向本实例发送命令
+    """
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_RUNTIME_DIR")
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ai_picture_translation", INSTANCE_FILE_NAME)
+
+
+def _is_private_file(path):
+    """实例文件必须属于当前用户且其他用户不可读写（Windows 上由用户目录的权限保证）"""
+    if os.name == "nt":
+        return True
+    info = os.stat(path)
+    return info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+
+def _write_instance_file(data):
+    """以 0600 权限写入实例文件（先写临时文件再替换）"""
+    path = instance_file_path()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def parse_command(argv):
+    """把命令行参数转换为 (命令, 参数列表)
+
+    无参数: 显示窗口；--capture: 全屏截图翻译；--capture-area: 区域截图翻译；
+    图片路径: 翻译该文件（批量翻译多个文件请使用 batch.py）
+    """
+    if not argv:
+        return COMMAND_SHOW, []
+    if argv[0] == "--capture":
+        return COMMAND_CAPTURE_FULL, []
+    if argv[0] == "--capture-area":
+        return COMMAND_CAPTURE_AREA, []
+    return COMMAND_TRANSLATE_FILE, [os.path.abspath(argv[0])]
+
+
+def _read_instance_file():
+    path = instance_file_path()
+    try:
+        if not _is_private_file(path):
+            print(f"忽略权限不安全的实例文件: {path}")
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _single_instance_enabled():
+    """读取设置文件中的 single_instance（此时尚未加载完整设置），读取失败时按默认值 True"""
+    try:
+        with open(get_settings_path(), "r", encoding="utf-8") as f:
+            return json.load(f).get("single_instance", True) is not False
+    except (OSError, ValueError, AttributeError):
+        return True
+
+
+def forward_to_running_instance(command, args=()):
+    """把命令转发给已运行的实例，成功返回 True；没有运行中的实例返回 False"""
+    info = _read_instance_file()
+    if not info:
+        return False
+    try:
+        with socket.create_connection(("127.0.0.1", info["port"]), timeout=CONNECT_TIMEOUT) as conn:
+            conn.settimeout(FORWARD_TIMEOUT)
+            request = {"token": info["token"], "command": command, "args": list(args)}
+            conn.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            reply = json.loads(conn.makefile("rb").readline() or b"{}")
+    except (OSError, ValueError, KeyError, TypeError):
+        # 实例文件过期（上次异常退出）或实例无响应，按新实例启动
+        return False
+    if not reply.get("ok"):
+        print(f"已运行的实例拒绝了命令 {command}: {reply.get('error')}")
+        return False
+    return True
+
+
+class InstanceServer:
+    """运行中实例的命令监听服务，handler(命令, 参数列表) 在监听线程中调用"""
+    def __init__(self, handler):
+        self.handler = handler
+        self.token = secrets.token_hex(16)
+        self.sock = None
+        self.running = False
+
+    def start(self):
+        """开始监听并写入实例文件，失败时返回 False（不影响程序运行）"""
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.bind(("127.0.0.1", 0))
+            self.sock.listen(4)
+            _write_instance_file({"port": self.sock.getsockname()[1], "token": self.token, "pid": os.getpid()})
+        except OSError as e:
+            print(f"启动单实例监听失败: {e}")
+            if self.sock:
+                self.sock.close()
+                self.sock = None
+            return False
+        self.running = True
+        threading.Thread(target=self._serve, name="instance-server", daemon=True).start()
+        return True
+
+    def _serve(self):
+        while self.running:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError: # 监听已关闭
+                break
+            with conn:
+                conn.settimeout(FORWARD_TIMEOUT)
+                reply = self._handle(conn)
+                try:
+                    conn.sendall(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                except OSError:
+                    pass
+
+    def _handle(self, conn):
+        try:
+            request = json.loads(conn.makefile("rb").readline() or b"{}")
+        except (OSError, ValueError) as e:
+            return {"ok": False, "error": f"无效的请求: {e}"}
+        if not secrets.compare_digest(str(request.get("token", "")), self.token):
+            return {"ok": False, "error": "令牌错误"}
+        command = request.get("command")
+        print(f"收到其它启动进程转发的命令: {command} {request.get('args') or ''}")
+        try:
+            self.handler(command, request.get("args") or [])
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True}
+
+    def stop(self):
+        """停止监听并删除实例文件（只删除自己写入的）"""
+        self.running = False
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        info = _read_instance_file()
+        if info and info.get("token") == self.token:
+            try:
+                os.remove(instance_file_path())
+            except OSError:
+                pass
+
+
+def main_or_forward(argv=None):
+    """程序入口调用：转发成功时直接退出进程，否则返回 (命令, 参数列表) 供新实例启动后执行
+
+    设置中 single_instance 为 false 时不转发，总是启动新实例
+    """
+    command, args = parse_command(sys.argv[1:] if argv is None else argv)
+    if _single_instance_enabled() and forward_to_running_instance(command, args):
+        sys.exit(0)
+    return command, args
@@ -0,0 +1,95 @@
+"""
+启动耗时分析
+记录启动各阶段的耗时、关键时间点（窗口显示、快捷键可用）以及每个模块的导入耗时（包含其依赖），
+启动完成后打印报告，便于发现启动变慢的改动
+"""
+
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+
+# 报告中列出的最慢导入数量
+REPORT_TOP_IMPORTS = 10
+
+
+class StartupProfiler:
+    """启动耗时分析器，时间均为距创建分析器（程序开始导入）的毫秒数"""
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases = [] # (名称, 线程名, 开始ms, 耗时ms)
+        self.marks = [] # (名称, ms)
+        self.imports = [] # (模块名, 线程名, 耗时ms)，只记录最外层的导入，耗时包含其依赖
+        self._original_import = None
+        self._local = threading.local()
+
+    def now_ms(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个启动阶段的耗时"""
+        start = self.now_ms()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases.append((name, threading.current_thread().name, start, self.now_ms() - start))
+
+    def mark(self, name):
+        """记录关键时间点"""
+        with self.lock:
+            self.marks.append((name, self.now_ms()))
+
+    def install_import_hook(self):
+        """开始统计模块导入耗时"""
+        if self._original_import is not None:
+            return
+        original_import = self._original_import = builtins.__import__
+        profiler = self
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            # 相对导入和已加载的模块不计时
+            if level or name in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+            depth = getattr(profiler._local, "depth", 0)
+            profiler._local.depth = depth + 1
+            start = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                profiler._local.depth = depth
+                if depth == 0:
+                    with profiler.lock:
+                        profiler.imports.append((name, threading.current_thread().name,
+                                                 (time.perf_counter() - start) * 1000))
+
+        builtins.__import__ = timed_import
+
+    def uninstall_import_hook(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def report(self):
+        """打印启动耗时报告"""
+        with self.lock:
+            phases = list(self.phases)
+            marks = sorted(self.marks, key=lambda item: item[1])
+            imports = sorted(self.imports, key=lambda item: item[2], reverse=True)
+        lines = ["启动耗时分析（毫秒，从程序开始导入算起）:"]
+        for name, at in marks:
+            lines.append(f"  @{at:8.1f}  {name}")
+        for name, thread, start, duration in phases:
+            lines.append(f"  {duration:8.1f}  阶段 {name}（{thread}，开始于 {start:.1f}）")
+        if imports:
+            lines.append(f"  最慢的导入（共 {len(imports)} 个，总计 {sum(item[2] for item in imports):.1f}）:")
+            for name, thread, duration in imports[:REPORT_TOP_IMPORTS]:
+                lines.append(f"  {duration:8.1f}  import {name}（{thread}）")
+        print("\n".join(lines))
+
+
+# 全局启动分析器（导入本模块时开始计时）
+profiler = StartupProfiler()
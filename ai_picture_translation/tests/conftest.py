@@ -0,0 +1,8 @@
+"""
+测试配置：程序模块位于上一级目录（非包结构），测试前加入导入路径
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
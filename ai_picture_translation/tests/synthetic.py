@@ -0,0 +1,39 @@
+"""
+测试用的合成截图
+"""
+
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+def draw_scaled_text(image, xy, text, text_height, fill):
+    """用默认字体绘制约 text_height 像素高的文字：先按原始大小绘制再整数倍放大
+    （兼容 Pillow 10.1 之前不支持 load_default(size=...) 的版本）"""
+    font = ImageFont.load_default()
+    _, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), text, font=font)
+    scale = max(1, int(round(text_height / float(max(1, bottom - top)))))
+    mask = Image.new("L", (right + 1, bottom + 1), 0)
+    ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=font)
+    mask = mask.crop((0, top, right + 1, bottom + 1)).resize(
+        ((right + 1) * scale, (bottom + 1 - top) * scale), Image.NEAREST)
+    image.paste(fill, (xy[0], xy[1], xy[0] + mask.width, xy[1] + mask.height), mask)
+
+
+def make_dialog(width, height, font_size, lines, frame=0, words_per_line=6, dark=True):
+    """生成合成对话框：可选 frame 像素宽的边框，约 font_size 像素高的若干行文字"""
+    rng = random.Random(1)
+    background, foreground = ((30, 30, 40), (240, 240, 240)) if dark else ((255, 255, 255), (0, 0, 0))
+    image = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(image)
+    if frame:
+        draw.rectangle((0, 0, width - 1, height - 1), outline=(200, 180, 120), width=frame)
+    y = int(font_size * 1.2)
+    for _ in range(lines):
+        if y > height - font_size:
+            break
+        words = " ".join(rng.choice(["Hello", "dialog", "OK", "Cancel", "Settings", "world"])
+                         for _ in range(words_per_line))
+        draw_scaled_text(image, (30, y), words, font_size, foreground)
+        y += int(font_size * 1.5)
+    return image
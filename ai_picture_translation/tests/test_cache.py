@@ -0,0 +1,78 @@
+import time
+
+from PIL import Image
+
+from cache import TranslationCache, image_fingerprint
+
+
+def make_cache(tmp_path, **kwargs):
+    return TranslationCache(str(tmp_path / "cache.db"), **kwargs)
+
+
+def test_fingerprint_depends_on_content_and_size():
+    white = Image.new("RGB", (800, 600), (255, 255, 255))
+    assert image_fingerprint(white) == image_fingerprint(white.copy())
+
+    dotted = white.copy()
+    dotted.paste((0, 0, 0), (100, 100, 140, 140))
+    assert image_fingerprint(dotted) != image_fingerprint(white)
+    assert image_fingerprint(Image.new("RGB", (600, 800), (255, 255, 255))) != image_fingerprint(white)
+
+
+def test_key_includes_mode_model_and_detail():
+    image = Image.new("RGB", (64, 64))
+    key = TranslationCache.make_key(image, "en-zh", "model-a", "low")
+    assert key != TranslationCache.make_key(image, "zh-en", "model-a", "low")
+    assert key != TranslationCache.make_key(image, "en-zh", "model-b", "low")
+    assert key != TranslationCache.make_key(image, "en-zh", "model-a", "high")
+
+
+def test_get_put_and_persistence(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("k") is None
+    cache.put("k", "译文")
+    assert cache.get("k") == "译文"
+    cache.close()
+
+    # 重新打开后从磁盘读取
+    reopened = make_cache(tmp_path)
+    assert reopened.get("k") == "译文"
+    assert reopened.stats() == {"hits": 1, "misses": 0, "memory_entries": 1}
+    reopened.close()
+
+
+def test_memory_lru_keeps_recent_entries(tmp_path):
+    cache = make_cache(tmp_path, memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper())
+    assert list(cache.memory) == ["b", "c"]
+    # 内存中淘汰的条目仍能从磁盘读取
+    assert cache.get("a") == "A"
+    cache.close()
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("old", "过期")
+    cache.memory.clear()
+    cache.conn.execute("UPDATE translations SET created = ?", (time.time() - 8 * 24 * 3600,))
+    assert cache.get("old") is None
+    cache.close()
+
+
+def test_evict_drops_least_recently_used_over_size_limit(tmp_path):
+    cache = make_cache(tmp_path, max_disk_mb=1000 / (1024 * 1024))
+    for index in range(3):
+        cache.put(f"k{index}", "x" * 400)
+        cache.conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (index, f"k{index}"))
+    cache.evict()
+    keys = [row[0] for row in cache.conn.execute("SELECT key FROM translations ORDER BY key")]
+    assert keys == ["k1", "k2"]
+    cache.close()
+
+
+def test_empty_text_is_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("k", "")
+    assert cache.get("k") is None
+    cache.close()
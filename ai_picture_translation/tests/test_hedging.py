@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from hedging import hedged_stream
+
+
+def source(chunks, delay=0.0, error=None, started=None):
+    """返回 (无参函数)：等待 delay 秒后依次产出 chunks，最后可抛出 error；started 记录是否被调用"""
+    async def stream():
+        if started is not None:
+            started.append(True)
+        await asyncio.sleep(delay)
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+    return stream
+
+
+def collect(primary, secondary, delay):
+    winners = []
+
+    async def run():
+        return [delta async for delta in hedged_stream(primary, secondary, delay, on_winner=winners.append)]
+    return asyncio.run(run()), winners
+
+
+def test_fast_primary_never_starts_hedge():
+    hedge_started = []
+    result, winners = collect(("primary", source(["a", "b"])),
+                              ("secondary", source(["x"], started=hedge_started)), 0.5)
+    assert result == ["a", "b"] and winners == ["primary"]
+    assert not hedge_started
+
+
+def test_slow_primary_loses_to_hedge():
+    result, winners = collect(("primary", source(["a"], delay=1.0)), ("secondary", source(["x", "y"])), 0.05)
+    assert result == ["x", "y"] and winners == ["secondary"]
+
+
+def test_primary_error_starts_hedge_immediately():
+    result, winners = collect(("primary", source([], error=RuntimeError("boom"))),
+                              ("secondary", source(["x"])), 10.0)
+    assert result == ["x"] and winners == ["secondary"]
+
+
+def test_both_failing_raises_primary_error():
+    with pytest.raises(RuntimeError, match="primary"):
+        collect(("primary", source([], error=RuntimeError("primary"))),
+                ("secondary", source([], error=ValueError("secondary"))), 0.01)
+
+
+def test_error_after_winning_is_raised():
+    with pytest.raises(RuntimeError, match="late"):
+        collect(("primary", source(["a"], error=RuntimeError("late"))), ("secondary", source(["x"])), 10.0)
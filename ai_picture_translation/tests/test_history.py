@@ -0,0 +1,39 @@
+import pytest
+
+from history import UNSAVED_TEXT, TranslationHistory
+from history_store import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def test_recent_entries_stay_in_memory(store):
+    history = TranslationHistory(store, memory_entries=3)
+    index = history.add(True)
+    history.append_text(index, "你好")
+    history.append_text(index, "，世界")
+    assert history.get_range(0, 1) == [{"time": history.recent[0]["time"], "area": True, "text": "你好，世界"}]
+
+
+def test_evicted_entries_are_read_from_store(store):
+    history = TranslationHistory(store, memory_entries=2)
+    for number in range(5):
+        index = history.add(number % 2 == 0, f"译文{number}")
+        # 第1条没有保存（例如翻译失败）
+        history.finish(index, None if number == 1 else store.add(f"译文{number}"))
+    assert len(history) == 5 and history.first_in_memory == 3
+    entries = history.get_range(0, 5)
+    assert [entry["text"] for entry in entries] == ["译文0", UNSAVED_TEXT, "译文2", "译文3", "译文4"]
+    assert [entry["area"] for entry in entries] == [True, False, True, False, True]
+
+
+def test_range_is_clamped_and_clear_resets(store):
+    history = TranslationHistory(store, memory_entries=2)
+    history.add(False, "a")
+    assert [entry["text"] for entry in history.get_range(-5, 10)] == ["a"]
+    history.clear()
+    assert len(history) == 0 and history.get_range(0, 10) == []
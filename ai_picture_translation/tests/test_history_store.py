@@ -0,0 +1,70 @@
+import pytest
+
+from history_store import HistoryStore
+
+
+@pytest.fixture(params=["fts", "like"])
+def store(request, tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    if request.param == "fts" and not store.fts_enabled:
+        pytest.skip("SQLite 不支持 FTS5 trigram")
+    # 关闭全文索引时走 LIKE 查询
+    store.fts_enabled = request.param == "fts"
+    for text in ("你好，世界", "Hello world", "设置已保存", "100% done_now", "hello again"):
+        store.add(text, mode="en-zh", model="m")
+    yield store
+    store.close()
+
+
+def texts(records):
+    return [record["text"] for record in records]
+
+
+def test_empty_query_returns_latest_first(store):
+    assert texts(store.search("", limit=2)) == ["hello again", "100% done_now"]
+
+
+def test_substring_search_is_case_insensitive(store):
+    assert texts(store.search("hello")) == ["hello again", "Hello world"]
+    assert texts(store.search("ello")) == ["hello again", "Hello world"]
+
+
+def test_chinese_substring_search(store):
+    assert texts(store.search("已保存")) == ["设置已保存"]
+    # 少于3个字符时使用 LIKE 查询
+    assert texts(store.search("世界")) == ["你好，世界"]
+
+
+def test_special_characters_are_literal(store):
+    assert texts(store.search("100%")) == ["100% done_now"]
+    assert texts(store.search("e_n")) == ["100% done_now"]
+    assert store.search('"quoted"') == []
+
+
+def test_search_limit_keeps_newest(store):
+    for index in range(5):
+        store.add(f"repeat {index}")
+    assert texts(store.search("repeat", limit=2)) == ["repeat 4", "repeat 3"]
+
+
+def test_get_many_and_count(store):
+    record_id = store.add("新记录", latency_ms=120.0)
+    records = store.get_many([record_id, 9999])
+    assert list(records) == [record_id]
+    assert records[record_id]["latency_ms"] == 120.0
+    assert store.count() == 6
+    assert store.add("") is None
+
+
+def test_existing_records_are_indexed_when_fts_is_added(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    if not store.fts_enabled:
+        pytest.skip("SQLite 不支持 FTS5 trigram")
+    store.add("旧的翻译记录")
+    store.conn.execute("DROP TABLE history_fts")
+    store.close()
+
+    reopened = HistoryStore(path)
+    assert texts(reopened.search("翻译记录")) == ["旧的翻译记录"]
+    reopened.close()
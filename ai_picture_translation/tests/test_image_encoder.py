@@ -0,0 +1,70 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import image_encoder
+from image_encoder import encode_image, is_flat_content
+from synthetic import make_dialog
+
+
+def noise(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+
+def decoded_size(encoded):
+    with Image.open(BytesIO(encoded.data)) as image:
+        return image.size
+
+
+def test_flat_content_detection():
+    assert is_flat_content(make_dialog(700, 400, 32, 3))
+    assert not is_flat_content(noise(400, 300))
+
+
+def test_png_format_is_lossless():
+    image = make_dialog(300, 200, 24, 2)
+    encoded = encode_image(image, "png")
+    assert encoded.format == "PNG" and encoded.mime == "image/png" and encoded.quality is None
+    with Image.open(BytesIO(encoded.data)) as decoded:
+        assert decoded.convert("RGB").tobytes() == image.tobytes()
+
+
+def test_flat_content_within_budget_stays_png():
+    encoded = encode_image(make_dialog(700, 400, 32, 3), "auto", max_bytes=1500000)
+    assert encoded.format in ("PNG", "PNG-palette")
+    assert encoded.size == len(encoded.data) <= 1500000
+
+
+def test_noisy_image_is_downscaled_to_fit_budget():
+    image = noise(1600, 900)
+    encoded = encode_image(image, "auto", max_bytes=200000)
+    assert encoded.format in ("WEBP", "JPEG")
+    assert encoded.size <= 200000
+    width, height = decoded_size(encoded)
+    assert width < image.width and width >= int(image.width * image_encoder.MIN_SCALE)
+
+
+def test_unreachable_budget_returns_smallest_at_min_scale(monkeypatch):
+    calls = []
+    save = image_encoder._save
+
+    def counting_save(image, fmt, **params):
+        calls.append((image.size, params.get("quality")))
+        return save(image, fmt, **params)
+
+    monkeypatch.setattr(image_encoder, "_save", counting_save)
+    image = noise(1600, 900)
+    encoded = encode_image(image, "auto", max_bytes=1000)
+    # 只在原尺寸和最小尺寸各以最低质量编码一次，不再逐级搜索
+    assert len(calls) == 2
+    assert encoded.quality == image_encoder.QUALITY_STEPS[-1]
+    assert decoded_size(encoded)[0] == int(image.width * image_encoder.MIN_SCALE)
+
+
+def test_highest_quality_within_budget_is_chosen():
+    image = noise(400, 300)
+    generous = encode_image(image, "auto", max_bytes=10 ** 8)
+    assert generous.quality == image_encoder.QUALITY_STEPS[0]
+    assert decoded_size(generous) == image.size
@@ -0,0 +1,116 @@
+import threading
+from concurrent.futures import Future
+
+from jobs import CANCEL_SHUTDOWN, CANCEL_SUPERSEDED, CANCEL_WINDOW_CLOSED, JobRegistry, JobScheduler
+
+
+def test_start_supersedes_same_kind_only():
+    registry = JobRegistry()
+    area = registry.start("area")
+    full = registry.start("full")
+    newer = registry.start("area")
+    assert area.cancelled and area.cancel_reason == CANCEL_SUPERSEDED
+    assert not full.cancelled and not newer.cancelled
+    assert registry.stats()["active"] == 2
+
+
+def test_cancel_interrupts_attached_future():
+    registry = JobRegistry()
+    job = registry.start("full")
+    future = Future()
+    job.attach(future)
+    assert job.cancel(CANCEL_WINDOW_CLOSED)
+    assert future.cancelled()
+    # 重复取消不再计数
+    assert not job.cancel(CANCEL_WINDOW_CLOSED)
+
+    # 取消后才关联的请求立即取消
+    late = Future()
+    job.attach(late)
+    assert late.cancelled()
+
+
+def test_finished_job_cannot_be_cancelled():
+    registry = JobRegistry()
+    job = registry.start("full")
+    job.finish()
+    assert not job.cancel(CANCEL_SHUTDOWN)
+    assert registry.stats()["completed"] == 1
+
+
+def test_stats_count_cancellations_and_dropped_work():
+    registry = JobRegistry()
+    first = registry.start("watch", supersede=False)
+    second = registry.start("watch", supersede=False)
+    first.record_chunk("部分译文")
+    first.cancel(CANCEL_SUPERSEDED)
+    second.cancel(CANCEL_SUPERSEDED)
+    registry.start("area").finish()
+    registry.cancel_all(CANCEL_SHUTDOWN)
+    assert registry.stats() == {
+        "started": 3,
+        "completed": 1,
+        "active": 0,
+        "cancelled": {CANCEL_SUPERSEDED: 2},
+        "dropped_chars": 4,
+    }
+
+
+def test_cancel_kind_cancels_running_jobs_of_that_kind():
+    registry = JobRegistry()
+    watch = registry.start("watch", supersede=False)
+    area = registry.start("area")
+    assert registry.cancel_kind("watch") == 1
+    assert watch.cancelled and not area.cancelled
+    assert registry.cancel_kind("watch") == 0
+
+
+def blocking_scheduler():
+    """单线程调度器，第一个任务阻塞到 release 被设置，便于观察排队顺序"""
+    scheduler = JobScheduler(max_concurrency=1, debounce_ms=0)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit("full", block)
+    assert started.wait(5)
+    return scheduler, release
+
+
+def test_scheduler_runs_by_priority_and_coalesces_same_kind():
+    scheduler, release = blocking_scheduler()
+    order = []
+    done = threading.Event()
+    scheduler.submit("watch", lambda: (order.append("watch"), done.set()))
+    scheduler.submit("full", order.append, "full-old")
+    scheduler.submit("full", order.append, "full-new")
+    scheduler.submit("area", order.append, "area")
+    release.set()
+    assert done.wait(5)
+    assert order == ["area", "full-new", "watch"]
+    stats = scheduler.stats()
+    assert stats["coalesced"] == 1 and stats["submitted"] == 5
+    scheduler.shutdown(timeout=1)
+
+
+def test_debounce_ignores_rapid_triggers():
+    scheduler = JobScheduler(max_concurrency=1, debounce_ms=10000)
+    assert not scheduler.should_debounce("area")
+    assert scheduler.should_debounce("area")
+    assert not scheduler.should_debounce("full")
+    assert scheduler.stats()["debounced"] == 1
+    scheduler.shutdown(timeout=1)
+
+
+def test_shutdown_drops_queue_and_rejects_new_jobs():
+    scheduler, release = blocking_scheduler()
+    ran = []
+    scheduler.submit("area", ran.append, "area")
+    scheduler.shutdown(timeout=0)
+    release.set()
+    for worker in scheduler.workers:
+        worker.join(5)
+    assert not scheduler.submit("area", ran.append, "late")
+    assert ran == []
@@ -0,0 +1,57 @@
+import pytest
+from PIL import Image
+
+from preprocess import choose_image_detail, estimate_text_stats, find_text_bbox, trim_to_text_region
+from synthetic import draw_scaled_text, make_dialog
+
+
+@pytest.mark.parametrize("image, expected", [
+    (make_dialog(700, 400, 32, 3, frame=3), "low"), # 带边框的对话框：边框不能把整个框当成一行
+    (make_dialog(700, 400, 32, 3), "low"),
+    (make_dialog(700, 150, 32, 1, frame=1), "low"),
+    (make_dialog(900, 300, 80, 2, frame=3, words_per_line=3), "low"),
+    (make_dialog(1920, 1080, 12, 200, words_per_line=40, dark=False), "high"), # 密集小字页面
+], ids=["framed", "plain", "thin-frame", "heading", "dense"])
+def test_choose_image_detail(image, expected):
+    detail, _ = choose_image_detail(image)
+    assert detail == expected
+
+
+def test_bordered_dialog_lines_are_counted():
+    stats = estimate_text_stats(make_dialog(700, 400, 32, 3, frame=3))
+    assert stats.lines == 3
+    assert 24 <= stats.line_height <= 40
+
+
+def test_blank_image_has_no_text():
+    stats = estimate_text_stats(Image.new("RGB", (400, 300), (255, 255, 255)))
+    assert stats.lines == 0 and stats.line_height == 0
+    assert find_text_bbox(Image.new("RGB", (400, 300), (255, 255, 255))) is None
+
+
+def text_on_canvas(width, height, left, top):
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw_scaled_text(image, (left, top), "Hello world", 30, (0, 0, 0))
+    return image
+
+
+def test_trim_keeps_text_with_margin():
+    image = text_on_canvas(1600, 1000, 600, 400)
+    trimmed, box = trim_to_text_region(image, margin=16)
+    left, top, right, bottom = box
+    text_left, text_top, text_right, text_bottom = find_text_bbox(image)
+    assert (left, top) == (text_left - 16, text_top - 16)
+    assert (right, bottom) == (text_right + 16, text_bottom + 16)
+    assert trimmed.size == (right - left, bottom - top)
+
+
+def test_trim_skips_images_that_are_mostly_text():
+    image = make_dialog(700, 400, 32, 3, frame=3)
+    trimmed, box = trim_to_text_region(image)
+    assert box is None and trimmed is image
+
+
+def test_trim_margin_is_clamped_to_image():
+    image = text_on_canvas(1600, 1000, 2, 2)
+    _, box = trim_to_text_region(image, margin=50)
+    assert box[:2] == (0, 0)
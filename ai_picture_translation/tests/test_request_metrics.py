@@ -0,0 +1,70 @@
+import json
+import os
+import time
+
+import pytest
+
+from request_metrics import MetricsCollector, percentile, provider_name
+
+
+def test_percentile_interpolates_sorted_values():
+    values = [1, 2, 3, 4, 5]
+    assert percentile(values, 50) == 3
+    assert percentile(values, 95) == pytest.approx(4.8)
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+
+def test_provider_name():
+    assert provider_name("https://api.example.com/v1") == "api.example.com"
+    assert provider_name("") == "unknown"
+
+
+def test_summary_groups_by_model_and_provider():
+    collector = MetricsCollector(window=3)
+    for total in (100, 200, 300, 400):
+        collector.record({"model": "m", "provider": "p", "total_ms": total, "ttft_ms": 50, "tokens": 10,
+                          "image_detail": "low", "detail_auto": True, "path": "vision"})
+    collector.record({"model": "m", "provider": "q", "outcome": "timeout"})
+    groups = collector.summary()
+    assert [(group["model"], group["provider"]) for group in groups] == [("m", "p"), ("m", "q")]
+    first = groups[0]
+    # 分位数只取最近 window 个样本，请求计数为累计
+    assert first["count"] == 4 and first["outcomes"] == {"ok": 4}
+    assert first["fields"]["total_ms"]["p50"] == 300
+    assert first["fields"]["tokens_per_sec"]["count"] == 3
+    assert first["fields"]["tokens_per_sec"]["p50"] == pytest.approx(10 / 0.25)
+    assert first["image_detail"] == {"auto:low": 3}
+    assert groups[1]["outcomes"] == {"timeout": 1} and groups[1]["fields"] == {}
+
+
+def test_prometheus_labels_are_escaped():
+    collector = MetricsCollector()
+    collector.record({"model": 'a"b', "provider": "p", "total_ms": 10})
+    text = collector.to_prometheus()
+    assert 'ai_translation_requests_total{model="a\\"b",provider="p",outcome="ok"} 1' in text
+    assert 'ai_translation_total_ms{model="a\\"b",provider="p",quantile="0.5"} 10.000' in text
+
+
+def test_export_is_throttled_until_flush(tmp_path):
+    collector = MetricsCollector(str(tmp_path), export_interval=60)
+    collector.last_export = time.monotonic() # 刚导出过，下一次导出要等待间隔
+    collector.record({"model": "m", "provider": "p", "total_ms": 10})
+    collector.record({"model": "m", "provider": "p", "total_ms": 20})
+    assert not os.path.exists(tmp_path / "translation_metrics.json")
+
+    collector.flush()
+    assert collector.export_timer is None
+    with open(tmp_path / "translation_metrics.json", encoding="utf-8") as f:
+        assert json.load(f)["groups"][0]["count"] == 2
+    assert (tmp_path / "translation_metrics.prom").exists()
+
+
+def test_timer_exports_in_background(tmp_path):
+    collector = MetricsCollector(str(tmp_path), export_interval=0)
+    collector.record({"model": "m", "provider": "p", "total_ms": 10})
+    deadline = time.monotonic() + 5
+    while not (tmp_path / "translation_metrics.json").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (tmp_path / "translation_metrics.json").exists()
+    assert not collector.dirty
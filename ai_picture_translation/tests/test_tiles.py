@@ -0,0 +1,69 @@
+import asyncio
+
+import numpy as np
+from PIL import Image
+
+from preprocess import find_gutter, find_text_bbox
+from synthetic import draw_scaled_text
+from tiles import TILE_SEPARATOR, _OrderedStreamMerger, split_into_tiles, translate_in_tiles
+
+
+def test_find_gutter_picks_middle_of_widest_blank_run():
+    profile = np.array([5, 5, 0, 5, 0, 0, 0, 0, 5, 5, 5, 5])
+    assert find_gutter(profile, 3, 3) == 5
+
+
+def test_find_gutter_prefers_fewest_edges_without_blank_run():
+    profile = np.array([9, 9, 9, 9, 2, 9, 9, 9])
+    assert find_gutter(profile, 5, 2) == 4
+
+
+def test_split_covers_image_in_reading_order():
+    image = Image.new("RGB", (2500, 1300), (255, 255, 255))
+    boxes = split_into_tiles(image, 1280)
+    assert len(boxes) == 4
+    assert sorted(boxes, key=lambda box: (box[1], box[0])) == boxes
+    assert sum((right - left) * (bottom - top) for left, top, right, bottom in boxes) == 2500 * 1300
+
+
+def test_split_avoids_cutting_through_text():
+    image = Image.new("RGB", (2560, 400), (255, 255, 255))
+    # 文字横跨均匀网格线（x=1280）
+    draw_scaled_text(image, (1150, 180), "Hello world", 30, (0, 0, 0))
+    text_left, _, text_right, _ = find_text_bbox(image)
+    assert text_left < 1280 < text_right
+    cut = split_into_tiles(image, 1280)[0][2]
+    assert cut <= text_left or cut >= text_right
+
+
+def test_merger_emits_in_tile_order():
+    output = []
+    merger = _OrderedStreamMerger(3, output.append)
+    merger.feed(1, "B")
+    merger.feed(0, "A")
+    merger.feed(2, "C")
+    merger.finish(2)
+    assert output == ["A"]
+    merger.finish(0)
+    assert output == ["A", TILE_SEPARATOR, "B"]
+    merger.finish(1)
+    assert "".join(output) == TILE_SEPARATOR.join("ABC")
+
+
+def test_translate_in_tiles_skips_blank_tiles_and_merges():
+    image = Image.new("RGB", (2560, 400), (255, 255, 255))
+    draw_scaled_text(image, (100, 180), "left", 30, (0, 0, 0))
+    draw_scaled_text(image, (2300, 180), "right", 30, (0, 0, 0))
+    translated = []
+
+    async def translate_tile(tile, tile_callback):
+        text = f"tile{len(translated)}"
+        translated.append(tile.size)
+        if tile_callback:
+            tile_callback(text)
+        return text
+
+    chunks = []
+    merged, results = asyncio.run(translate_in_tiles(image, translate_tile, chunks.append, tile_size=1000))
+    assert len(translated) == 2 # 中间的空白分块被跳过
+    assert merged == "".join(chunks) == TILE_SEPARATOR.join(results)
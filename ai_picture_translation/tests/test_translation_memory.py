@@ -0,0 +1,76 @@
+import itertools
+
+import pytest
+
+import translation_memory
+from translation_memory import SegmentStreamParser, TranslationMemory, normalize_segment
+
+
+def parse(chunks):
+    parser = SegmentStreamParser()
+    segments = []
+    for chunk in chunks:
+        segments.extend(parser.feed(chunk))
+    return segments + parser.close(), parser
+
+
+def test_normalize_segment():
+    assert normalize_segment("  Save \n  changes\t") == "Save changes"
+    assert normalize_segment(None) == ""
+
+
+def test_json_lines_split_across_deltas():
+    reply = '{"source": "Save", "target": "保存"}\n{"source": "Cancel", "target": "取消"}'
+    segments, parser = parse([reply[:10], reply[10:40], reply[40:]])
+    assert segments == [("Save", "保存"), ("Cancel", "取消")]
+    assert parser.count == 2
+
+
+def test_numbered_segments_and_array_wrapping():
+    reply = '```json\n[\n{"id": 0, "target": "保存"},\n{"id": 1, "target": "取消"}\n]\n```'
+    segments, _ = parse([reply])
+    assert segments == [(0, "保存"), (1, "取消")]
+
+
+def test_unparsable_lines_are_passed_through():
+    reply = 'Here you go:\n{"source": "Save", "target": "保存"}\nnot json\n{"source": "OK", "target": "确定"}\n'
+    segments, parser = parse([reply])
+    assert segments == [(None, "Here you go:"), ("Save", "保存"), (None, "not json"), ("OK", "确定")]
+    assert parser.count == 2
+
+
+def test_whole_document_fallback():
+    segments, _ = parse(['{"segments": [{"source": "Save",', ' "target": "保存"}]}'])
+    assert segments == [("Save", "保存")]
+    assert parse(["plain text reply"])[0] == []
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "memory.db"))
+    yield memory
+    memory.close()
+
+
+def test_lookup_returns_only_hits_for_same_mode_and_model(memory):
+    assert memory.put_many([(" Save  file ", "保存文件"), ("Cancel", " 取消 "), ("", "空")], "en-zh", "model-a") == 2
+    assert memory.lookup(["Save file", "Cancel", "Open"], "en-zh", "model-a") == {"Save file": "保存文件", "Cancel": "取消"}
+    assert memory.lookup(["Cancel"], "zh-en", "model-a") == {}
+    assert memory.lookup(["Cancel"], "en-zh", "model-b") == {}
+    assert memory.stats() == {"hits": 2, "misses": 3}
+
+
+def test_any_model_prefers_most_recently_used(memory, monkeypatch):
+    clock = itertools.count(100.0, 100.0)
+    monkeypatch.setattr(translation_memory.time, "time", lambda: next(clock))
+    memory.put_many([("Cancel", "取消")], "en-zh", "vision")
+    memory.put_many([("Cancel", "取消操作")], "en-zh", "text")
+    assert memory.lookup(["Cancel"], "en-zh", "other", any_model=True) == {"Cancel": "取消操作"}
+    assert memory.lookup(["Cancel"], "en-zh", "other") == {}
+
+
+def test_put_replaces_existing_translation(memory):
+    memory.put_many([("Cancel", "取消")], "en-zh", "m")
+    memory.put_many([("Cancel", "撤销")], "en-zh", "m")
+    assert memory.lookup(["Cancel"], "en-zh", "m") == {"Cancel": "撤销"}
+    assert memory.count() == 1
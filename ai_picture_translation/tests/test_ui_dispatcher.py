@@ -0,0 +1,61 @@
+from ui_dispatcher import UIDispatcher
+
+
+class FakeRoot:
+    """代替 Tk 根窗口：记录 after 安排的回调，由测试手动执行"""
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, func, *args):
+        self.scheduled.append((delay, func, args))
+
+    def run_next(self):
+        _, func, args = self.scheduled.pop(0)
+        func(*args)
+
+
+def test_text_chunks_are_merged_per_frame_in_order():
+    root = FakeRoot()
+    dispatcher = UIDispatcher(root, fps=30)
+    output = []
+    dispatcher.post_text("a", output.append, "Hel")
+    dispatcher.post_text("a", output.append, "lo")
+    dispatcher.call(output.append, "|")
+    dispatcher.post_text("a", output.append, " world")
+    assert len(root.scheduled) == 1 # 一帧只安排一次刷新
+    root.run_next()
+    assert output == ["Hello", "|", " world"]
+    assert dispatcher.stats() == {"frames": 1, "merged_chunks": 1, "pending": 0}
+
+
+def test_idle_dispatcher_stops_scheduling():
+    root = FakeRoot()
+    dispatcher = UIDispatcher(root)
+    dispatcher.call(lambda: None)
+    root.run_next()
+    # 刷新过内容后再看一帧，没有新内容就不再安排
+    assert len(root.scheduled) == 1
+    root.run_next()
+    assert root.scheduled == []
+    dispatcher.post_text("a", lambda text: None, "x")
+    assert len(root.scheduled) == 1
+
+
+def test_errors_do_not_stop_later_items():
+    root = FakeRoot()
+    dispatcher = UIDispatcher(root)
+    output = []
+    dispatcher.call(lambda: 1 / 0)
+    dispatcher.call(output.append, "ok")
+    root.run_next()
+    assert output == ["ok"]
+
+
+def test_stopped_dispatcher_drops_updates():
+    root = FakeRoot()
+    dispatcher = UIDispatcher(root)
+    output = []
+    dispatcher.post_text("a", output.append, "x")
+    dispatcher.stop()
+    root.run_next()
+    assert output == []
@@ -0,0 +1,63 @@
+"""
+增量文本布局跟踪
+流式输出时逐段累加行宽（使用真实字体度量并按字形缓存），维护最大行宽和换行后的显示行数，
+避免每次调整窗口大小都重新拆分、扫描全部文本
+"""
+
+import math
+import unicodedata
+
+# 按字体缓存字符宽度，多个窗口使用同一字体时共享
+_width_caches = {}
+
+
+class TextLayoutTracker:
+    """增量维护文本的最大行宽（像素）和显示行数"""
+    def __init__(self, font, wrap_width):
+        self.font = font
+        self.wrap_width = max(1, int(wrap_width)) # 超过该宽度的行会自动换行
+        self.line_height = font.metrics("linespace")
+        self.char_widths = _width_caches.setdefault(repr(sorted(font.actual().items())), {})
+        self.reset()
+
+    def reset(self):
+        self.max_line_width = 0
+        self.current_line_width = 0
+        self.completed_rows = 0 # 已结束的行换行后占用的显示行数
+
+    def char_width(self, ch):
+        """字符宽度（像素），按字形缓存"""
+        width = self.char_widths.get(ch)
+        if width is None:
+            if unicodedata.east_asian_width(ch) in ("W", "F"):
+                # 全角字符（中日韩文字等）宽度基本一致，整类只测量一次
+                width = self.char_widths.get(None)
+                if width is None:
+                    width = self.char_widths[None] = self.font.measure("中")
+            else:
+                width = self.font.measure(ch)
+            self.char_widths[ch] = width
+        return width
+
+    def _rows(self, line_width):
+        return max(1, int(math.ceil(line_width / float(self.wrap_width))))
+
+    def feed(self, text):
+        """追加文本，只处理新增部分"""
+        for ch in text:
+            if ch == "\n":
+                self.max_line_width = max(self.max_line_width, self.current_line_width)
+                self.completed_rows += self._rows(self.current_line_width)
+                self.current_line_width = 0
+            else:
+                self.current_line_width += self.char_width(ch)
+
+    @property
+    def text_width(self):
+        """最长一行的宽度（不超过换行宽度）"""
+        return min(max(self.max_line_width, self.current_line_width), self.wrap_width)
+
+    @property
+    def text_height(self):
+        """换行后全部显示行的高度"""
+        return (self.completed_rows + self._rows(self.current_line_width)) * self.line_height
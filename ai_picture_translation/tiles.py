@@ -0,0 +1,152 @@
+"""
+分块并行翻译
+将超大截图（多显示器全屏）沿文字间的空白间隙切分为网格，丢弃空白/低方差分块，剩余分块有限并发地翻译，
+结果按阅读顺序（从上到下、从左到右）合并；流式输出时第一个分块的文字会最先显示
+"""
+
+import math
+import asyncio
+import threading
+
+import numpy as np
+
+# 合并分块结果时使用的分隔符
+TILE_SEPARATOR = "\n"
+
+# 在网格线两侧各该比例（占分块边长）的范围内寻找空白间隙作为切分线
+GUTTER_SEARCH_RATIO = 0.25
+
+
+def _grid_cuts(length, count):
+    """均匀网格的切分位置（含两端）"""
+    size = int(math.ceil(length / float(count)))
+    return [min(length, index * size) for index in range(count)] + [length]
+
+
+def _gutter_cuts(profile, step, length, count):
+    """在均匀网格线附近的空白间隙处切分，返回切分位置（原图坐标，含两端）"""
+    from preprocess import find_gutter
+    size = len(profile) / float(count)
+    radius = int(size * GUTTER_SEARCH_RATIO)
+    cuts = [0]
+    for index in range(1, count):
+        cut = find_gutter(profile, int(round(index * size)), radius) * step
+        cuts.append(min(length, max(cuts[-1] + 1, cut)))
+    cuts.append(length)
+    return cuts
+
+
+def split_into_tiles(image, tile_size):
+    """切分截图，返回按阅读顺序排列的裁剪框列表
+
+    先按行投影横向切成若干行带，每个行带再按其内部的列投影竖向切分；切分线放在网格线附近的空白间隙处，
+    避免把文字行或单词切成两半（找不到完全空白的间隙时选边缘最少的位置）
+    """
+    from preprocess import edge_map
+    cols = max(1, int(math.ceil(image.width / float(tile_size))))
+    rows = max(1, int(math.ceil(image.height / float(tile_size))))
+
+    edges, step = edge_map(image) if rows > 1 or cols > 1 else (None, 1)
+    if edges is None:
+        row_cuts = _grid_cuts(image.height, rows)
+    else:
+        row_cuts = _gutter_cuts(edges.sum(axis=1), step, image.height, rows)
+
+    boxes = []
+    for top, bottom in zip(row_cuts, row_cuts[1:]):
+        if bottom <= top:
+            continue
+        if edges is None:
+            col_cuts = _grid_cuts(image.width, cols)
+        else:
+            band = edges[top // step:max(top // step + 1, bottom // step)]
+            col_cuts = _gutter_cuts(band.sum(axis=0), step, image.width, cols)
+        boxes.extend((left, top, right, bottom) for left, right in zip(col_cuts, col_cuts[1:]) if right > left)
+    return boxes
+
+
+def is_blank_tile(tile, min_std):
+    """灰度标准差低于阈值的分块视为空白（纯色背景、无文字）"""
+    return float(np.asarray(tile.convert("L"), dtype=np.float32).std()) < min_std
+
+
+class _OrderedStreamMerger:
+    """按分块顺序合并流式输出：当前分块直接输出，后续分块先缓冲，前面的完成后再依次输出"""
+    def __init__(self, count, callback):
+        self.callback = callback
+        self.count = count
+        self.buffers = [[] for _ in range(count)]
+        self.done = [False] * count
+        self.current = 0
+        self.emitted_any = False
+        self.need_separator = False
+        self.lock = threading.Lock()
+
+    def _emit(self, chunk):
+        """输出内容（调用方持有锁）"""
+        if not chunk:
+            return
+        if self.need_separator and self.emitted_any:
+            self.callback(TILE_SEPARATOR)
+        self.need_separator = False
+        self.emitted_any = True
+        self.callback(chunk)
+
+    def feed(self, index, chunk):
+        with self.lock:
+            if index == self.current:
+                self._emit(chunk)
+            else:
+                self.buffers[index].append(chunk)
+
+    def finish(self, index):
+        with self.lock:
+            self.done[index] = True
+            if index != self.current:
+                return
+            # 当前分块完成，依次推进到下一个未完成的分块并输出其缓冲内容
+            while True:
+                self.current += 1
+                if self.current >= self.count:
+                    break
+                self.need_separator = True
+                self._emit("".join(self.buffers[self.current]))
+                self.buffers[self.current] = []
+                if not self.done[self.current]:
+                    break
+
+
+async def translate_in_tiles(image, translate_tile, callback=None, tile_size=1280, max_workers=4, min_std=6.0):
+    """分块并行翻译（异步）
+
+    translate_tile(tile_image, tile_callback) 为协程函数，负责翻译单个分块并返回完整文本；
+    同时运行的分块数不超过 max_workers。callback 不为空时按阅读顺序流式输出合并后的增量内容。
+    返回 (合并文本, 各分块文本列表)。
+    """
+    boxes = split_into_tiles(image, tile_size)
+    tiles = []
+    for box in boxes:
+        tile = image.crop(box)
+        if not is_blank_tile(tile, min_std):
+            tiles.append(tile)
+    print(f"分块翻译: 共 {len(boxes)} 块，跳过空白 {len(boxes) - len(tiles)} 块，并发 {max_workers}")
+
+    if not tiles:
+        return "", []
+
+    merger = _OrderedStreamMerger(len(tiles), callback) if callback else None
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def run_tile(index):
+        tile_callback = (lambda chunk: merger.feed(index, chunk)) if merger else None
+        async with semaphore:
+            try:
+                return await translate_tile(tiles[index], tile_callback) or ""
+            finally:
+                if merger:
+                    merger.finish(index)
+
+    results = await asyncio.gather(*(run_tile(index) for index in range(len(tiles))))
+
+    merged = TILE_SEPARATOR.join(text for text in results if text)
+    return merged, list(results)
@@ -0,0 +1,203 @@
+"""
+翻译记忆
+结构化模式下模型以 JSON 逐行返回每个原文片段及其译文，(原文片段, 翻译模式, 模型) 对应的译文保存到 SQLite。
+原文已知时（例如本地OCR识别出的文字）先查询翻译记忆，只把未命中的片段发送给模型，全部命中时不再请求；
+默认只复用同一模型的译文，any_model 为 True 时也复用其它模型的译文（取最近使用的一条）。
+界面上的按钮、菜单等文字反复出现，命中率通常很高
+"""
+
+import re
+import json
+import time
+import sqlite3
+import threading
+
+# 单条 SQL 中查询的片段数上限（SQLite 参数个数有限制）
+LOOKUP_BATCH_SIZE = 500
+
+_whitespace_re = re.compile(r"\s+")
+
+
+def normalize_segment(text):
+    """规范化原文片段（合并空白），作为翻译记忆的查询键"""
+    return _whitespace_re.sub(" ", text or "").strip()
+
+
+def _segment_from_item(item):
+    """从 JSON 对象中取出 (原文或编号, 译文)，格式不符时返回 None"""
+    if not isinstance(item, dict) or not isinstance(item.get("target"), str):
+        return None
+    if "id" in item:
+        return item["id"], item["target"]
+    if isinstance(item.get("source"), str):
+        return item["source"], item["target"]
+    return None
+
+
+class SegmentStreamParser:
+    """解析模型流式返回的 JSON Lines（每行一个 {"source"/"id": ..., "target": ...}），每解析出一行就返回该片段
+
+    已解析出片段后，无法解析的文字行作为 (None, 行) 原样返回，不会丢失译文；第一个片段之前的文字行
+    暂存，确认是 JSON Lines 后再一并返回。模型没有逐行输出而是返回 JSON 数组（或包在 ```json 代码块中）时，
+    在 close() 中整体解析
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.text = "" # 模型返回的完整原始文本
+        self.count = 0 # 已解析出的 JSON 片段数
+        self.pending = [] # 第一个片段之前无法解析的文字行
+
+    def feed(self, delta):
+        """输入增量文本，返回新解析出的片段列表"""
+        self.text += delta
+        self.buffer += delta
+        lines = self.buffer.split("\n")
+        self.buffer = lines.pop()
+        return self._parse_lines(lines)
+
+    def close(self):
+        """输入结束，返回剩余的片段列表"""
+        segments = self._parse_lines([self.buffer])
+        self.buffer = ""
+        if self.count == 0:
+            segments = self._parse_document()
+        return segments
+
+    def _parse_lines(self, lines):
+        segments = []
+        for line in lines:
+            line = line.strip()
+            item = line.lstrip("[").rstrip("],")
+            if not item.strip() or line.startswith("```"): # 空行、数组括号和代码块标记
+                continue
+            segment = None
+            if item.startswith("{"):
+                try:
+                    segment = _segment_from_item(json.loads(item))
+                except ValueError:
+                    pass
+            if segment is None:
+                # 无法解析的行原样输出
+                (segments if self.count else self.pending).append((None, line))
+                continue
+            if not self.count:
+                segments.extend(self.pending)
+                self.pending = []
+            segments.append(segment)
+            self.count += 1
+        return segments
+
+    def _parse_document(self):
+        text = self.text.strip()
+        if text.startswith("```"):
+            text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+        try:
+            items = json.loads(text)
+        except ValueError:
+            return []
+        if isinstance(items, dict): # 例如 {"segments": [...]}
+            items = next((value for value in items.values() if isinstance(value, list)), [])
+        if not isinstance(items, list):
+            return []
+        segments = [segment for segment in map(_segment_from_item, items) if segment is not None]
+        self.count += len(segments)
+        return segments
+
+
+class TranslationMemory:
+    """片段级翻译记忆（SQLite），按 (原文片段, 翻译模式, 模型) 寻址，线程安全"""
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+
+        try:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "source TEXT NOT NULL, mode TEXT NOT NULL, model TEXT NOT NULL, target TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL, uses INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (source, mode, model)) WITHOUT ROWID"
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"打开翻译记忆失败（不使用翻译记忆）: {e}")
+            self.conn = None
+
+    def lookup(self, sources, mode, model, any_model=False):
+        """查询原文片段，返回 {规范化原文: 译文}（只包含命中的片段）；any_model 为 True 时不限模型"""
+        keys = list(dict.fromkeys(normalize_segment(source) for source in sources if normalize_segment(source)))
+        if self.conn is None or not keys:
+            return {}
+        found = {}
+        models = {}
+        with self.lock:
+            try:
+                for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                    batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                    if any_model:
+                        # 同一片段有多个模型的译文时，按最近使用时间排序后保留最后一条
+                        sql, params = ("SELECT source, model, target FROM segments WHERE mode = ? AND source IN ("
+                                       + ", ".join("?" * len(batch)) + ") ORDER BY last_used", [mode] + batch)
+                    else:
+                        sql, params = ("SELECT source, model, target FROM segments WHERE mode = ? AND model = ? "
+                                       "AND source IN (" + ", ".join("?" * len(batch)) + ")", [mode, model] + batch)
+                    for source, row_model, target in self.conn.execute(sql, params).fetchall():
+                        found[source] = target
+                        models[source] = row_model
+                if found:
+                    self.conn.executemany(
+                        "UPDATE segments SET last_used = ?, uses = uses + 1 WHERE source = ? AND mode = ? AND model = ?",
+                        [(time.time(), source, mode, models[source]) for source in found]
+                    )
+                    self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"查询翻译记忆失败: {e}")
+                return {}
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, pairs, mode, model):
+        """保存 (原文, 译文) 列表，返回保存的片段数"""
+        rows = []
+        now = time.time()
+        for source, target in pairs:
+            source, target = normalize_segment(source), (target or "").strip()
+            if source and target:
+                rows.append((source, mode, model, target, now, now))
+        if self.conn is None or not rows:
+            return 0
+        with self.lock:
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO segments (source, mode, model, target, created, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"写入翻译记忆失败: {e}")
+                return 0
+        return len(rows)
+
+    def count(self):
+        if self.conn is None:
+            return 0
+        with self.lock:
+            try:
+                return self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+    def stats(self):
+        """返回命中统计"""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,105 @@
+"""
+界面更新调度器
+工作线程把流式增量和界面操作放入线程安全的队列，主线程按固定帧率（默认30Hz）批量刷新：
+同一个流在一帧内的多个增量合并为一次插入，避免大量 after(0) 回调堵塞 Tk 事件队列。
+只在有待执行项时才安排刷新，空闲时不占用定时器
+"""
+
+import threading
+
+
+class UIDispatcher:
+    """线程安全的界面更新调度器（只能由主线程创建）"""
+    def __init__(self, root, fps=30):
+        self.root = root
+        self.interval_ms = max(1, int(1000 / max(1, fps)))
+        self.main_thread_id = threading.get_ident()
+        self.lock = threading.Lock()
+        self.pending = [] # 按提交顺序排列的待执行项：("call", 函数, 参数) 或 ("text", 处理函数, 增量列表)
+        self.open_streams = {} # 流标识 -> 当前帧中仍可合并增量的待执行项
+        self.running = True
+        self.armed = False # 是否已安排下一帧刷新
+        self.frames = 0
+        self.merged_chunks = 0
+
+    def is_main_thread(self):
+        return threading.get_ident() == self.main_thread_id
+
+    def call(self, func, *args):
+        """在下一帧于主线程中执行 func(*args)，保持与其它提交项的先后顺序"""
+        with self.lock:
+            self.pending.append(("call", func, args))
+            # 之后到达的增量不能再合并到这个调用之前
+            self.open_streams.clear()
+            arm = self._need_arm()
+        if arm:
+            self._arm()
+
+    def call_soon(self, func, *args):
+        """尽快在主线程中执行 func(*args)，不等待下一帧（用于快捷键响应等对延迟敏感的操作）
+
+        不保证与 call/post_text 提交项的先后顺序
+        """
+        self.root.after(0, func, *args)
+
+    def post_text(self, stream_key, handler, chunk):
+        """提交流式增量；同一帧内同一流的增量合并后只调用一次 handler(合并文本)"""
+        if not chunk:
+            return
+        with self.lock:
+            item = self.open_streams.get(stream_key)
+            if item is not None:
+                item[2].append(chunk)
+                self.merged_chunks += 1
+            else:
+                item = ("text", handler, [chunk])
+                self.pending.append(item)
+                self.open_streams[stream_key] = item
+            arm = self._need_arm()
+        if arm:
+            self._arm()
+
+    def _need_arm(self):
+        """待执行项从无到有时需要安排刷新（调用方持有锁）"""
+        if self.armed or not self.running:
+            return False
+        self.armed = True
+        return True
+
+    def _arm(self):
+        try:
+            self.root.after(self.interval_ms, self._tick)
+        except Exception: # 主窗口已销毁
+            self.running = False
+
+    def _tick(self):
+        """主线程定时刷新；一帧内没有可刷新的内容时停止，等下一个提交项再安排"""
+        if not self.running:
+            return
+        with self.lock:
+            items, self.pending = self.pending, []
+            self.open_streams.clear()
+        if items:
+            self.frames += 1
+        for kind, func, payload in items:
+            try:
+                if kind == "call":
+                    func(*payload)
+                else:
+                    func("".join(payload))
+            except Exception as e:
+                print(f"界面更新出错: {e}")
+        # 本帧刷新过内容时再安排一帧，持续的流按帧率合并；下一帧仍没有新内容就停止
+        with self.lock:
+            self.armed = bool(items or self.pending) and self.running
+            arm = self.armed
+        if arm:
+            self._arm()
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """返回刷新统计：实际刷新帧数和被合并掉的增量数"""
+        with self.lock:
+            return {"frames": self.frames, "merged_chunks": self.merged_chunks, "pending": len(self.pending)}
@@ -0,0 +1,99 @@
+"""
+区域监视
+按固定间隔重新截取保存的屏幕区域，用降采样灰度缩略图比较前后画面，
+只有内容确实变化（且已停止变化，避免翻译正在滚动/逐字出现的字幕）时才触发翻译，不在相同画面上浪费API调用
+"""
+
+import time
+import threading
+
+import numpy as np
+from PIL import Image
+
+# 比较画面时缩略图的最长边（像素）
+SIGNATURE_MAX_SIDE = 256
+# 缩略图中灰度差超过该值的像素视为发生变化
+PIXEL_DIFF_THRESHOLD = 16
+
+
+def frame_signature(image):
+    """计算画面签名：降采样的灰度缩略图（NumPy 数组）"""
+    thumb = image.convert("L")
+    if max(thumb.size) > SIGNATURE_MAX_SIDE:
+        scale = SIGNATURE_MAX_SIDE / float(max(thumb.size))
+        thumb = thumb.resize((max(1, int(thumb.width * scale)), max(1, int(thumb.height * scale))), Image.BOX)
+    return np.asarray(thumb, dtype=np.int16)
+
+
+def changed_ratio(signature, previous):
+    """两个签名之间发生变化的像素比例（0~1），尺寸不同视为完全变化"""
+    if previous is None or signature.shape != previous.shape:
+        return 1.0
+    return float(np.count_nonzero(np.abs(signature - previous) > PIXEL_DIFF_THRESHOLD)) / signature.size
+
+
+class RegionWatcher:
+    """在后台线程中监视屏幕区域，内容变化并稳定后调用 on_change(截图)"""
+    def __init__(self, box, on_change, interval=1.0, change_ratio=0.002, grab=None):
+        self.box = tuple(box) # (left, top, right, bottom)，截图坐标（物理像素）
+        self.on_change = on_change
+        self.interval = max(0.1, interval)
+        self.change_ratio = change_ratio
+        self.grab = grab or self._grab
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.frames = 0
+        self.changes = 0
+        self.capture_ms = 0.0
+        self.last_capture_ms = None # 最近一次截取的耗时
+
+    @staticmethod
+    def _grab(box):
+        from PIL import ImageGrab
+        return ImageGrab.grab(bbox=box)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="region-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.interval + 1.0)
+        print(f"区域监视已停止：截取 {self.frames} 次，翻译 {self.changes} 次，"
+              f"平均截取 {self.capture_ms / max(1, self.frames):.1f}ms")
+
+    @property
+    def running(self):
+        return self.thread is not None and not self.stop_event.is_set()
+
+    def _run(self):
+        previous = None # 上一次截取的签名
+        translated = None # 上一次触发翻译的签名
+        while True:
+            start = time.perf_counter()
+            try:
+                image = self.grab(self.box)
+                signature = frame_signature(image)
+            except Exception as e:
+                print(f"区域监视截图失败: {e}")
+                image = signature = None
+            self.frames += 1
+            self.last_capture_ms = (time.perf_counter() - start) * 1000
+            self.capture_ms += self.last_capture_ms
+
+            if signature is not None:
+                # 与上一帧相同（画面已稳定）且与上次翻译的画面不同时才翻译
+                stable = changed_ratio(signature, previous) <= self.change_ratio
+                if stable and changed_ratio(signature, translated) > self.change_ratio:
+                    translated = signature
+                    self.changes += 1
+                    try:
+                        self.on_change(image)
+                    except Exception as e:
+                        print(f"区域监视回调出错: {e}")
+                previous = signature
+
+            if self.stop_event.wait(self.interval):
+                return